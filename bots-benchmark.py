@@ -0,0 +1,5 @@
+#!/usr/bin/env python
+from bots.benchmark import runner
+
+if __name__ == '__main__':
+    runner.start()
@@ -15,16 +15,16 @@ def evaluate(command,rootidtaofrun):
     '''
     resultsofrun = {OPEN:0,ERROR:0,OK:0,DONE:0}     #to collect the results of the filereports for runreport
     totalfilesize = 0
+    filereports = []
+    tasofrun = TransactionsOfRun(rootidtaofrun)
     #evaluate every incoming file of this run; 
-    for row in botslib.query('''SELECT ''' + TAVARS + '''
-                                FROM ta
-                                WHERE idta > %(rootidtaofrun)s
-                                AND status=%(status)s ''',
-                                {'status':EXTERNIN,'rootidtaofrun':rootidtaofrun}):
-        traceofinfile = Trace(row,rootidtaofrun)
+    for row in tasofrun.incomingfiles():
+        traceofinfile = Trace(row,rootidtaofrun,tasofrun)
         resultsofrun[traceofinfile.statust] += 1
         totalfilesize += traceofinfile.filesize
-        traceofinfile.make_file_report()
+        filereports.append(traceofinfile.make_file_report())
+    if filereports:
+        insert_file_reports(filereports)
     make_run_report(rootidtaofrun,resultsofrun,command,totalfilesize)
     return email_error_report(rootidtaofrun)    #return report status: 0 (no error) or 1 (error)
 
@@ -97,6 +97,8 @@ def email_error_report(rootidtaofrun):
         subject += _(u'; %d process errors')%(results['processerrors'])
         reporttext += _(u'    %d errors in processes.\n')%(results['processerrors'])
     reporttext += _(u'    %d files send in run.\n')%(results['send'])
+    if botslib.lookupcache.hits or botslib.lookupcache.misses:
+        reporttext += _(u'    %(hits)d lookups in code tables/partners from cache, %(misses)d from database.\n')%{'hits':botslib.lookupcache.hits,'misses':botslib.lookupcache.misses}
 
     botsglobal.logger.info(reporttext)      #log the report texts
     # only send email report if there are errors.
@@ -130,16 +132,56 @@ def email_error_report(rootidtaofrun):
     return int(results['status'])    #return report status: 0 (no error) or 1 (error)
 
 
+class TransactionsOfRun(object):
+    ''' all ta's of a run, read in one query; index on parent for building the trees of ta's.
+        saves a query for each ta in building the trees.
+    '''
+    def __init__(self,rootidtaofrun):
+        self.tas = {}               #idta -> ta (as dict)
+        self.childrenofparent = {}  #parent -> list of ta's, sorted by idta
+        for row in botslib.query('''SELECT ''' + TAVARS + ''',parent
+                                    FROM ta
+                                    WHERE idta > %(rootidtaofrun)s
+                                    ORDER BY idta ''',
+                                    {'rootidtaofrun':rootidtaofrun}):
+            tacurrent = dict(row)
+            parent = tacurrent.pop('parent')
+            self.tas[tacurrent['idta']] = tacurrent
+            if parent and parent < tacurrent['idta']:
+                self.childrenofparent.setdefault(parent,[]).append(tacurrent)
+
+    def incomingfiles(self):
+        ''' ta's of incoming files (status EXTERNIN) of the run, sorted by idta.'''
+        return [tacurrent for idta,tacurrent in sorted(self.tas.iteritems()) if tacurrent['status'] == EXTERNIN]
+
+    def get_child(self,idta):
+        ''' child-relation (when merging); child is always in the run, but query if not.'''
+        if idta in self.tas:
+            return self.tas[idta]
+        for row in botslib.query('''SELECT ''' + TAVARS + '''
+                                     FROM ta
+                                     WHERE idta=%(child)s ''',
+                                    {'child':idta}):
+            return dict(row)
+        return None
+
+    def get_children(self,idta):
+        ''' parent-relation (one-on-one relation and splitting).'''
+        return self.childrenofparent.get(idta,[])
+
+
 class Trace(object):
     ''' trace for one incoming file.
         each step in the processing is represented by a ta-object.
         the ta-objects form a tree; the incoming edi-file (status EXTERNIN) is root.
         (this also works for merging, strange but inherent).
         this tree is evaluated to get one statust, by walking the tree and evaluating the statust of nodes.
+        the ta-objects are from tasofrun (all ta's of the run); a ta-object can be in the tree of more incoming files (merging).
     '''
-    def __init__(self,row,rootidtaofrun):
+    def __init__(self,row,rootidtaofrun,tasofrun):
         self.rootofinfile = dict(row)
         self.rootidtaofrun = rootidtaofrun
+        self.tasofrun = tasofrun
         self._buildtreeoftransactions(self.rootofinfile)
         try:
             self.statust = self._getstatusfortreeoftransactions(self.rootofinfile)
@@ -157,24 +199,14 @@ class Trace(object):
     def _buildtreeoftransactions(self,tacurrent):
         ''' build a tree of all ta's for the incoming file. recursive.
         '''
+        if 'talijst' in tacurrent:  #already build (ta is in tree of other incoming file via merging)
+            return
         if tacurrent['child']:     #find successor by using child relation ship (when merging)
-            for row in botslib.query('''SELECT ''' + TAVARS + '''
-                                         FROM ta
-                                         WHERE idta=%(child)s
-                                         ORDER BY idta ''',
-                                        {'child':tacurrent['child']}):
-                tacurrent['talijst'] = [dict(row)]    #add next one (a child has only one parent)
+            child = self.tasofrun.get_child(tacurrent['child'])
+            tacurrent['talijst'] = [child] if child else []    #add next one (a child has only one parent)
         else:   #find successor by using parent-relationship; for one-one-one relation an splitting
-            talijst = []
-            for row in botslib.query('''SELECT ''' + TAVARS + '''
-                                        FROM ta
-                                        WHERE idta > %(currentidta)s
-                                        AND parent=%(currentidta)s
-                                        ORDER BY idta ''',      #adding the idta > %(currentidta)s to selection speeds up a lot.
-                                        {'currentidta':tacurrent['idta']}):
-                talijst.append(dict(row))
             #there ws logic here to assure that earlier try's where not used. this is only needed for communication-retries now
-            tacurrent['talijst'] = talijst
+            tacurrent['talijst'] = self.tasofrun.get_children(tacurrent['idta'])
         #recursive build:
         for child in tacurrent['talijst']:
             self._buildtreeoftransactions(child)
@@ -346,10 +378,17 @@ class Trace(object):
             self.filesize = self.filesize2
 
     def make_file_report(self):
+        ''' returns the filereport (dict) for this incoming file; filereports are written to database by insert_file_reports.'''
         #20140116: patch for MySQLdb version 1.2.5. This version seems to check all parameters - not just the ones actually used.
         tmp_dict = self.__dict__.copy()
         tmp_dict.pop('rootofinfile','nep')
-        botslib.changeq(u'''INSERT INTO filereport (idta,statust,reportidta,retransmit,idroute,fromchannel,ts,
+        tmp_dict.pop('tasofrun','nep')
+        return tmp_dict
+
+
+def insert_file_reports(filereports):
+    ''' write filereports of a run to database in one batch.'''
+    botslib.changemany(u'''INSERT INTO filereport (idta,statust,reportidta,retransmit,idroute,fromchannel,ts,
                                                     infilename,tochannel,frompartner,topartner,frommail,
                                                     tomail,ineditype,inmessagetype,outeditype,outmessagetype,
                                                     incontenttype,outcontenttype,nrmessages,outfilename,errortext,
@@ -360,4 +399,4 @@ class Trace(object):
                                         %(incontenttype)s,%(outcontenttype)s,%(nrmessages)s,%(outfilename)s,%(errortext)s,
                                         %(divtext)s,%(outidta)s,%(rsrv1)s,%(filesize)s )
                                 ''',
-                                tmp_dict)
+                                filereports)
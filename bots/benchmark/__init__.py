@@ -0,0 +1,3 @@
+''' benchmark of the bots-engine: translation of generated edi files, time per phase and peak memory.
+    start with bots-benchmark.py; see runner.py.
+'''
@@ -0,0 +1,133 @@
+''' generate synthetic edi files (orders) for benchmarking.
+    content is pseudo-random but reproducible: same seed, messages and lines give same file.
+    the files fit the grammars in bots/benchmark/usersys.
+'''
+import random
+import codecs
+try:
+    import json as simplejson
+except ImportError:
+    import simplejson
+
+EDITYPES = ('edifact','x12','fixed','csv','xml','json')
+#for each editype: messagetype of incoming files; is also used for grammar of outgoing files.
+MESSAGETYPES = {'edifact':'edifact','x12':'x12','fixed':'orders','csv':'orders','xml':'orders','json':'orders'}
+#for each editype: messagetype of outgoing message and mapping script
+TRANSLATIONS = {'edifact':('ORDERSD96AUNEAN008','orders2orders'),
+                'x12':('850004010','850to850'),
+                'fixed':('orders','orders2orders'),
+                'csv':('orders','orders2orders'),
+                'xml':('orders','orders2orders'),
+                'json':('orders','orders2orders'),
+                }
+SENDER = '8712345000004'
+RECEIVER = '8798765000002'
+WORDS = ('red','green','blue','small','large','steel','wooden','box','bolt','nut','screw','panel','cable','lamp','valve','pipe')
+
+
+def generate(editype,filename,messages,lines,seed=0):
+    ''' write a synthetic edi file of editype with nr of messages, each with nr of lines.
+        return size of file in bytes.
+    '''
+    orders = [_order(random.Random('%s-%s-%s'%(seed,editype,nr)),nr,lines) for nr in range(1,messages+1)]
+    content = globals()['_' + editype](orders,seed)
+    filehandler = codecs.open(filename,'wb','latin_1' if editype in ('edifact','fixed') else 'utf-8')
+    filehandler.write(content)
+    filehandler.close()
+    return len(content.encode('utf-8'))
+
+def _order(rnd,nr,lines):
+    ''' order as dict, content is not dependent on editype.'''
+    orderdate = '2014%02d%02d'%(rnd.randint(1,12),rnd.randint(1,28))
+    order = {'ordernumber':'PO%08d'%(rnd.randint(0,99999999)),
+             'orderdate':orderdate,
+             'deliverydate':orderdate[:6] + '28',
+             'buyer':'87%011d'%(rnd.randint(0,99999999999)),
+             'buyername':' '.join(rnd.choice(WORDS) for dummy in range(3)).title(),
+             'nr':nr,
+             'lines':[]}
+    for linenumber in range(1,lines+1):
+        order['lines'].append({'linenumber':unicode(linenumber),
+                               'ean':'87%011d'%(rnd.randint(0,99999999999)),
+                               'description':' '.join(rnd.choice(WORDS) for dummy in range(rnd.randint(1,4))),
+                               'quantity':unicode(rnd.randint(1,500)),
+                               'price':'%d.%02d'%(rnd.randint(0,999),rnd.randint(0,99))})
+    return order
+
+def _edifact(orders,seed):
+    segments = ['UNA:+.?*',
+                'UNB+UNOC:4+%s:14+%s:14+20140101:1200+%s'%(SENDER,RECEIVER,seed)]
+    for order in orders:
+        message = ['UNH+%s+ORDERS:D:96A:UN:EAN008'%order['nr'],
+                   'BGM+220+%s+9'%order['ordernumber'],
+                   'DTM+137:%s:102'%order['orderdate'],
+                   'DTM+2:%s:102'%order['deliverydate'],
+                   'NAD+BY+%s::9'%order['buyer'],
+                   'NAD+SU+%s::9'%SENDER]
+        for line in order['lines']:
+            message += ['LIN+%s++%s:EN'%(line['linenumber'],line['ean']),
+                        'IMD+F+:::%s'%line['description'],
+                        'QTY+21:%s'%line['quantity'],
+                        'PRI+AAA:%s'%line['price']]
+        message += ['UNS+S',
+                    'CNT+2:%s'%len(order['lines'])]
+        message.append('UNT+%s+%s'%(len(message)+1,order['nr']))
+        segments += message
+    segments.append('UNZ+%s+%s'%(len(orders),seed))
+    return u"'\r\n".join(segments) + u"'\r\n"
+
+def _x12(orders,seed):
+    reference = '%09d'%seed
+    segments = ['ISA*00*          *00*          *01*%-15s*01*%-15s*140101*1200*^*00403*%s*1*P*>'%(SENDER,RECEIVER,reference),
+                'GS*PO*%s*%s*20140101*1200*%s*X*004010'%(SENDER,RECEIVER,seed)]
+    for order in orders:
+        message = ['ST*850*%04d'%order['nr'],
+                   'BEG*00*SA*%s**%s'%(order['ordernumber'],order['orderdate']),
+                   'DTM*002*%s'%order['deliverydate'],
+                   'N1*BY*%s*9*%s'%(order['buyername'],order['buyer'])]
+        for line in order['lines']:
+            message += ['PO1*%s*%s*EA*%s**EN*%s'%(line['linenumber'],line['quantity'],line['price'],line['ean']),
+                        'PID*F****%s'%line['description']]
+        message.append('CTT*%s'%len(order['lines']))
+        message.append('SE*%s*%04d'%(len(message)+1,order['nr']))
+        segments += message
+    segments += ['GE*%s*%s'%(len(orders),seed),
+                 'IEA*1*%s'%reference]
+    return u'~\r\n'.join(segments) + u'~\r\n'
+
+def _fixed(orders,seed):
+    records = []
+    for order in orders:
+        records.append('HEA%-13s%-13s%-17s%s%s%-13s%-35s'%(SENDER,RECEIVER,order['ordernumber'],order['orderdate'],order['deliverydate'],order['buyer'],order['buyername']))
+        for line in order['lines']:
+            records.append('LIN%06d%-13s%-35s%12s%s'%(int(line['linenumber']),line['ean'],line['description'],line['quantity'],line['price'].zfill(12)))
+    return u'\r\n'.join(records) + u'\r\n'
+
+def _csv(orders,seed):
+    records = ['SENDER,RECEIVER,ORDERNUMBER,ORDERDATE,BUYERNAME,LINENUMBER,EAN,DESCRIPTION,QUANTITY,PRICE']
+    for order in orders:
+        for line in order['lines']:
+            records.append(','.join((SENDER,RECEIVER,order['ordernumber'],order['orderdate'],'"%s"'%order['buyername'],
+                                     line['linenumber'],line['ean'],'"%s"'%line['description'],line['quantity'],line['price'])))
+    return u'\r\n'.join(records) + u'\r\n'
+
+def _xml(orders,seed):
+    content = [u'<?xml version="1.0" encoding="utf-8"?>\n<orders>']
+    for order in orders:
+        content.append(u'<order><sender>%s</sender><receiver>%s</receiver><ordernumber>%s</ordernumber><orderdate>%s</orderdate><deliverydate>%s</deliverydate><buyer>%s</buyer><buyername>%s</buyername>'%
+                            (SENDER,RECEIVER,order['ordernumber'],order['orderdate'],order['deliverydate'],order['buyer'],order['buyername']))
+        for line in order['lines']:
+            content.append(u'<line><linenumber>%(linenumber)s</linenumber><ean>%(ean)s</ean><description>%(description)s</description><quantity>%(quantity)s</quantity><price>%(price)s</price></line>'%line)
+        content.append(u'</order>')
+    content.append(u'</orders>\n')
+    return u'\n'.join(content)
+
+def _json(orders,seed):
+    jsonorders = []
+    for order in orders:
+        jsonorder = dict((key,order[key]) for key in ('ordernumber','orderdate','deliverydate','buyer','buyername'))
+        jsonorder['sender'] = SENDER
+        jsonorder['receiver'] = RECEIVER
+        jsonorder['line'] = order['lines']
+        jsonorders.append(jsonorder)
+    return unicode(simplejson.dumps({'orders':{'order':jsonorders}},indent=1))
@@ -0,0 +1,80 @@
+''' micro-benchmark of field formatting: functions in bots/fieldformat.py compared with the way this was done before
+    (time.strptime, decimal.Decimal.quantize).
+    results of both are checked to be the same.
+'''
+import time
+import timeit
+try:
+    import cdecimal as decimal
+except ImportError:
+    import decimal
+import bots.fieldformat as fieldformat
+
+DATES = (u'20140101',u'20141231',u'20120229',u'20130229',u'140615',u'991231',u'2014011',u'2014ab01')
+TIMES = (u'1200',u'2359',u'120059',u'235960',u'1261',u'12005901',u'12ab')
+NUMBERS = ((u'12',2),(u'12.5',2),(u'-12.50',2),(u'1234567.891',3),(u'0.5',2),(u'007.25',2),(u'1.255',2),(u'12.3',0))
+
+
+def _strptimedate(value):
+    try:
+        if len(value) == 6:
+            time.strptime(value,'%y%m%d')
+        elif len(value) == 8:
+            time.strptime(value,'%Y%m%d')
+        else:
+            return False
+    except ValueError:
+        return False
+    return True
+
+def _strptimetime(value):
+    try:
+        if len(value) == 4:
+            time.strptime(value,'%H%M')
+        elif len(value) == 6:
+            time.strptime(value,'%H%M%S')
+        elif len(value) == 7 or len(value) == 8:
+            time.strptime(value[0:6],'%H%M%S')
+            if not value[6:].isdigit():
+                return False
+        else:
+            return False
+    except ValueError:
+        return False
+    return True
+
+def _decimalquantize(value,nrdecimals):
+    return unicode(decimal.Decimal(value).quantize(decimal.Decimal(10) ** -nrdecimals))
+
+def _decimalimplicit(value,nrdecimals):
+    return unicode((decimal.Decimal(value) * 10**nrdecimals).quantize(decimal.Decimal(1)))
+
+#(name,function before,function now,test values)
+CASES = (('date',_strptimedate,fieldformat.checkdate,[(value,) for value in DATES]),
+         ('time',_strptimetime,fieldformat.checktime,[(value,) for value in TIMES]),
+         ('quantize',_decimalquantize,fieldformat.quantize,NUMBERS),
+         ('implicit',_decimalimplicit,fieldformat.implicitdecimals,NUMBERS),
+         )
+
+
+def _timeit(function,values,repeat):
+    def test():
+        for value in values:
+            function(*value)
+    return min(timeit.repeat(test,number=repeat,repeat=3)) / (repeat * len(values))
+
+def run(repeat=2000):
+    ''' returns list of (name,microseconds before,microseconds now,errors); errors are values with different results.'''
+    results = []
+    for name,before,now,values in CASES:
+        errors = [value for value in values if before(*value) != now(*value)]
+        results.append((name,_timeit(before,values,repeat)*1000000,_timeit(now,values,repeat)*1000000,errors))
+    return results
+
+def report(results):
+    lines = [u'%-10s %14s %14s %8s'%('field','before (usec)','now (usec)','speedup')]
+    for name,before,now,errors in results:
+        lines.append(u'%-10s %14.2f %14.2f %7.1fx'%(name,before,now,before/(now or 1.0)))
+        for error in errors:
+            lines.append(u'    Error: different result for %s %s'%(name,error))
+    return lines
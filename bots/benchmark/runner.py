@@ -0,0 +1,377 @@
+import sys
+import os
+import time
+import shutil
+import atexit
+import logging
+import platform
+import multiprocessing
+try:
+    import resource     #not on windows
+except ImportError:
+    resource = None
+try:
+    import json as simplejson
+except ImportError:
+    import simplejson
+import bots.botsinit as botsinit
+import bots.botslib as botslib
+import bots.botsglobal as botsglobal
+import bots.grammar as grammar
+import bots.message as message
+import bots.inmessage as inmessage
+import bots.outmessage as outmessage
+import bots.envelope as envelope
+from bots.botsconfig import *
+import corpus
+import micro
+
+#phases of a translation that are timed. Time of a phase does not include time of other phases that are done within that phase
+#(eg checkmessage within writeall, or db-queries within merging).
+PHASES = ('grammar','lexing','parsing','checkmessage','mapping','writeall','merging','db')
+#methods of message classes that are timed as a phase
+PHASEMETHODS = (('lexing',('_readcontent_edifile','_sniff','_lex')),
+                ('checkmessage',('checkmessage','checkenvelope')),
+                )
+#functions in botslib that do the db-work
+PHASEDBFUNCTIONS = ('changeq','insertta','flush_transactions','unique')
+MINIMUMSECONDS = 0.05   #phases that take less time are not compared with baseline (too much noise)
+
+
+class PhaseTimer(object):
+    ''' measure time per phase of translation.
+        phases can be nested; time of the inner phase is not counted in the outer phase.
+    '''
+    def __init__(self):
+        self.timings = dict.fromkeys(PHASES,0.0)
+        self._stack = []        #for each active phase: [phase, start time, time used by inner phases]
+        self._patched = []      #to restore the patched functions
+
+    def start(self,phase):
+        self._stack.append([phase,time.time(),0.0])
+
+    def stop(self):
+        phase,starttime,innertime = self._stack.pop()
+        elapsed = time.time() - starttime
+        self.timings[phase] += elapsed - innertime
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def run(self,phase,function,*args,**kwargs):
+        self.start(phase)
+        try:
+            return function(*args,**kwargs)
+        finally:
+            self.stop()
+
+    def patch(self,phase,owner,name,materialize=False):
+        ''' replace function 'name' in owner (module or class) by a function that does the timing.
+            materialize: function is a generator; consume it within the timing.
+        '''
+        original = owner.__dict__[name]
+        def timed(*args,**kwargs):
+            self.start(phase)
+            try:
+                if materialize:
+                    return iter(list(original(*args,**kwargs)))
+                return original(*args,**kwargs)
+            finally:
+                self.stop()
+        timed.__name__ = original.__name__
+        setattr(owner,name,timed)
+        self._patched.append((owner,name,original))
+
+    def patchbots(self):
+        ''' time grammar reading, lexing, checkmessage and db-work as done by the bots modules.'''
+        self.patch('grammar',grammar,'grammarread')
+        for module in (message,inmessage,outmessage):
+            for cls in vars(module).values():
+                if isinstance(cls,type) and issubclass(cls,message.Message):
+                    for phase,names in PHASEMETHODS:
+                        for name in names:
+                            if name in cls.__dict__:
+                                self.patch(phase,cls,name)
+        for name in PHASEDBFUNCTIONS:
+            self.patch('db',botslib,name)
+        self.patch('db',botslib,'query',materialize=True)
+
+    def unpatch(self):
+        while self._patched:
+            owner,name,original = self._patched.pop()
+            setattr(owner,name,original)
+
+
+def _peakmemory():
+    ''' peak memory use of this process in Kb (None if not known).'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':    #bytes on mac, Kb on linux
+        peak //= 1024
+    return peak
+
+def _initbenchmark(configdir):
+    ''' initialisation for benchmark (in main process and in worker processes).
+        benchmark uses its own grammars and mappings (bots/benchmark/usersys), but database of configdir.
+    '''
+    if botsglobal.ini is None:      #worker process that is not forked
+        botsinit.generalinit(configdir)
+        botsglobal.logger = botsinit.initenginelogging('benchmark')
+    botsglobal.usersysimportpath = 'bots.benchmark.usersys'
+    botsglobal.ini.set('directories','usersysabs',os.path.join(os.path.dirname(os.path.abspath(__file__)),'usersys'))
+    botsglobal.ini.set('settings','grammarcache','False')  #grammar cache files are per editype/messagetype, not per usersys
+    botslib.setrouteid('bots_benchmark')
+    botsinit.connect()
+
+def _benchmark_editype(task):
+    ''' generate the files for one editype, translate these and merge the results.
+        runs in own process, so peak memory is for this editype only.
+        returns dict with results.
+    '''
+    editype,files,messages,lines,seed = task
+    workdir = botslib.join(botsglobal.ini.get('directories','botssys'),'benchmark','work',editype)
+    shutil.rmtree(workdir,ignore_errors=True)
+    botslib.dirshouldbethere(workdir)
+    result = {'files':files,'messages':0,'bytesin':0,'bytesout':0,'errors':[]}
+    filenames = []
+    for filenumber in range(files):
+        filename = os.path.join(workdir,'%s_%s.edi'%(editype,filenumber))
+        result['bytesin'] += corpus.generate(editype,filename,messages,lines,seed+filenumber)
+        filenames.append(filename)
+
+    timer = PhaseTimer()
+    timer.patchbots()
+    process = botslib.NewProcess('benchmark_' + editype)
+    try:
+        starttime = time.time()
+        for filename in filenames:
+            botslib.batch_transactions(_translate_file)(timer,editype,filename,result)
+        timer.run('merging',envelope.mergemessages,startstatus=TRANSLATED,endstatus=FILEOUT,idroute=botslib.getrouteid(),rootidta=process.idta)
+        result['seconds'] = time.time() - starttime
+    finally:
+        timer.unpatch()
+    result['phases'] = timer.timings
+    result['peakmemory'] = _peakmemory()
+    for row in botslib.query(u'''SELECT statust,filename,errortext
+                                FROM ta
+                                WHERE script=%(idta)s
+                                AND status=%(status)s''',
+                                {'idta':process.idta,'status':FILEOUT}):
+        if row['statust'] == ERROR:
+            result['errors'].append(row['errortext'])
+        else:
+            result['bytesout'] += os.path.getsize(botslib.abspathdata(row['filename']))
+    process.update(statust=DONE)
+    _cleanup(process.idta,workdir)
+    return result
+
+def _translate_file(timer,editype,filename,result):
+    ''' translate one file, as done in transform.translate: parse, split up, mapping, write.'''
+    tomessagetype,tscript = corpus.TRANSLATIONS[editype]
+    translationscript,scriptfilename = botslib.botsimport('mappings',editype,tscript)
+    ta_fromfile = timer.run('db',botslib.NewTransaction,status=FILEIN,statust=OK,filename=filename,editype=editype,
+                                messagetype=corpus.MESSAGETYPES[editype],testindicator='0',idroute=botslib.getrouteid())
+    ta_parsed = timer.run('db',ta_fromfile.copyta,status=PARSED)
+    try:
+        edifile = timer.run('parsing',inmessage.parse_edi_file,editype=editype,messagetype=corpus.MESSAGETYPES[editype],filename=filename,
+                                frompartner='',topartner='',testindicator='0',charset='',alt='',fromchannel='',
+                                idroute=botslib.getrouteid(),command='')
+        edifile.checkforerrorlist()
+        splitup = edifile.nextmessage()
+        while True:
+            inn_splitup = timer.run('parsing',next,splitup,None)
+            if inn_splitup is None:
+                break
+            result['messages'] += 1
+            ta_splitup = timer.run('db',ta_parsed.copyta,status=SPLITUP,**inn_splitup.ta_info)
+            ta_translated = timer.run('db',ta_splitup.copyta,status=TRANSLATED)
+            out_translated = outmessage.outmessage_init(editype=editype,messagetype=tomessagetype,filename=unicode(ta_translated.idta),
+                                                        reference=unicode(ta_translated.idta),statust=OK,divtext=tscript)
+            timer.run('mapping',botslib.runscript,translationscript,scriptfilename,'main',inn=inn_splitup,out=out_translated)
+            timer.run('writeall',out_translated.writeall)
+            out_translated.ta_info['filesize'] = os.path.getsize(botslib.abspathdata(out_translated.ta_info['filename']))
+            timer.run('db',ta_translated.update,**out_translated.ta_info)
+            timer.run('db',ta_splitup.update,statust=DONE,**inn_splitup.ta_info)
+    except:
+        txt = botslib.txtexc()
+        result['errors'].append(txt)
+        timer.run('db',ta_parsed.update,statust=ERROR,errortext=txt)
+    else:
+        timer.run('db',ta_parsed.update,statust=DONE,**edifile.ta_info)
+
+def _cleanup(idta,workdir):
+    ''' remove the transactions and files of the benchmark.'''
+    for row in botslib.query(u'''SELECT filename
+                                FROM ta
+                                WHERE script=%(idta)s''',
+                                {'idta':idta}):
+        if row['filename'] and '/' not in row['filename']:     #internal data file
+            botslib.deldata(row['filename'])
+    botslib.changeq(u'''DELETE FROM ta
+                        WHERE script=%(idta)s
+                        OR idta=%(idta)s''',
+                        {'idta':idta})
+    shutil.rmtree(workdir,ignore_errors=True)
+
+def run(configdir,editypes,files,messages,lines,seed=0):
+    ''' benchmark the editypes; each editype in its own process. returns dict with results.'''
+    benchmark = {'botsversion':botsglobal.version,
+                 'python':platform.python_version(),
+                 'platform':platform.platform(),
+                 'database':botsglobal.settings.DATABASES['default']['ENGINE'],
+                 'date':time.strftime('%Y-%m-%d %H:%M:%S'),
+                 'parameters':{'files':files,'messages':messages,'lines':lines,'seed':seed},
+                 'results':{},
+                 }
+    for editype in editypes:
+        botsglobal.logger.info(u'Benchmark editype "%(editype)s": %(files)s files, %(messages)s messages per file, %(lines)s lines per message.',
+                                {'editype':editype,'files':files,'messages':messages,'lines':lines})
+        pool = multiprocessing.Pool(processes=1,initializer=_initbenchmark,initargs=(configdir,))
+        try:
+            benchmark['results'][editype] = pool.apply(_benchmark_editype,((editype,files,messages,lines,seed),))
+        finally:
+            pool.terminate()
+            pool.join()
+    return benchmark
+
+def save(benchmark,filename):
+    botslib.dirshouldbethere(os.path.dirname(filename))
+    with open(filename,'wb') as benchmarkfile:
+        simplejson.dump(benchmark,benchmarkfile,indent=2,sort_keys=True)
+
+def load(filename):
+    with open(filename,'rb') as benchmarkfile:
+        return simplejson.load(benchmarkfile)
+
+def compare(benchmark,baseline,threshold):
+    ''' compare time per phase (and total time, peak memory) with baseline.
+        returns (report as list of lines, number of regressions); a regression is more than threshold percent slower/bigger.
+    '''
+    report = []
+    regressions = 0
+    if benchmark['parameters'] != baseline['parameters']:
+        report.append(u'Warning: parameters differ from baseline: %s <-> %s'%(benchmark['parameters'],baseline['parameters']))
+    report.append(u'%-10s %-14s %12s %12s %9s'%('editype','phase','baseline','now','change'))
+    for editype,result in sorted(benchmark['results'].iteritems()):
+        if editype not in baseline['results']:
+            continue
+        base = baseline['results'][editype]
+        items = [(phase,base['phases'].get(phase,0.0),result['phases'].get(phase,0.0)) for phase in PHASES]
+        items.append(('total',base.get('seconds',0.0),result.get('seconds',0.0)))
+        if base.get('peakmemory') and result.get('peakmemory'):
+            items.append(('peakmemory(Kb)',base['peakmemory'],result['peakmemory']))
+        for phase,old,new in items:
+            if old < MINIMUMSECONDS and new < MINIMUMSECONDS:
+                continue
+            change = (new - old) * 100.0 / old if old else 100.0
+            mark = ''
+            if change > threshold:
+                mark = '  <-- regression'
+                regressions += 1
+            report.append(u'%-10s %-14s %12.3f %12.3f %8.1f%%%s'%(editype,phase,old,new,change,mark))
+    return report,regressions
+
+def start():
+    #NOTE: bots directory should always be on PYTHONPATH - otherwise it will not start.
+    #********command line arguments**************************
+    usage = '''
+    This is "%(name)s" version %(version)s, part of Bots open source edi translator (http://bots.sourceforge.net).
+    Benchmark of bots-engine: generates edi files (edifact, x12, fixed, csv, xml, json) and translates these,
+    using grammars and mappings in bots/benchmark/usersys. No communication, routes or configuration is used.
+    Measures time per phase (grammar, lexing, parsing, checkmessage, mapping, writeall, merging, db) and peak memory.
+    Results are saved as json file; this can be compared with a baseline (results of earlier benchmark).
+    Transactions and files of the benchmark are removed after the benchmark.
+
+    Usage:
+        %(name)s  -c<directory> -e<editypes> -f<files> -m<messages> -l<lines> -o<file> -b<file> -t<percent>
+        %(name)s  -u
+    Options:
+        -c<directory>   directory for configuration files (default: config).
+        -e<editypes>    editypes to benchmark, comma separated (default: %(editypes)s).
+        -f<files>       number of files per editype (default: 5).
+        -m<messages>    number of messages per file (default: 100).
+        -l<lines>       number of lines per message (default: 10).
+        -s<seed>        seed for generated content (default: 0).
+        -o<file>        write results to this file (default: botssys/benchmark/<version>_<date-time>.json).
+        -b<file>        compare results with this baseline file.
+        -t<percent>     in comparing: slower than baseline by this percentage is reported as regression (default: 10).
+        -u              micro-benchmark of formatting of date, time and numeric fields (no translations).
+    Exit code is 1 if there are errors in translations or regressions compared with baseline.
+    Examples:
+        %(name)s -m1000 -l20
+        %(name)s -eedifact,x12 -bbotssys/benchmark/3.2.0_20140101120000.json
+
+    '''%{'name':os.path.basename(sys.argv[0]),'version':botsglobal.version,'editypes':','.join(corpus.EDITYPES)}
+    configdir = 'config'
+    editypes = corpus.EDITYPES
+    files = 5
+    messages = 100
+    lines = 10
+    seed = 0
+    outputfile = ''
+    baselinefile = ''
+    threshold = 10.0
+    microbenchmark = False
+    for arg in sys.argv[1:]:
+        try:
+            if arg.startswith('-c'):
+                configdir = arg[2:]
+                if not configdir:
+                    print 'Error: configuration directory indicated, but no directory name.'
+                    sys.exit(1)
+            elif arg.startswith('-e'):
+                editypes = tuple(arg[2:].split(','))
+                for editype in editypes:
+                    if editype not in corpus.EDITYPES:
+                        print 'Error: editype "%s" can not be benchmarked.'%editype
+                        sys.exit(1)
+            elif arg.startswith('-f'):
+                files = int(arg[2:])
+            elif arg.startswith('-m'):
+                messages = int(arg[2:])
+            elif arg.startswith('-l'):
+                lines = int(arg[2:])
+            elif arg.startswith('-s'):
+                seed = int(arg[2:])
+            elif arg.startswith('-o'):
+                outputfile = arg[2:]
+            elif arg.startswith('-b'):
+                baselinefile = arg[2:]
+            elif arg.startswith('-t'):
+                threshold = float(arg[2:])
+            elif arg == '-u':
+                microbenchmark = True
+            else:
+                print usage
+                sys.exit(0)
+        except ValueError:
+            print 'Error: option "%s" should be a number.'%arg
+            sys.exit(1)
+    #***end handling command line arguments**************************
+    if microbenchmark:
+        results = micro.run()
+        print '\n'.join(micro.report(results))
+        sys.exit(1 if any(errors for name,before,now,errors in results) else 0)
+    botsinit.generalinit(configdir)     #find locating of bots, configfiles, init paths etc.
+    process_name = 'benchmark'
+    botsglobal.logger = botsinit.initenginelogging(process_name)
+    atexit.register(logging.shutdown)
+    _initbenchmark(configdir)
+    if not outputfile:
+        outputfile = botslib.join(botsglobal.ini.get('directories','botssys'),'benchmark','%s_%s.json'%(botsglobal.version,time.strftime('%Y%m%d%H%M%S')))
+
+    benchmark = run(configdir,editypes,files,messages,lines,seed)
+    save(benchmark,outputfile)
+    errors = 0
+    print '%-10s %8s %10s %10s %14s'%('editype','messages','seconds','msg/sec','peakmemory(Kb)')
+    for editype,result in sorted(benchmark['results'].iteritems()):
+        print '%-10s %8s %10.3f %10.1f %14s'%(editype,result['messages'],result['seconds'],result['messages']/(result['seconds'] or 1.0),result['peakmemory'])
+        for error in result['errors']:
+            errors += 1
+            print '    Error in %s: %s'%(editype,error)
+    print 'Results are written to "%s".'%outputfile
+    regressions = 0
+    if baselinefile:
+        report,regressions = compare(benchmark,load(baselinefile),threshold)
+        print '\n'.join(report)
+    sys.exit(1 if errors or regressions else 0)
@@ -0,0 +1,37 @@
+from bots.botsconfig import *
+
+syntax = {
+        'field_sep':',',
+        'quote_char':'"',
+        'forcequote':0,
+        'noBOTSID':True,
+        'skip_firstline':True,
+        }
+
+nextmessageblock = ({'BOTSID':'LIN','ORDERNUMBER':None})
+
+structure = [
+{ID:'LIN',MIN:1,MAX:9999999,
+    QUERIES:{
+        'frompartner':  {'BOTSID':'LIN','SENDER':None},
+        'topartner':    {'BOTSID':'LIN','RECEIVER':None},
+        'reference':    {'BOTSID':'LIN','ORDERNUMBER':None},
+        },
+    },
+]
+
+recorddefs = {
+'LIN':[
+        ['BOTSID','C',3,'A'],
+        ['SENDER','M',13,'A'],
+        ['RECEIVER','M',13,'A'],
+        ['ORDERNUMBER','M',17,'A'],
+        ['ORDERDATE','M',8,'D'],
+        ['BUYERNAME','C',35,'A'],
+        ['LINENUMBER','M',6,'N'],
+        ['EAN','M',13,'A'],
+        ['DESCRIPTION','C',35,'A'],
+        ['QUANTITY','M',12,'R'],
+        ['PRICE','C',12.2,'N'],
+        ],
+}
@@ -0,0 +1,107 @@
+from bots.botsconfig import *
+
+structure = [
+{ID:'UNH',MIN:1,MAX:1,LEVEL:[
+    {ID:'BGM',MIN:1,MAX:1},
+    {ID:'DTM',MIN:1,MAX:35},
+    {ID:'NAD',MIN:0,MAX:99},
+    {ID:'LIN',MIN:0,MAX:200000,LEVEL:[
+        {ID:'IMD',MIN:0,MAX:99},
+        {ID:'QTY',MIN:0,MAX:99},
+        {ID:'PRI',MIN:0,MAX:25},
+        ]},
+    {ID:'UNS',MIN:1,MAX:1},
+    {ID:'CNT',MIN:0,MAX:10},
+    {ID:'UNT',MIN:1,MAX:1},
+    ]},
+]
+
+recorddefs = {
+'UNH':[
+        ['BOTSID','M',3,'A'],
+        ['0062','M',14,'AN'],
+        ['S009','M',[
+            ['S009.0065','M',6,'AN'],
+            ['S009.0052','M',3,'AN'],
+            ['S009.0054','M',3,'AN'],
+            ['S009.0051','M',2,'AN'],
+            ['S009.0057','C',6,'AN'],
+            ]],
+        ],
+'BGM':[
+        ['BOTSID','M',3,'A'],
+        ['C002','C',[
+            ['C002.1001','C',3,'AN'],
+            ['C002.1131','C',17,'AN'],
+            ]],
+        ['1004','C',35,'AN'],
+        ['1225','C',3,'AN'],
+        ],
+'DTM':[
+        ['BOTSID','M',3,'A'],
+        ['C507','M',[
+            ['C507.2005','M',3,'AN'],
+            ['C507.2380','C',35,'AN'],
+            ['C507.2379','C',3,'AN'],
+            ]],
+        ],
+'NAD':[
+        ['BOTSID','M',3,'A'],
+        ['3035','M',3,'AN'],
+        ['C082','C',[
+            ['C082.3039','M',35,'AN'],
+            ['C082.1131','C',3,'AN'],
+            ['C082.3055','C',3,'AN'],
+            ]],
+        ],
+'LIN':[
+        ['BOTSID','M',3,'A'],
+        ['1082','C',6,'N'],
+        ['1229','C',3,'AN'],
+        ['C212','C',[
+            ['C212.7140','C',35,'AN'],
+            ['C212.7143','C',3,'AN'],
+            ]],
+        ],
+'IMD':[
+        ['BOTSID','M',3,'A'],
+        ['7077','C',3,'AN'],
+        ['C273','C',[
+            ['C273.7009','C',17,'AN'],
+            ['C273.1131','C',3,'AN'],
+            ['C273.3055','C',3,'AN'],
+            ['C273.7008','C',35,'AN'],
+            ]],
+        ],
+'QTY':[
+        ['BOTSID','M',3,'A'],
+        ['C186','M',[
+            ['C186.6063','M',3,'AN'],
+            ['C186.6060','M',15,'N'],
+            ['C186.6411','C',3,'AN'],
+            ]],
+        ],
+'PRI':[
+        ['BOTSID','M',3,'A'],
+        ['C509','C',[
+            ['C509.5125','M',3,'AN'],
+            ['C509.5118','C',15,'N'],
+            ]],
+        ],
+'UNS':[
+        ['BOTSID','M',3,'A'],
+        ['0081','M',1,'A'],
+        ],
+'CNT':[
+        ['BOTSID','M',3,'A'],
+        ['C270','M',[
+            ['C270.6069','M',3,'AN'],
+            ['C270.6066','M',18,'N'],
+            ]],
+        ],
+'UNT':[
+        ['BOTSID','M',3,'A'],
+        ['0074','M',6,'N'],
+        ['0062','M',14,'AN'],
+        ],
+}
@@ -0,0 +1,88 @@
+from bots.botsconfig import *
+
+syntax = {
+        'charset':'UNOC',
+        'version':'4',
+        }
+
+nextmessage = ({'BOTSID':'UNB'},{'BOTSID':'UNH'})
+nextmessage2 = ({'BOTSID':'UNB'},{'BOTSID':'UNG'},{'BOTSID':'UNH'})
+
+structure = [
+{ID:'UNB',MIN:1,MAX:1,
+    QUERIES:{
+        'frompartner':  {'BOTSID':'UNB','S002.0004':None},
+        'topartner':    {'BOTSID':'UNB','S003.0010':None},
+        'reference':    {'BOTSID':'UNB','0020':None},
+        },
+    LEVEL:[
+        {ID:'UNH',MIN:0,MAX:99999,
+            QUERIES:{
+                'reference':    {'BOTSID':'UNH','0062':None},
+                },
+            SUBTRANSLATION:[
+                {'BOTSID':'UNH','S009.0065':None},
+                {'BOTSID':'UNH','S009.0052':None},
+                {'BOTSID':'UNH','S009.0054':None},
+                {'BOTSID':'UNH','S009.0051':None},
+                {'BOTSID':'UNH','S009.0057':None},
+                ],
+            },
+        {ID:'UNZ',MIN:1,MAX:1},
+        ]
+    },
+]
+
+recorddefs = {
+'UNB':[
+        ['BOTSID','M',3,'A'],
+        ['S001','M',[
+            ['S001.0001','M',4,'A'],
+            ['S001.0002','M',1,'N'],
+            ['S001.0080','C',6,'AN'],
+            ['S001.0133','C',3,'AN'],
+            ]],
+        ['S002','M',[
+            ['S002.0004','M',35,'AN'],
+            ['S002.0007','C',4,'AN'],
+            ['S002.0008','C',35,'AN'],
+            ['S002.0042','C',35,'AN'],
+            ]],
+        ['S003','M',[
+            ['S003.0010','M',35,'AN'],
+            ['S003.0007','C',4,'AN'],
+            ['S003.0014','C',35,'AN'],
+            ['S003.0046','C',35,'AN'],
+            ]],
+        ['S004','M',[
+            ['S004.0017','M',(6,8),'N'],
+            ['S004.0019','M',4,'N'],
+            ]],
+        ['0020','M',14,'AN'],
+        ['S005','C',[
+            ['S005.0022','M',14,'AN'],
+            ['S005.0025','C',2,'AN'],
+            ]],
+        ['0026','C',14,'AN'],
+        ['0029','C',1,'AN'],
+        ['0031','C',1,'N'],
+        ['0032','C',35,'AN'],
+        ['0035','C',1,'N'],
+        ],
+'UNH':[
+        ['BOTSID','M',3,'A'],
+        ['0062','M',14,'AN'],
+        ['S009','M',[
+            ['S009.0065','M',6,'AN'],
+            ['S009.0052','M',3,'AN'],
+            ['S009.0054','M',3,'AN'],
+            ['S009.0051','M',2,'AN'],
+            ['S009.0057','C',6,'AN'],
+            ]],
+        ],
+'UNZ':[
+        ['BOTSID','M',3,'A'],
+        ['0036','M',6,'N'],
+        ['0020','M',14,'AN'],
+        ],
+}
@@ -0,0 +1,42 @@
+from bots.botsconfig import *
+
+syntax = {
+        'charset':'latin_1',
+        }
+
+nextmessage = ({'BOTSID':'HEA'},)
+
+structure = [
+{ID:'HEA',MIN:1,MAX:99999,
+    QUERIES:{
+        'frompartner':  {'BOTSID':'HEA','SENDER':None},
+        'topartner':    {'BOTSID':'HEA','RECEIVER':None},
+        'reference':    {'BOTSID':'HEA','ORDERNUMBER':None},
+        },
+    LEVEL:[
+        {ID:'LIN',MIN:0,MAX:200000},
+        ]
+    },
+]
+
+recorddefs = {
+'HEA':[
+        ['BOTSID','M',3,'A'],
+        ['SENDER','M',13,'A'],
+        ['RECEIVER','M',13,'A'],
+        ['ORDERNUMBER','M',17,'A'],
+        ['ORDERDATE','M',8,'D'],
+        ['DELIVERYDATE','C',8,'D'],
+        ['BUYER','C',13,'A'],
+        ['BUYERNAME','C',35,'A'],
+        ['DELIVERYPLACE','C',13,'A'],
+        ],
+'LIN':[
+        ['BOTSID','M',3,'A'],
+        ['LINENUMBER','M',6,'N'],
+        ['EAN','M',13,'A'],
+        ['DESCRIPTION','C',35,'A'],
+        ['QUANTITY','M',12,'RR'],
+        ['PRICE','C',12.2,'N'],
+        ],
+}
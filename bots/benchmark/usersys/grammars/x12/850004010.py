@@ -0,0 +1,70 @@
+from bots.botsconfig import *
+
+structure = [
+{ID:'ST',MIN:1,MAX:1,LEVEL:[
+    {ID:'BEG',MIN:1,MAX:1},
+    {ID:'DTM',MIN:0,MAX:10},
+    {ID:'N1',MIN:0,MAX:200},
+    {ID:'PO1',MIN:1,MAX:100000,LEVEL:[
+        {ID:'PID',MIN:0,MAX:1000},
+        ]},
+    {ID:'CTT',MIN:0,MAX:1},
+    {ID:'SE',MIN:1,MAX:1},
+    ]},
+]
+
+recorddefs = {
+'ST':[
+        ['BOTSID','M',3,'AN'],
+        ['ST01','M',(3,3),'AN'],
+        ['ST02','M',(4,9),'AN'],
+        ],
+'BEG':[
+        ['BOTSID','M',3,'AN'],
+        ['BEG01','M',(2,2),'AN'],
+        ['BEG02','M',(2,2),'AN'],
+        ['BEG03','M',(1,22),'AN'],
+        ['BEG04','C',(1,30),'AN'],
+        ['BEG05','M',(8,8),'DT'],
+        ],
+'DTM':[
+        ['BOTSID','M',3,'AN'],
+        ['DTM01','M',(3,3),'AN'],
+        ['DTM02','C',(8,8),'DT'],
+        ],
+'N1':[
+        ['BOTSID','M',3,'AN'],
+        ['N101','M',(2,3),'AN'],
+        ['N102','C',(1,60),'AN'],
+        ['N103','C',(1,2),'AN'],
+        ['N104','C',(2,80),'AN'],
+        ],
+'PO1':[
+        ['BOTSID','M',3,'AN'],
+        ['PO101','C',(1,20),'AN'],
+        ['PO102','C',(1,15),'R'],
+        ['PO103','C',(2,2),'AN'],
+        ['PO104','C',(1,17),'R'],
+        ['PO105','C',(2,2),'AN'],
+        ['PO106','C',(2,2),'AN'],
+        ['PO107','C',(1,48),'AN'],
+        ],
+'PID':[
+        ['BOTSID','M',3,'AN'],
+        ['PID01','M',(1,1),'AN'],
+        ['PID02','C',(2,3),'AN'],
+        ['PID03','C',(2,3),'AN'],
+        ['PID04','C',(1,12),'AN'],
+        ['PID05','C',(1,80),'AN'],
+        ],
+'CTT':[
+        ['BOTSID','M',3,'AN'],
+        ['CTT01','M',(1,6),'N0'],
+        ['CTT02','C',(1,10),'R'],
+        ],
+'SE':[
+        ['BOTSID','M',3,'AN'],
+        ['SE01','M',(1,10),'N0'],
+        ['SE02','M',(4,9),'AN'],
+        ],
+}
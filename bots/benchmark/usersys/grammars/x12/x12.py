@@ -0,0 +1,84 @@
+from bots.botsconfig import *
+
+syntax = {
+        'version':'00403',
+        'functionalgroup':'PO',
+        }
+
+nextmessage = ({'BOTSID':'ISA'},{'BOTSID':'GS'},{'BOTSID':'ST'})
+
+structure = [
+{ID:'ISA',MIN:1,MAX:1,
+    QUERIES:{
+        'frompartner':  {'BOTSID':'ISA','ISA06':None},
+        'topartner':    {'BOTSID':'ISA','ISA08':None},
+        'reference':    {'BOTSID':'ISA','ISA13':None},
+        'testindicator':{'BOTSID':'ISA','ISA15':None},
+        },
+    LEVEL:[
+        {ID:'GS',MIN:1,MAX:99999,
+            LEVEL:[
+                {ID:'ST',MIN:0,MAX:99999,      #MIN:0 as this grammar is also used for enveloping
+                    QUERIES:{
+                        'reference':    {'BOTSID':'ST','ST02':None},
+                        },
+                    SUBTRANSLATION:({'BOTSID':'ST','ST01':None},),
+                    },
+                {ID:'GE',MIN:1,MAX:1},
+                ]
+            },
+        {ID:'IEA',MIN:1,MAX:1},
+        ]
+    },
+]
+
+recorddefs = {
+'ISA':[
+        ['BOTSID','M',3,'AN'],
+        ['ISA01','M',(2,2),'AN'],
+        ['ISA02','M',(10,10),'AN'],
+        ['ISA03','M',(2,2),'AN'],
+        ['ISA04','M',(10,10),'AN'],
+        ['ISA05','M',(2,2),'AN'],
+        ['ISA06','M',(15,15),'AN'],
+        ['ISA07','M',(2,2),'AN'],
+        ['ISA08','M',(15,15),'AN'],
+        ['ISA09','M',(6,6),'DT'],
+        ['ISA10','M',(4,4),'TM'],
+        ['ISA11','C',(1,1),'AN'],      #is repetition separator; lexed as separator
+        ['ISA12','M',(5,5),'AN'],
+        ['ISA13','M',(9,9),'N0'],
+        ['ISA14','M',(1,1),'AN'],
+        ['ISA15','M',(1,1),'AN'],
+        ['ISA16','C',[                   #is sub-field separator; lexed as 2 (empty) sub-fields
+            ['ISA16.01','C',(1,1),'AN'],
+            ['ISA16.02','C',(1,1),'AN'],
+            ]],
+        ],
+'GS':[
+        ['BOTSID','M',3,'AN'],
+        ['GS01','M',(2,2),'AN'],
+        ['GS02','M',(2,15),'AN'],
+        ['GS03','M',(2,15),'AN'],
+        ['GS04','M',(8,8),'DT'],
+        ['GS05','M',(4,8),'TM'],
+        ['GS06','M',(1,9),'N0'],
+        ['GS07','M',(1,2),'AN'],
+        ['GS08','M',(1,12),'AN'],
+        ],
+'ST':[
+        ['BOTSID','M',3,'AN'],
+        ['ST01','M',(3,3),'AN'],
+        ['ST02','M',(4,9),'AN'],
+        ],
+'GE':[
+        ['BOTSID','M',3,'AN'],
+        ['GE01','M',(1,6),'N0'],
+        ['GE02','M',(1,9),'N0'],
+        ],
+'IEA':[
+        ['BOTSID','M',3,'AN'],
+        ['IEA01','M',(1,5),'N0'],
+        ['IEA02','M',(9,9),'N0'],
+        ],
+}
@@ -0,0 +1,42 @@
+from bots.botsconfig import *
+
+nextmessage = ({'BOTSID':'orders'},{'BOTSID':'order'})
+
+structure = [
+{ID:'orders',MIN:1,MAX:1,LEVEL:[
+    {ID:'order',MIN:1,MAX:99999,
+        QUERIES:{
+            'frompartner':  {'BOTSID':'order','sender':None},
+            'topartner':    {'BOTSID':'order','receiver':None},
+            'reference':    {'BOTSID':'order','ordernumber':None},
+            },
+        LEVEL:[
+            {ID:'line',MIN:0,MAX:200000},
+            ]
+        },
+    ]},
+]
+
+recorddefs = {
+'orders':[
+        ['BOTSID','M',256,'A'],
+        ],
+'order':[
+        ['BOTSID','M',256,'A'],
+        ['sender','M',13,'A'],
+        ['receiver','M',13,'A'],
+        ['ordernumber','M',17,'A'],
+        ['orderdate','M',8,'D'],
+        ['deliverydate','C',8,'D'],
+        ['buyer','C',13,'A'],
+        ['buyername','C',35,'A'],
+        ],
+'line':[
+        ['BOTSID','M',256,'A'],
+        ['linenumber','M',6,'N'],
+        ['ean','M',13,'A'],
+        ['description','C',35,'A'],
+        ['quantity','M',12,'R'],
+        ['price','C',12.2,'N'],
+        ],
+}
@@ -0,0 +1,16 @@
+''' benchmark mapping: csv orders to csv orders; all (benchmark) content is mapped.'''
+
+def main(inn,out):
+    out.ta_info['frompartner'] = inn.ta_info['frompartner']
+    out.ta_info['topartner'] = inn.ta_info['topartner']
+    for lin in inn.getloop({'BOTSID':'LIN'}):
+        out.putloop({'BOTSID':'LIN'}).put({'BOTSID':'LIN','SENDER':lin.get({'BOTSID':'LIN','SENDER':None}),
+                                                          'RECEIVER':lin.get({'BOTSID':'LIN','RECEIVER':None}),
+                                                          'ORDERNUMBER':lin.get({'BOTSID':'LIN','ORDERNUMBER':None}),
+                                                          'ORDERDATE':lin.get({'BOTSID':'LIN','ORDERDATE':None}),
+                                                          'BUYERNAME':lin.get({'BOTSID':'LIN','BUYERNAME':None}),
+                                                          'LINENUMBER':lin.get({'BOTSID':'LIN','LINENUMBER':None}),
+                                                          'EAN':lin.get({'BOTSID':'LIN','EAN':None}),
+                                                          'DESCRIPTION':lin.get({'BOTSID':'LIN','DESCRIPTION':None}),
+                                                          'QUANTITY':lin.get({'BOTSID':'LIN','QUANTITY':None}),
+                                                          'PRICE':lin.get({'BOTSID':'LIN','PRICE':None})})
@@ -0,0 +1,31 @@
+''' benchmark mapping: edifact ORDERS to edifact ORDERS; all (benchmark) content is mapped.'''
+
+def main(inn,out):
+    out.ta_info['frompartner'] = inn.ta_info['frompartner']
+    out.ta_info['topartner'] = inn.ta_info['topartner']
+    out.put({'BOTSID':'UNH','0062':inn.get({'BOTSID':'UNH','0062':None}),
+                            'S009.0065':'ORDERS','S009.0052':'D','S009.0054':'96A','S009.0051':'UN','S009.0057':'EAN008'})
+    out.put({'BOTSID':'UNH'},{'BOTSID':'BGM','C002.1001':inn.get({'BOTSID':'UNH'},{'BOTSID':'BGM','C002.1001':None}),
+                                            '1004':inn.get({'BOTSID':'UNH'},{'BOTSID':'BGM','1004':None}),
+                                            '1225':inn.get({'BOTSID':'UNH'},{'BOTSID':'BGM','1225':None})})
+    for dtm in inn.getloop({'BOTSID':'UNH'},{'BOTSID':'DTM'}):
+        out.putloop({'BOTSID':'UNH'},{'BOTSID':'DTM'}).put({'BOTSID':'DTM','C507.2005':dtm.get({'BOTSID':'DTM','C507.2005':None}),
+                                                                            'C507.2380':dtm.get({'BOTSID':'DTM','C507.2380':None}),
+                                                                            'C507.2379':dtm.get({'BOTSID':'DTM','C507.2379':None})})
+    for nad in inn.getloop({'BOTSID':'UNH'},{'BOTSID':'NAD'}):
+        out.putloop({'BOTSID':'UNH'},{'BOTSID':'NAD'}).put({'BOTSID':'NAD','3035':nad.get({'BOTSID':'NAD','3035':None}),
+                                                                            'C082.3039':nad.get({'BOTSID':'NAD','C082.3039':None}),
+                                                                            'C082.3055':nad.get({'BOTSID':'NAD','C082.3055':None})})
+    linecount = 0
+    for lin in inn.getloop({'BOTSID':'UNH'},{'BOTSID':'LIN'}):
+        linecount += 1
+        lou = out.putloop({'BOTSID':'UNH'},{'BOTSID':'LIN'})
+        lou.put({'BOTSID':'LIN','1082':lin.get({'BOTSID':'LIN','1082':None}),
+                                'C212.7140':lin.get({'BOTSID':'LIN','C212.7140':None}),
+                                'C212.7143':lin.get({'BOTSID':'LIN','C212.7143':None})})
+        lou.put({'BOTSID':'LIN'},{'BOTSID':'IMD','7077':'F','C273.7008':lin.get({'BOTSID':'LIN'},{'BOTSID':'IMD','C273.7008':None})})
+        lou.put({'BOTSID':'LIN'},{'BOTSID':'QTY','C186.6063':'21','C186.6060':lin.get({'BOTSID':'LIN'},{'BOTSID':'QTY','C186.6063':'21','C186.6060':None})})
+        lou.put({'BOTSID':'LIN'},{'BOTSID':'PRI','C509.5125':'AAA','C509.5118':lin.get({'BOTSID':'LIN'},{'BOTSID':'PRI','C509.5125':'AAA','C509.5118':None})})
+    out.put({'BOTSID':'UNH'},{'BOTSID':'UNS','0081':'S'})
+    out.put({'BOTSID':'UNH'},{'BOTSID':'CNT','C270.6069':'2','C270.6066':linecount})
+    out.put({'BOTSID':'UNH'},{'BOTSID':'UNT','0074':out.getcount()+1,'0062':out.get({'BOTSID':'UNH','0062':None})})
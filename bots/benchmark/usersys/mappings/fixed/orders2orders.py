@@ -0,0 +1,18 @@
+''' benchmark mapping: fixed orders to fixed orders; all (benchmark) content is mapped.'''
+
+def main(inn,out):
+    out.ta_info['frompartner'] = inn.ta_info['frompartner']
+    out.ta_info['topartner'] = inn.ta_info['topartner']
+    out.put({'BOTSID':'HEA','SENDER':inn.get({'BOTSID':'HEA','SENDER':None}),
+                            'RECEIVER':inn.get({'BOTSID':'HEA','RECEIVER':None}),
+                            'ORDERNUMBER':inn.get({'BOTSID':'HEA','ORDERNUMBER':None}),
+                            'ORDERDATE':inn.get({'BOTSID':'HEA','ORDERDATE':None}),
+                            'DELIVERYDATE':inn.get({'BOTSID':'HEA','DELIVERYDATE':None}),
+                            'BUYER':inn.get({'BOTSID':'HEA','BUYER':None}),
+                            'BUYERNAME':inn.get({'BOTSID':'HEA','BUYERNAME':None})})
+    for lin in inn.getloop({'BOTSID':'HEA'},{'BOTSID':'LIN'}):
+        out.putloop({'BOTSID':'HEA'},{'BOTSID':'LIN'}).put({'BOTSID':'LIN','LINENUMBER':lin.get({'BOTSID':'LIN','LINENUMBER':None}),
+                                                                            'EAN':lin.get({'BOTSID':'LIN','EAN':None}),
+                                                                            'DESCRIPTION':lin.get({'BOTSID':'LIN','DESCRIPTION':None}),
+                                                                            'QUANTITY':lin.get({'BOTSID':'LIN','QUANTITY':None}),
+                                                                            'PRICE':lin.get({'BOTSID':'LIN','PRICE':None})})
@@ -0,0 +1,18 @@
+''' benchmark mapping: json orders to json orders; all (benchmark) content is mapped.'''
+
+def main(inn,out):
+    out.ta_info['frompartner'] = inn.ta_info['frompartner']
+    out.ta_info['topartner'] = inn.ta_info['topartner']
+    out.put({'BOTSID':'orders'},{'BOTSID':'order','sender':inn.get({'BOTSID':'order','sender':None}),
+                                                'receiver':inn.get({'BOTSID':'order','receiver':None}),
+                                                'ordernumber':inn.get({'BOTSID':'order','ordernumber':None}),
+                                                'orderdate':inn.get({'BOTSID':'order','orderdate':None}),
+                                                'deliverydate':inn.get({'BOTSID':'order','deliverydate':None}),
+                                                'buyer':inn.get({'BOTSID':'order','buyer':None}),
+                                                'buyername':inn.get({'BOTSID':'order','buyername':None})})
+    for line in inn.getloop({'BOTSID':'order'},{'BOTSID':'line'}):
+        out.putloop({'BOTSID':'orders'},{'BOTSID':'order'},{'BOTSID':'line'}).put({'BOTSID':'line','linenumber':line.get({'BOTSID':'line','linenumber':None}),
+                                                                                                    'ean':line.get({'BOTSID':'line','ean':None}),
+                                                                                                    'description':line.get({'BOTSID':'line','description':None}),
+                                                                                                    'quantity':line.get({'BOTSID':'line','quantity':None}),
+                                                                                                    'price':line.get({'BOTSID':'line','price':None})})
@@ -0,0 +1,30 @@
+''' benchmark mapping: x12 850 to x12 850; all (benchmark) content is mapped.'''
+
+def main(inn,out):
+    out.ta_info['frompartner'] = inn.ta_info['frompartner']
+    out.ta_info['topartner'] = inn.ta_info['topartner']
+    out.put({'BOTSID':'ST','ST01':'850','ST02':inn.get({'BOTSID':'ST','ST02':None})})
+    out.put({'BOTSID':'ST'},{'BOTSID':'BEG','BEG01':'00','BEG02':'SA',
+                                            'BEG03':inn.get({'BOTSID':'ST'},{'BOTSID':'BEG','BEG03':None}),
+                                            'BEG05':inn.get({'BOTSID':'ST'},{'BOTSID':'BEG','BEG05':None})})
+    for dtm in inn.getloop({'BOTSID':'ST'},{'BOTSID':'DTM'}):
+        out.putloop({'BOTSID':'ST'},{'BOTSID':'DTM'}).put({'BOTSID':'DTM','DTM01':dtm.get({'BOTSID':'DTM','DTM01':None}),
+                                                                         'DTM02':dtm.get({'BOTSID':'DTM','DTM02':None})})
+    for n1 in inn.getloop({'BOTSID':'ST'},{'BOTSID':'N1'}):
+        out.putloop({'BOTSID':'ST'},{'BOTSID':'N1'}).put({'BOTSID':'N1','N101':n1.get({'BOTSID':'N1','N101':None}),
+                                                                        'N102':n1.get({'BOTSID':'N1','N102':None}),
+                                                                        'N103':n1.get({'BOTSID':'N1','N103':None}),
+                                                                        'N104':n1.get({'BOTSID':'N1','N104':None})})
+    linecount = 0
+    for po1 in inn.getloop({'BOTSID':'ST'},{'BOTSID':'PO1'}):
+        linecount += 1
+        pou = out.putloop({'BOTSID':'ST'},{'BOTSID':'PO1'})
+        pou.put({'BOTSID':'PO1','PO101':po1.get({'BOTSID':'PO1','PO101':None}),
+                                'PO102':po1.get({'BOTSID':'PO1','PO102':None}),
+                                'PO103':'EA',
+                                'PO104':po1.get({'BOTSID':'PO1','PO104':None}),
+                                'PO106':'EN',
+                                'PO107':po1.get({'BOTSID':'PO1','PO107':None})})
+        pou.put({'BOTSID':'PO1'},{'BOTSID':'PID','PID01':'F','PID05':po1.get({'BOTSID':'PO1'},{'BOTSID':'PID','PID05':None})})
+    out.put({'BOTSID':'ST'},{'BOTSID':'CTT','CTT01':linecount})
+    out.put({'BOTSID':'ST'},{'BOTSID':'SE','SE01':out.getcount()+1,'SE02':out.get({'BOTSID':'ST','ST02':None})})
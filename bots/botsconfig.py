@@ -35,6 +35,7 @@ QUERIES = 7
 SUBTRANSLATION = 8
 BOTSIDNR = 9
 F_LENGTH = 10         #length of fixed record
+FIELDINDEX = 11       #dict for lookup of field definitions by field ID
 
 #***grammar.recorddefs: dict keys for fields of record eg: record[FIELDS][ID] == 'C124.0034'
 #ID = 0 (is already defined)
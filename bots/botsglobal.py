@@ -8,5 +8,5 @@ settings = None         #django's settings.py
 usersysimportpath = None
 currentrun = None       #needed for minta4query
 routeid = ''            #current route. This is used to set routeid for Processes.
-confirmrules = []       #confirmrules are read into memory at start of run
+confirmrules = {}       #confirmrules are read into memory at start of run; indexed per confirmtype (see botslib.prepare_confirmrules)
 not_import = set()      #register modules that are not importable
@@ -95,12 +95,14 @@ def generalinit(configdir):
     botsglobal.ini.set('directories','botssys',botslib.join(botssys))   #use absolute path
     botsglobal.ini.set('directories','data',botslib.join(botssys,'data'))
     botsglobal.ini.set('directories','logging',botslib.join(botssys,'logging'))
+    botsglobal.ini.set('directories','dataindex',botslib.join(botssys,'dataindex'))
     ############################################################################
     #other inits##############################################################
     if botsglobal.ini.get('webserver','environment','development') != 'development':   #values in bots.ini are also used in setting up cherrypy
         logging.raiseExceptions = 0     # during production: if errors occurs in writing to log: ignore error. (leads to a missing log line, better than error;-).
     botslib.dirshouldbethere(botsglobal.ini.get('directories','data'))
     botslib.dirshouldbethere(botsglobal.ini.get('directories','logging'))
+    botslib.dirshouldbethere(botsglobal.ini.get('directories','dataindex'))
     initbotscharsets()  #initialise bots charsets
     node.Node.checklevel = botsglobal.ini.getint('settings','get_checklevel',1)
     botslib.settimeout(botsglobal.ini.getint('settings','globaltimeout',10))
@@ -194,7 +196,7 @@ def initenginelogging(logname):
     handler.doRollover()   #each run a new log file is used; old one is rotated
     logger.addHandler(handler)
     #initialise file logging: logger for trace of mapping; tried to use filters but got this not to work.....
-    botsglobal.logmap = logging.getLogger('engine.map')
+    botsglobal.logmap = logging.getLogger(logname + '.map')
     if not botsglobal.ini.getboolean('settings','mappingdebug',False):
         botsglobal.logmap.setLevel(logging.CRITICAL)
     #logger for reading edifile. is now used only very limited (1 place); is done with 'if'
@@ -3,6 +3,7 @@ import sys
 import os
 import time
 import codecs
+import hashlib
 import traceback
 import socket
 import urlparse
@@ -39,20 +40,38 @@ class _Transaction(object):
     filterlist = ('statust','status','divtext','parent','child','script','frompartner','topartner','fromchannel','tochannel','editype','messagetype','merge',
                 'testindicator','reference','frommail','tomail','contenttype','errortext','filename','charset','alt','idroute','nrmessages','retransmit',
                 'confirmasked','confirmed','confirmtype','confirmidta','envelope','botskey','cc','rsrv1','filesize','numberofresends','rsrv3')
+    #values copied from old transaction in copyta (if not in parameters for new transaction).
+    copylist = ('frompartner','topartner','fromchannel','tochannel','editype','messagetype','alt','merge','testindicator','reference','frommail','tomail',
+                'charset','contenttype','filename','idroute','nrmessages','botskey','envelope','rsrv3')
     processlist = [0]  #stack for bots-processes. last one is the current process; starts with 1 element in list: root
+    #batching of db-changes for transactions (see batch_transactions)
+    batchlevel = 0          #>0: batching is active
+    pendingupdates = {}     #updates not yet written to db: idta -> dict with values
+    uncommitted = 0         #number of db-changes not yet committed
 
     def update(self,**ta_info):
         ''' Updates db-ta with named-parameters/dict.
             Use a filter to update only valid fields in db-ta
+            When batching: the update is kept in memory (merged with earlier updates for this ta) and written later.
         '''
-        setstring = ','.join([key+'=%('+key+')s' for key in ta_info if key in self.filterlist])
-        if not setstring:   #nothing to update
+        updatedict = dict((key,value) for key,value in ta_info.iteritems() if key in self.filterlist)
+        if not updatedict:   #nothing to update
             return
-        ta_info['selfid'] = self.idta
+        if _Transaction.batchlevel:
+            if self.idta in _Transaction.pendingupdates:
+                _Transaction.pendingupdates[self.idta].update(updatedict)
+            else:
+                _Transaction.pendingupdates[self.idta] = updatedict
+                _Transaction.uncommitted += 1
+                if _Transaction.uncommitted >= botsglobal.ini.getint('settings','transactionbatchsize',100):
+                    flush_transactions()
+            return
+        setstring = ','.join([key+'=%('+key+')s' for key in updatedict])
+        updatedict['selfid'] = self.idta
         changeq(u'''UPDATE ta
                     SET '''+setstring+ '''
                     WHERE idta=%(selfid)s''',
-                    ta_info)
+                    updatedict)
 
     def delete(self):
         '''Deletes current transaction '''
@@ -88,17 +107,30 @@ class _Transaction(object):
 
     def copyta(self,status,**ta_info):
         ''' copy old transaction, return new transaction.
-            parameters for new transaction are in ta_info (new transaction is updated with these values).
+            parameters for new transaction are in ta_info; other values are copied from old transaction (copylist).
+            done in one INSERT.
         '''
-        script = _Transaction.processlist[-1]
-        newidta = insertta(u'''INSERT INTO ta (script,  status,     parent,frompartner,topartner,fromchannel,tochannel,editype,messagetype,alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,nrmessages,botskey,envelope,rsrv3)
-                                SELECT %(script)s,%(newstatus)s,idta,frompartner,topartner,fromchannel,tochannel,editype,messagetype,alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,nrmessages,botskey,envelope,rsrv3
+        if self.idta in _Transaction.pendingupdates:    #old transaction should be up-to-date in db before copying
+            _writeupdates()
+        newvalues = {'script':_Transaction.processlist[-1]}
+        newvalues.update((key,value) for key,value in ta_info.iteritems() if key in self.filterlist)
+        newvalues['status'] = status
+        columns = newvalues.keys()
+        selects = ['%('+key+')s' for key in columns]
+        if 'parent' not in newvalues:
+            columns.append('parent')
+            selects.append('idta')
+        for key in self.copylist:
+            if key not in newvalues:
+                columns.append(key)
+                selects.append(key)
+        newvalues['selfid'] = self.idta
+        newidta = insertta(u'''INSERT INTO ta (''' + ','.join(columns) + ''')
+                                SELECT ''' + ','.join(selects) + '''
                                 FROM ta
-                                WHERE idta=%(idta)s''',
-                                {'idta':self.idta,'script':script,'newstatus':status})
-        newta = OldTransaction(newidta)
-        newta.update(**ta_info)
-        return newta
+                                WHERE idta=%(selfid)s''',
+                                newvalues)
+        return OldTransaction(newidta)
 
 
 class OldTransaction(_Transaction):
@@ -196,8 +228,87 @@ def updateinfo(change,where):
 def changestatustinfo(change,where):
     return updateinfo({'statust':change},where)
 
+def batch_transactions(func):
+    ''' used as decorator.
+        db-changes for transactions (ta) in the decorated function are batched: updates are kept in memory and written with executemany;
+        commits are done every 'transactionbatchsize' changes (bots.ini) instead of after each change.
+        Other changes still commit at once, and commit the batch before: changeq (eg persist, deletechildren) and unique counters.
+        In translation this is one commit per translated message (for unique 'messagecounter').
+        At end of function (also when errors) everything is written and committed.
+        If bots-engine crashes the db is as at last commit: consistent for crash recovery.
+    '''
+    def wrapper(*args,**argv):
+        _Transaction.batchlevel += 1
+        try:
+            return func(*args,**argv)
+        finally:
+            _Transaction.batchlevel -= 1
+            if not _Transaction.batchlevel:
+                flush_transactions()
+    wrapper.__name__ = func.__name__    #name is used by log_session for the process
+    return wrapper
+
+def flush_transactions():
+    ''' write pending updates of transactions to db and commit.
+    '''
+    _writeupdates()
+    if _Transaction.uncommitted:
+        _Transaction.uncommitted = 0
+        botsglobal.db.commit()
+
+def _writeupdates():
+    ''' write pending updates of transactions to db, no commit. Updates with same fields are written with one executemany.
+    '''
+    if _Transaction.pendingupdates:
+        updatesperfields = collections.defaultdict(list)
+        for idta,updatedict in _Transaction.pendingupdates.iteritems():
+            updatedict['selfid'] = idta
+            updatesperfields[tuple(sorted(updatedict))].append(updatedict)
+        _Transaction.pendingupdates = {}
+        cursor = botsglobal.db.cursor()
+        for keys,updatedicts in updatesperfields.iteritems():
+            setstring = ','.join([key+'=%('+key+')s' for key in keys if key != 'selfid'])
+            cursor.executemany(u'''UPDATE ta
+                                  SET '''+setstring+ '''
+                                  WHERE idta=%(selfid)s''',
+                                  updatedicts)
+        cursor.close()
+
+def _commit():
+    ''' commit db-change; when batching only every 'transactionbatchsize' changes.
+    '''
+    if _Transaction.batchlevel:
+        _Transaction.uncommitted += 1
+        if _Transaction.uncommitted < botsglobal.ini.getint('settings','transactionbatchsize',100):
+            return
+        flush_transactions()
+    else:
+        botsglobal.db.commit()
+
+def translateworkers():
+    ''' number of worker processes for translation (bots.ini); 1 is no worker processes.
+        with SQLite only one process at a time can change the database, so no workers.
+        no workers in acceptance tests: unique numbers are per process (unique_runcounter).
+    '''
+    workers = botsglobal.ini.getint('settings','translateworkers',1)
+    if workers > 1 and (botsglobal.settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' or
+                        botsglobal.ini.getboolean('acceptance','runacceptancetest',False)):
+        return 1
+    return workers
+
+def routeworkers():
+    ''' number of worker processes for independent groups of routes (bots.ini); 1 is no worker processes.
+        as translateworkers: no workers for SQLite; no workers in acceptance tests (unique numbers are per process).
+    '''
+    workers = botsglobal.ini.getint('settings','routeworkers',1)
+    if workers > 1 and (botsglobal.settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' or
+                        botsglobal.ini.getboolean('acceptance','runacceptancetest',False)):
+        return 1
+    return workers
+
 def query(querystring,*args):
     ''' general query. yields rows from query '''
+    _writeupdates()     #query should see all changes
     cursor = botsglobal.db.cursor()
     cursor.execute(querystring,*args)
     results =  cursor.fetchall()
@@ -207,6 +318,7 @@ def query(querystring,*args):
 
 def changeq(querystring,*args):
     '''general inset/update. no return'''
+    flush_transactions()    #when batching: write and commit before; a rollback should not undo the batched changes.
     cursor = botsglobal.db.cursor()
     try:
         cursor.execute(querystring,*args)
@@ -218,20 +330,119 @@ def changeq(querystring,*args):
     cursor.close()
     return terug
 
+def changemany(querystring,listofargs):
+    ''' general insert/update of many rows with one executemany; one commit. no return'''
+    flush_transactions()
+    cursor = botsglobal.db.cursor()
+    try:
+        cursor.executemany(querystring,listofargs)
+    except:
+        botsglobal.db.rollback()
+        raise
+    botsglobal.db.commit()
+    cursor.close()
+
 def insertta(querystring,*args):
     ''' insert ta
         from insert get back the idta; this is different with postgrSQL.
     '''
     cursor = botsglobal.db.cursor()
-    cursor.execute(querystring,*args)
-    newidta = cursor.lastrowid
-    if not newidta:   #if botsglobal.settings.DATABASE_ENGINE ==
-        cursor.execute('''SELECT lastval() as idta''')
+    if botsglobal.settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql_psycopg2':
+        cursor.execute(querystring + u''' RETURNING idta''',*args)   #get idta in same round-trip
         newidta = cursor.fetchone()['idta']
-    botsglobal.db.commit()
+    else:
+        cursor.execute(querystring,*args)
+        newidta = cursor.lastrowid
+        if not newidta:
+            cursor.execute('''SELECT lastval() as idta''')
+            newidta = cursor.fetchone()['idta']
+    _commit()
     cursor.close()
     return newidta
 
+class _LookupCache(object):
+    ''' cache for lookups in user tables ccode and partner (eg by transform.ccode).
+        mapping scripts do the same lookups again and again (eg per line item); cache saves the round trips to the database.
+        - scope 'run': cache is emptied at start of each run (default); changes in GUI are seen in next run.
+        - scope 'process': cache is kept during the whole bots-engine; emptied at start of a run if ccode/partner is changed via django
+          (counter 'bots_lookupchanges' in uniek, see models.py).
+        - least recently used lookups are dropped if number of lookups in cache is more than 'lookupcachesize'; 0 is no cache.
+        - a ccodeid can be preloaded: all codes in one query.
+        hits and misses are counted per run and written in the run report.
+    '''
+    def __init__(self):
+        self.maxsize = None     #None: settings from bots.ini not read yet
+        self.scope = 'run'
+        self.changecounter = None
+        self.clear()
+        self.hits = self.misses = 0
+
+    def configure(self):
+        self.maxsize = botsglobal.ini.getint('settings','lookupcachesize',10000)
+        self.scope = botsglobal.ini.get('settings','lookupcachescope','run')
+
+    def clear(self):
+        self.entries = collections.OrderedDict()
+        self.preloaded = {}
+
+    def newrun(self):
+        ''' called at start of each run.'''
+        self.configure()
+        if self.scope == 'process':
+            changecounter = self.getchangecounter()
+            if changecounter != self.changecounter:
+                self.clear()
+                self.changecounter = changecounter
+        else:
+            self.clear()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def getchangecounter():
+        ''' number of changes in ccode/partner made via django.'''
+        for row in query(u'''SELECT nummer FROM uniek WHERE domein='bots_lookupchanges' '''):
+            return row['nummer']
+        return 0
+
+    def query(self,querystring,querydict,field):
+        ''' returns list of values for field in the rows of the query; from cache if possible.'''
+        if self.maxsize is None:
+            self.configure()
+        if not self.maxsize:
+            return [row[field] for row in query(querystring,querydict)]
+        key = (querystring,tuple(sorted(querydict.items())))
+        try:
+            terug = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            terug = [row[field] for row in query(querystring,querydict)]
+            if len(self.entries) >= self.maxsize:
+                self.entries.popitem(last=False)    #remove least recently used lookup
+        else:
+            self.hits += 1
+        self.entries[key] = terug       #(re-)insert as most recently used
+        return terug
+
+    def preload(self,key,keyfields,querystring,querydict):
+        ''' read all rows of query in one time; rows are indexed on each of the keyfields.'''
+        indexes = dict((keyfield,{}) for keyfield in keyfields)
+        for row in query(querystring,querydict):
+            row = dict(row)
+            for keyfield in keyfields:
+                indexes[keyfield].setdefault(row[keyfield],[]).append(row)
+        for keyfield in keyfields:
+            self.preloaded[(key,keyfield)] = indexes[keyfield]
+
+    def lookup_preloaded(self,key,keyfield,value,field):
+        ''' returns list of values for field if preloaded, else None.'''
+        index = self.preloaded.get((key,keyfield))
+        if index is None:
+            return None
+        self.hits += 1
+        return [row[field] for row in index.get(value,[])]
+
+lookupcache = _LookupCache()
+
 def unique_runcounter(domain,updatewith=None):
     ''' as unique, but per run of bots-engine.
     '''
@@ -259,6 +470,8 @@ def unique(domein,updatewith=None):
     else:
         cursor = botsglobal.db.cursor()
         try:
+            #lock the row till commit: processes running at the same time (see router) do not get the same number
+            cursor.execute(u'''UPDATE uniek SET nummer=nummer WHERE domein=%(domein)s''',{'domein':domein})
             cursor.execute(u'''SELECT nummer FROM uniek WHERE domein=%(domein)s''',{'domein':domein})
             nummer = cursor.fetchone()['nummer']
             if updatewith is None:
@@ -429,7 +642,11 @@ def join(*paths):
 
 def dirshouldbethere(path):
     if path and not os.path.exists(path):
-        os.makedirs(path)
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):     #directory can be made at the same time by other thread/process
+                raise
         return True
     return False
 
@@ -460,6 +677,8 @@ def deldata(filename):
 
 def opendata(filename,mode,charset=None,errors='strict'):
     ''' open internal data file. if no encoding specified: read file raw/binary.'''
+    if 'w' in mode and '/' not in filename:
+        indexdata(filename)
     filename = abspathdata(filename)
     if 'w' in mode:
         dirshouldbethere(os.path.dirname(filename))
@@ -468,6 +687,22 @@ def opendata(filename,mode,charset=None,errors='strict'):
     else:
         return open(filename,mode)
 
+_dataindex = {'day':None,'filehandler':None}
+def indexdata(filename):
+    ''' add (internal) data file to the index of data files; used by cleanup to delete data files without scanning all data directories.
+        there is an index file per day (name is date of day, eg 20140101); an index file contains the data files written that day, one per line.
+        index files are appended to: several bots-engines can write to same index file.
+    '''
+    day = time.strftime('%Y%m%d')
+    if _dataindex['day'] != day:
+        if _dataindex['filehandler'] is not None:
+            _dataindex['filehandler'].close()
+        directory = botsglobal.ini.get('directories','dataindex')
+        dirshouldbethere(directory)
+        _dataindex['filehandler'] = open(join(directory,day),'ab',0)  #unbuffered: each line is written at once
+        _dataindex['day'] = day
+    _dataindex['filehandler'].write(filename + '\n')
+
 def readdata(filename,charset=None,errors='strict'):
     ''' read internal data file in memory using the right encoding or no encoding'''
     filehandler = opendata(filename,'rb',charset,errors)
@@ -511,20 +746,29 @@ def runscriptyield(module,modulefile,functioninscript,**argv):
 #**********************************************************/**
 #*************** confirmrules *****************************/**
 #**********************************************************/**
+#for each ruletype of confirmrule: the field in confirmrule/argument of checkconfirmrules that is matched
+CONFIRMRULEFIELDS = (('route','idroute'),('channel','idchannel'),('frompartner','frompartner'),('topartner','topartner'),('messagetype','messagetype'))
+
 def prepare_confirmrules():
-    ''' as confirmrules are often used, read these into memory. Reason: performance.
-        additional notes:
-        - there are only a few confirmrules (10 would be a lot I guess).
-        - indexing is not helpfull for confirmrules, this means that each time the whole confirmrule-tabel is scanned.
-        - as confirmrules are used for incoming and outgoing (x12, edifact, email) this will almost always lead to better performance. 
+    ''' as confirmrules are often used (for each message in x12, edifact, email), read these into memory and index them. Reason: performance.
+        botsglobal.confirmrules: confirmtype -> (positive rules, negative rules)
+        each is a set of (ruletype,value); for ruletype 'all' value is None.
     '''
+    botsglobal.confirmrules = {}
     for confirmdict in query(u'''SELECT confirmtype,ruletype,idroute,idchannel_id as idchannel,frompartner_id as frompartner,topartner_id as topartner,messagetype,negativerule
                         FROM confirmrule
                         WHERE active=%(active)s
-                        ORDER BY negativerule ASC
                         ''',
                         {'active':True}):
-        botsglobal.confirmrules.append(confirmdict)
+        positiverules,negativerules = botsglobal.confirmrules.setdefault(confirmdict['confirmtype'],(set(),set()))
+        rules = negativerules if confirmdict['negativerule'] else positiverules
+        if confirmdict['ruletype'] == 'all':
+            rules.add(('all',None))
+        else:
+            for ruletype,field in CONFIRMRULEFIELDS:
+                if confirmdict['ruletype'] == ruletype:
+                    rules.add((ruletype,confirmdict[field]))
+                    break
 
 def set_asked_confirmrules(routedict,rootidta):
     ''' set 'ask confirmation/acknowledgements for x12 and edifact
@@ -557,37 +801,28 @@ def set_asked_confirmrules(routedict,rootidta):
 def globalcheckconfirmrules(confirmtype):
     ''' global check if confirmrules with this confirmtype is uberhaupt used. 
     '''
-    for confirmdict in botsglobal.confirmrules:
-        if confirmdict['confirmtype'] == confirmtype:
-            return True
-    return False
+    return confirmtype in botsglobal.confirmrules
 
 def checkconfirmrules(confirmtype,**kwargs):
-    confirm = False       #boolean to return: confirm of not?
-    #confirmrules are evaluated one by one; first the positive rules, than the negative rules.
-    #this make it possible to include first, than exclude. Eg: send for 'all', than exclude certain partners.
-    for confirmdict in botsglobal.confirmrules:
-        if confirmdict['confirmtype'] != confirmtype:
-            continue
-        if confirmdict['ruletype'] == 'all':
-            confirm = not confirmdict['negativerule']
-        elif confirmdict['ruletype'] == 'route':
-            if 'idroute' in kwargs and confirmdict['idroute'] == kwargs['idroute']:
-                confirm = not confirmdict['negativerule']
-        elif confirmdict['ruletype'] == 'channel':
-            if 'idchannel' in kwargs and confirmdict['idchannel'] == kwargs['idchannel']:
-                confirm = not confirmdict['negativerule']
-        elif confirmdict['ruletype'] == 'frompartner':
-            if 'frompartner' in kwargs and confirmdict['frompartner'] == kwargs['frompartner']:
-                confirm = not confirmdict['negativerule']
-        elif confirmdict['ruletype'] == 'topartner':
-            if 'topartner' in kwargs and confirmdict['topartner'] == kwargs['topartner']:
-                confirm = not confirmdict['negativerule']
-        elif confirmdict['ruletype'] == 'messagetype':
-            if 'messagetype' in kwargs and confirmdict['messagetype'] == kwargs['messagetype']:
-                confirm = not confirmdict['negativerule']
-        #~ print '>>>>>>>>>>>>', confirm,confirmtype,kwargs,confirmdict
-    return confirm
+    ''' returns True if confirm (send or ask acknowledgement).
+        first the positive rules are checked, than the negative rules.
+        this make it possible to include first, than exclude. Eg: send for 'all', than exclude certain partners.
+        so: confirm if a positive rule matches and no negative rule matches.
+    '''
+    if confirmtype not in botsglobal.confirmrules:
+        return False
+    positiverules,negativerules = botsglobal.confirmrules[confirmtype]
+    keys = [('all',None)]       #(ruletype,value) that match for these arguments
+    for ruletype,field in CONFIRMRULEFIELDS:
+        if field in kwargs:
+            keys.append((ruletype,kwargs[field]))
+    for key in keys:
+        if key in negativerules:
+            return False
+    for key in keys:
+        if key in positiverules:
+            return True
+    return False
 
 #**********************************************************/**
 #***************###############  misc.   #############
@@ -763,6 +998,41 @@ def indent_xml(node, level=0,indentstring='    '):
         if level and (not node.tail or not node.tail.strip()):
             node.tail = text2indent
 
+
+TRANSFERCHUNKSIZE = 1048576     #chunk size for file transfers in communication
+
+class ChecksumFile(object):
+    ''' wrapper for file object: counts size and calculates md5-checksum of what is read or written.
+        used in communication: files are transferred in chunks, size and checksum are known at end of transfer.
+    '''
+    def __init__(self,filehandler):
+        self.filehandler = filehandler
+        self.size = 0
+        self.md5 = hashlib.md5()
+
+    def read(self,*args):
+        data = self.filehandler.read(*args)
+        self.size += len(data)
+        self.md5.update(data)
+        return data
+
+    def readline(self,*args):
+        data = self.filehandler.readline(*args)
+        self.size += len(data)
+        self.md5.update(data)
+        return data
+
+    def write(self,data):
+        self.filehandler.write(data)
+        self.size += len(data)
+        self.md5.update(data)
+
+    def checksum(self):
+        return self.md5.hexdigest()
+
+    def __getattr__(self,name):     #other methods/attributes (close, fileno, etc) are those of file object
+        return getattr(self.filehandler,name)
+
     
 class Uri(object):
     ''' generate uri from parts/components
@@ -38,3 +38,5 @@ class BotsCursor(sqlite.Cursor):
         else:
             sqlite.Cursor.execute(self,reformatparamstyle.sub(u''':\g<name>''',string),parameters)
 
+    def executemany(self,string,seq_of_parameters):
+        sqlite.Cursor.executemany(self,reformatparamstyle.sub(u''':\g<name>''',string),seq_of_parameters)
@@ -9,6 +9,7 @@ from django.utils.translation import ugettext as _
 import botslib
 import botsglobal
 #~ from botsconfig import *
+CLEANUPDOMAIN = 'bots_cleanup_maxidta'   #in table uniek: cleanup of transactions not finished; delete up to this idta in next run
 
 
 def cleanup(do_cleanup_parameter,userscript,scriptname):
@@ -29,6 +30,9 @@ def cleanup(do_cleanup_parameter,userscript,scriptname):
             do_full_cleanup = False
     else:
         do_full_cleanup = False
+    #cleanup of transactions has a time budget; if not finished, continue in next run.
+    maxseconds = botsglobal.ini.getint('settings','cleanupmaxseconds',0)
+    deadline = time.time() + maxseconds if maxseconds > 0 else None
     try:
         if do_full_cleanup:
             botsglobal.logger.info(u'Cleanup files')
@@ -37,21 +41,49 @@ def cleanup(do_cleanup_parameter,userscript,scriptname):
             botsglobal.logger.info(u'Cleanup database')
             _cleanupsession()
             _cleanpersist()
-            _cleantransactions()
-            botsglobal.logger.info(u'Vacuum database')
-            _vacuum()
+            if _cleantransactions(deadline):
+                botsglobal.logger.info(u'Vacuum database')
+                _vacuum(deadline)
             # postcleanup user exit in botsengine script
             botslib.tryrunscript(userscript,scriptname,'postcleanup',whencleanup=whencleanup)
             botsglobal.logger.info(u'Done full cleanup.')
+        elif _getcleanupprogress():
+            botsglobal.logger.info(u'Continue cleanup database')
+            if _cleantransactions(deadline,resume=True):
+                _vacuum(deadline)
         _cleanrunsnothingreceived()          #do this every run, but not logged
     except:
         botsglobal.logger.exception(u'Cleanup error.')
 
 
-def _vacuum():
-    ''' Do VACUUM on sqlite database.'''
-    if botsglobal.settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
-        botsglobal.db.execute('''VACUUM''')
+def _vacuum(deadline):
+    ''' give free space in database back/update statistics after deleting old transactions.
+        sqlite: database uses incremental auto_vacuum; free pages are released in steps until deadline.
+                for a database without auto_vacuum: auto_vacuum is set to incremental, this needs one (last) full VACUUM.
+                a full VACUUM can not be stopped at deadline, so this is not done if there is a deadline (cleanupmaxseconds).
+        postgreSQL, MySQL: update statistics of tables (ANALYZE); space is reused by database itself (autovacuum for postgreSQL).
+    '''
+    engine = botsglobal.settings.DATABASES['default']['ENGINE']
+    if engine == 'django.db.backends.sqlite3':
+        if botsglobal.db.execute('''PRAGMA auto_vacuum''').fetchone()[0] == 0:     #0: NONE, 1: FULL, 2: INCREMENTAL
+            if deadline is not None:
+                botsglobal.logger.info(u'Vacuum database: no vacuum, as database does not use incremental vacuum and cleanupmaxseconds is set.')
+                return
+            botsglobal.logger.info(u'Vacuum database: set database to incremental vacuum; this takes some time (once).')
+            botsglobal.db.execute('''PRAGMA auto_vacuum = INCREMENTAL''')
+            botsglobal.db.execute('''VACUUM''')
+            return
+        while botsglobal.db.execute('''PRAGMA freelist_count''').fetchone()[0]:
+            botsglobal.db.execute('''PRAGMA incremental_vacuum(1000)''').fetchall()   #release 1000 pages per step; fetchall: else only one page is released
+            if deadline is not None and time.time() > deadline:
+                break
+    elif engine == 'django.db.backends.postgresql_psycopg2':
+        botslib.changeq('''ANALYZE ta''')
+        botslib.changeq('''ANALYZE filereport''')
+        botslib.changeq('''ANALYZE report''')
+    elif engine == 'django.db.backends.mysql':
+        for row in botslib.query('''ANALYZE TABLE ta,filereport,report'''):     #gives result rows; these are not used
+            pass
 
 
 def _cleanupsession():
@@ -82,8 +114,13 @@ def _cleanarchive():
 
 
 def _cleandatafile():
-    ''' delete all data files older than xx days.'''
+    ''' delete all data files older than xx days.
+        first data files are deleted via the index of data files (see botslib.indexdata).
+        after that data directories are checked for data files not in the index (eg written by user scripts, or before there was an index).
+        this is fast, as the data directories with only indexed data files are already removed.
+    '''
     vanaf = time.time() - (botsglobal.ini.getint('settings','maxdays',30) * 3600 * 24)
+    _cleandataindex(time.strftime('%Y%m%d',time.localtime(vanaf)))
     frompath = botslib.join(botsglobal.ini.get('directories','data','botssys/data'),'*')
     for filename in glob.iglob(frompath):
         statinfo = os.stat(filename)
@@ -113,28 +150,100 @@ def _cleandatafile():
                     botsglobal.logger.exception(_(u'Cleanup could not remove directory'))
 
 
+def _cleandataindex(vanafday):
+    ''' delete the data files in the index files of the days before vanafday; the index file itself is deleted after this.
+        data directories are removed when empty (os.rmdir fails for a directory that still contains data files).
+    '''
+    for indexfile in sorted(glob.glob(botslib.join(botsglobal.ini.get('directories','dataindex'),'*'))):
+        if os.path.basename(indexfile) >= vanafday:
+            break
+        directories = set()
+        filehandler = open(indexfile,'rb')
+        for filename in filehandler:
+            filename = filename.strip()
+            if not filename:
+                continue
+            absfilename = botslib.abspathdata(filename)
+            try:
+                os.remove(absfilename)
+            except OSError:
+                pass    #data file is already deleted
+            directories.add(os.path.dirname(absfilename))
+        filehandler.close()
+        for directory in directories:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass    #directory is not empty: contains data files of later days
+        try:
+            os.remove(indexfile)
+        except:
+            botsglobal.logger.exception(_(u'Cleanup could not remove file'))
+
+
 def _cleanpersist():
     '''delete all persist older than xx days.'''
     vanaf = datetime.datetime.today() - datetime.timedelta(days=botsglobal.ini.getint('settings','maxdayspersist',30))
     botslib.changeq('''DELETE FROM persist WHERE ts < %(vanaf)s''',{'vanaf':vanaf})
 
 
-def _cleantransactions():
+def _cleantransactions(deadline,resume=False):
     ''' delete records from report, filereport and ta.
         best indexes are on idta/reportidta; this should go fast.
+        deleting is done in chunks of (max) cleanupchunksize rows, each chunk is committed: database is not locked for a long time.
+        if deadline is passed: stop, store progress and continue in next run.
+        returns True if cleanup is finished.
     '''
-    vanaf = datetime.datetime.today() - datetime.timedelta(days=botsglobal.ini.getint('settings','maxdays',30))
-    for row in botslib.query('''SELECT MAX(idta) as max_idta FROM report WHERE ts < %(vanaf)s''',{'vanaf':vanaf}):
-        maxidta = row['max_idta']
-    if maxidta is None:   #if there is no maxidta to delete, do nothing
-        return
-    botslib.changeq('''DELETE FROM report WHERE idta < %(maxidta)s''',{'maxidta':maxidta})
-    botslib.changeq('''DELETE FROM filereport WHERE idta < %(maxidta)s''',{'maxidta':maxidta})
-    botslib.changeq('''DELETE FROM ta WHERE idta < %(maxidta)s''',{'maxidta':maxidta})
+    if resume:
+        maxidta = _getcleanupprogress()
+    else:
+        vanaf = datetime.datetime.today() - datetime.timedelta(days=botsglobal.ini.getint('settings','maxdays',30))
+        for row in botslib.query('''SELECT MAX(idta) as max_idta FROM report WHERE ts < %(vanaf)s''',{'vanaf':vanaf}):
+            maxidta = row['max_idta']
+        maxidta = max(maxidta or 0,_getcleanupprogress())     #an unfinished cleanup is included
+        if not maxidta:   #if there is no maxidta to delete, do nothing
+            return True
+    _setcleanupprogress(maxidta)
+    for table in ['report','filereport','ta']:
+        if not _deletechunks(table,maxidta,deadline):
+            botsglobal.logger.info(u'Cleanup of database not finished in time; continues in next run.')
+            return False
+    _setcleanupprogress(0)
+    return True
     #the most recent run that is older than maxdays is kept (using < instead of <=).
     #Reason: when deleting in ta this would leave the ta-records of the most recent run older than maxdays (except the first ta-record).
     #this will not lead to problems.
 
+def _deletechunks(table,maxidta,deadline):
+    ''' delete records with idta < maxidta, in chunks of (max) cleanupchunksize rows, starting with lowest idta.
+        returns True if all is deleted; False if deadline is passed.
+    '''
+    chunksize = botsglobal.ini.getint('settings','cleanupchunksize',10000)
+    while True:
+        #upper limit of chunk: the idta chunksize rows further, or maxidta
+        upperidta = maxidta
+        for row in botslib.query('''SELECT idta FROM ''' + table + '''
+                                    WHERE idta < %(maxidta)s
+                                    ORDER BY idta
+                                    LIMIT 1 OFFSET %(chunksize)s''',
+                                    {'maxidta':maxidta,'chunksize':chunksize}):
+            upperidta = row['idta']
+        botslib.changeq('''DELETE FROM ''' + table + ''' WHERE idta < %(upperidta)s''',{'upperidta':upperidta})
+        if upperidta == maxidta:
+            return True
+        if deadline is not None and time.time() > deadline:
+            return False
+
+def _getcleanupprogress():
+    ''' returns idta up to which transactions are still to be deleted (cleanup of transactions was not finished); 0 if nothing to do.'''
+    for row in botslib.query('''SELECT nummer FROM uniek WHERE domein=%(domein)s''',{'domein':CLEANUPDOMAIN}):
+        return row['nummer']
+    return 0
+
+def _setcleanupprogress(maxidta):
+    if not botslib.changeq('''UPDATE uniek SET nummer=%(nummer)s WHERE domein=%(domein)s''',{'domein':CLEANUPDOMAIN,'nummer':maxidta}):
+        botslib.changeq('''INSERT INTO uniek (domein,nummer) VALUES (%(domein)s,%(nummer)s)''',{'domein':CLEANUPDOMAIN,'nummer':maxidta})
+
 
 def _cleanrunsnothingreceived():
     ''' delete all report off new runs that received no files and no process errors.
@@ -7,6 +7,10 @@ import glob
 import shutil
 import fnmatch
 import zipfile
+import base64
+import copy
+import threading
+import Queue
 if os.name == 'nt':
     import msvcrt
 elif os.name == 'posix':
@@ -88,6 +92,22 @@ def run(idchannel,command,idroute,rootidta=None):
         raise botslib.CommunicationError(_(u'Channel "%(idchannel)s" is unknown.'),{'idchannel':idchannel})
 
 
+#*********************************************************************
+#*** pool of connections: a connection (eg to ftp-server) is not closed after communication, but is kept for reuse by other channels
+#*** in the same run (same type of channel, host, port, user, etc).
+#*** bots.ini: connectionpooltimeout. All connections are closed at end of run (see router.rundispatcher).
+#*********************************************************************
+_connectionpool = {}    #key -> (communication session with open connection, time last used)
+
+def closeconnectionpool():
+    ''' close all connections in connection pool. Errors are ignored.'''
+    while _connectionpool:
+        comsession,lastused = _connectionpool.popitem()[1]
+        try:
+            comsession.disconnect()
+        except:
+            pass
+
 class _comsession(object):
     ''' Abstract class for communication-session. Use only subclasses.
         Subclasses are called by dispatcher function 'run'
@@ -105,16 +125,16 @@ class _comsession(object):
     def run(self):
         if self.channeldict['inorout'] == 'out':
             self.precommunicate()
-            self.connect()
+            self.connectpooled()
             self.outcommunicate()
-            self.disconnect()
+            self.disconnectpooled()
             self.archive()
         else:   #incommunication
             if self.command == 'new': #only in-communicate for new run
                 #handle maxsecondsperchannel: use global value from bots.ini unless specified in channel. (In database this is field 'rsrv2'.)
                 self.maxsecondsperchannel = botsglobal.ini.getint('settings','maxsecondsperchannel',sys.maxint) if self.channeldict['rsrv2'] <= 0 else self.channeldict['rsrv2']
                 try:
-                    self.connect()
+                    self.connectpooled()
                 except:     #in-connection failed. note that no files are received yet. useful if scheduled quite often, and you do nto want error-report eg when server is down. 
                     #max_nr_retry : get this from channel. should be integer, but only textfields where left. so might be ''/None->use 0
                     max_nr_retry = int(self.channeldict['rsrv1']) if self.channeldict['rsrv1'] else 0
@@ -134,7 +154,7 @@ class _comsession(object):
                         domain = u'bots_communication_failure_' + self.channeldict['idchannel']
                         botslib.unique(domain,updatewith=0)    #set nr_retry to zero 
                 self.incommunicate()
-                self.disconnect()
+                self.disconnectpooled()
             self.postcommunicate()
             self.archive()
 
@@ -295,8 +315,8 @@ class _comsession(object):
                         subject = u'12345678'
                     else:
                         subject = unicode(row['idta'])
-                    content = botslib.readdata(row['filename'])     #get attachment from data file
-                    if self.userscript and hasattr(self.userscript,'subject'):    #user exit to determine subject
+                    if self.userscript and hasattr(self.userscript,'subject'):    #user exit to determine subject; gets content of attachment
+                        content = botslib.readdata(row['filename'])
                         subject = botslib.runscript(self.userscript,self.scriptname,'subject',channeldict=self.channeldict,ta=ta_to,subjectstring=subject,content=content)
                     message.add_header('Subject',subject)
 
@@ -313,20 +333,24 @@ class _comsession(object):
                     charset = self.convertcodecformime(row['charset'])
                     message.add_header('Content-Type',row['contenttype'].lower(),charset=charset)          #contenttype is set in grammar.syntax
 
-                    #set attachment/payload; the Content-Transfer-Encoding is set by python encoder
-                    message.set_payload(content)   #do not use charset; this lead to unwanted encodings...bots always uses base64
+                    #set Content-Transfer-Encoding as the python encoders (email.encoders) do.
+                    #attachment/payload is not read in memory: it is written to the email file in chunks after the headers (see writepayload)
+                    encodebase64 = False
                     if self.channeldict['askmdn'] == 'never':       #channeldict['askmdn'] is the Mime encoding
-                        email.encoders.encode_7or8bit(message)      #no encoding; but the Content-Transfer-Encoding is set to 7-bit or 8-bt
+                        message.add_header('Content-Transfer-Encoding','7bit' if self.isascii(row['filename']) else '8bit')     #no encoding; but the Content-Transfer-Encoding is set to 7-bit or 8-bt
                     elif self.channeldict['askmdn'] == 'ascii' and charset == 'us-ascii':
                         pass        #do nothing: ascii is default encoding
                     else:           #if Mime encoding is 'always' or  (Mime encoding == 'ascii' and charset!='us-ascii'): use base64
-                        email.encoders.encode_base64(message)
+                        message.add_header('Content-Transfer-Encoding','base64')
+                        encodebase64 = True
+                    message.set_payload('')
 
                     #*******write email to file***************************
                     outfilename = unicode(ta_to.idta)
                     outfile = botslib.opendata(outfilename, 'wb')
                     generator = email.Generator.Generator(outfile, mangle_from_=False, maxheaderlen=78)
                     generator.flatten(message,unixfrom=False)
+                    self.writepayload(row['filename'],outfile,encodebase64)
                     outfile.close()
             except:
                 txt = botslib.txtexc()
@@ -616,6 +640,353 @@ class _comsession(object):
     def disconnect(self):
         pass
 
+    def logtransfer(self,filename,checksumfile):
+        ''' log size and checksum of transferred file (see botslib.ChecksumFile).'''
+        botsglobal.logger.debug(u'Channel "%(idchannel)s": transferred "%(filename)s", %(size)s bytes, md5 %(checksum)s.',
+                                {'idchannel':self.channeldict['idchannel'],'filename':filename,'size':checksumfile.size,'checksum':checksumfile.checksum()})
+
+    #attributes of the communication session that are the connection; if empty, connections of this type are not pooled.
+    poolattributes = ()
+
+    def poolkey(self):
+        ''' key for connection pool; None if connection is not pooled.'''
+        if not self.poolattributes or botsglobal.ini.getint('settings','connectionpooltimeout',0) <= 0:
+            return None
+        return tuple([self.scriptname] + [self.channeldict.get(field) for field in ('type','host','port','username','secret','ftpaccount','ftpactive','keyfile','certfile')])
+
+    def connectpooled(self):
+        ''' reuse connection from connection pool if possible, else connect.'''
+        key = self.poolkey()
+        if key is not None and key in _connectionpool:
+            comsession,lastused = _connectionpool.pop(key)
+            if time.time() - lastused <= botsglobal.ini.getint('settings','connectionpooltimeout',0):
+                for attribute in self.poolattributes:
+                    setattr(self,attribute,getattr(comsession,attribute))
+                try:
+                    self.reuseconnection()
+                except:
+                    botsglobal.logger.debug(u'Channel "%(idchannel)s": connection in pool can not be used: %(txt)s',{'idchannel':self.channeldict['idchannel'],'txt':botslib.txtexc()})
+                else:
+                    botsglobal.logger.debug(u'Channel "%(idchannel)s": reuse connection from pool.',self.channeldict)
+                    return
+            try:
+                comsession.disconnect()
+            except:
+                pass
+        self.connect()
+
+    def disconnectpooled(self):
+        ''' put connection in connection pool (if pooled), else disconnect.'''
+        key = self.poolkey()
+        if key is None:
+            self.disconnect()
+            return
+        if key in _connectionpool:      #only one connection per key
+            try:
+                _connectionpool.pop(key)[0].disconnect()
+            except:
+                pass
+        self.releaseconnection()
+        _connectionpool[key] = (self,time.time())
+
+    def reuseconnection(self):
+        ''' prepare pooled connection for use by this channel; raises exception if connection is not OK.'''
+        pass
+
+    def releaseconnection(self):
+        ''' connection is put in pool.'''
+        pass
+
+    #*********************************************************************
+    #*** fetching of files in incommunicate (ftp, sftp, imap4).
+    #*** communication class has methods: remotefilename, fetchfile (returns filesize; None if not fetched), removefile; optional: startfetch, endfetch.
+    #*** with sessionsperchannel > 1 extra sessions (each with its own connection, in a thread) fetch files at the same time.
+    #*** the database is only used by the bots-engine thread: this makes the transactions and updates these with the results of the sessions.
+    #*********************************************************************
+    def fetchfiles(self,lijst,functionname,startdatetime):
+        ''' fetch remote files in lijst. For each file a transaction (status EXTERNIN) with a child (status FILEIN) is made.
+            fetching stops when maxsecondsperchannel (from startdatetime) is reached.
+        '''
+        sessions = [self] + self._extrasessions(min(self.sessionsperchannel(),len(lijst)) - 1)
+        if len(sessions) == 1:
+            for fromfilename in lijst:
+                transactions = self._newfetchtransactions(fromfilename,functionname)
+                if transactions:
+                    try:
+                        filesize = self.fetchfile(fromfilename,transactions[1])
+                    except:
+                        self._fetchresult(fromfilename,transactions,functionname,error=sys.exc_info()[1],txt=botslib.txtexc())
+                    else:
+                        if self._fetchresult(fromfilename,transactions,functionname,filesize=filesize) and self.channeldict['remove']:
+                            self.removefile(fromfilename)
+                if (datetime.datetime.now()-startdatetime).seconds >= self.maxsecondsperchannel:
+                    break
+            return
+
+        results = Queue.Queue()
+        removeerrors = []
+        inqueues = [Queue.Queue() for session in sessions]
+        threads = [threading.Thread(target=session._fetchworker,args=(index,inqueue,results,removeerrors)) for index,(session,inqueue) in enumerate(zip(sessions,inqueues))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        files = iter(lijst)
+        def startnext(index):
+            ''' give next file to session; returns False if there are no files (or no time) left.'''
+            for fromfilename in files:
+                if (datetime.datetime.now()-startdatetime).seconds >= self.maxsecondsperchannel:
+                    return False
+                transactions = self._newfetchtransactions(fromfilename,functionname)
+                if transactions:
+                    inqueues[index].put((fromfilename,transactions))
+                    return True
+            return False
+        try:
+            busy = 0
+            for index in range(len(sessions)):
+                if startnext(index):
+                    busy += 1
+            while busy:
+                index,fromfilename,transactions,filesize,error,txt = results.get()
+                if self._fetchresult(fromfilename,transactions,functionname,filesize,error,txt) and self.channeldict['remove']:
+                    inqueues[index].put((fromfilename,None))    #session removes file before fetching next file
+                if not startnext(index):
+                    busy -= 1
+        finally:
+            for inqueue in inqueues:
+                inqueue.put(None)
+            for thread in threads:
+                thread.join()
+            for session in sessions[1:]:
+                try:
+                    session.endfetch()
+                    session.disconnect()
+                except:
+                    pass
+        if removeerrors:
+            raise botslib.CommunicationError(_(u'Error removing remote file: %(txt)s'),{'txt':removeerrors[0]})
+
+    def sessionsperchannel(self):
+        ''' number of sessions to fetch or send files at the same time: from communicationscript (sessionsperchannel = <number>), else from bots.ini.'''
+        if self.userscript and hasattr(self.userscript,'sessionsperchannel'):
+            return self.userscript.sessionsperchannel
+        return botsglobal.ini.getint('settings','sessionsperchannel',1)
+
+    def _extrasessions(self,number):
+        ''' make extra sessions (copy of this session with own connection). If connecting fails: less sessions are used.'''
+        sessions = []
+        for dummy in range(number):
+            session = copy.copy(self)
+            try:
+                session.connect()
+                session.startfetch()
+            except:
+                botsglobal.logger.debug(u'Channel "%(idchannel)s": could not make extra session: %(txt)s',{'idchannel':self.channeldict['idchannel'],'txt':botslib.txtexc()})
+                break
+            sessions.append(session)
+        return sessions
+
+    def _fetchworker(self,index,inqueue,results,removeerrors):
+        ''' runs in a thread: fetch files from inqueue (fromfilename,transactions); transactions None means: remove file. No database access.'''
+        for task in iter(inqueue.get,None):
+            fromfilename,transactions = task
+            if transactions is None:
+                try:
+                    self.removefile(fromfilename)
+                except:
+                    removeerrors.append(botslib.txtexc())
+                continue
+            try:
+                filesize = self.fetchfile(fromfilename,transactions[1])
+            except:
+                results.put((index,fromfilename,transactions,None,sys.exc_info()[1],botslib.txtexc()))
+            else:
+                results.put((index,fromfilename,transactions,filesize,None,None))
+
+    def _newfetchtransactions(self,fromfilename,functionname):
+        ''' returns (ta_from,ta_to) for file to fetch; None if this fails (error is logged).'''
+        try:
+            ta_from = botslib.NewTransaction(filename=self.remotefilename(fromfilename),
+                                                status=EXTERNIN,
+                                                fromchannel=self.channeldict['idchannel'],
+                                                idroute=self.idroute)
+            ta_to =   ta_from.copyta(status=FILEIN)
+        except:
+            botslib.ErrorProcess(functionname=functionname,errortext=botslib.txtexc(),channeldict=self.channeldict)
+            return None
+        return ta_from,ta_to
+
+    def _fetchresult(self,fromfilename,transactions,functionname,filesize=None,error=None,txt=None):
+        ''' update transactions with result of fetching file; returns True if file is received.
+            filesize None: file is not fetched (eg directory or empty file), this is no error.
+        '''
+        ta_from,ta_to = transactions
+        if error is not None or filesize is None:
+            if error is not None:
+                botslib.ErrorProcess(functionname=functionname,errortext=txt,channeldict=self.channeldict)
+            try:
+                ta_from.delete()
+                ta_to.delete()
+            except:
+                pass
+            return False
+        ta_to.update(filename=unicode(ta_to.idta),statust=OK,filesize=filesize)
+        ta_from.update(statust=DONE)
+        return True
+
+    def startfetch(self):
+        pass
+
+    def endfetch(self):
+        pass
+
+    #*********************************************************************
+    #*** sending of files in outcommunicate (ftp, sftp).
+    #*** communication class has methods: remotefilename, sendfile (returns name of remote file).
+    #*** with sessionsperchannel > 1 extra sessions send files at the same time, as for fetching.
+    #*** files with the same remote filename (append or overwrite) are sent by one session, in order.
+    #*********************************************************************
+    def sendfiles(self,filename_mask,mode):
+        ''' send files for this channel. For each file a transaction (status EXTERNOUT) is made.
+            filename_mask: for filename_formatter. mode: for sendfile (append or overwrite).
+        '''
+        rows = list(botslib.query('''SELECT idta,filename,numberofresends
+                                    FROM ta
+                                    WHERE idta>%(rootidta)s
+                                      AND status=%(status)s
+                                      AND statust=%(statust)s
+                                      AND tochannel=%(tochannel)s
+                                        ''',
+                                    {'tochannel':self.channeldict['idchannel'],'rootidta':self.rootidta,
+                                    'status':FILEOUT,'statust':OK}))
+        sessions = [self] + self._extrasessions(min(self.sessionsperchannel(),len(rows)) - 1)
+        if len(sessions) == 1:
+            for row in rows:
+                task = self._newsendtransactions(row,filename_mask)
+                if task:
+                    try:
+                        tofilename = self.sendfile(row['filename'],task[2],mode)
+                    except:
+                        self._sendresult(row,task,task[2],botslib.txtexc())
+                    else:
+                        self._sendresult(row,task,tofilename)
+            return
+
+        results = Queue.Queue()
+        inqueues = [Queue.Queue() for session in sessions]
+        threads = [threading.Thread(target=session._sendworker,args=(index,inqueue,results,mode)) for index,(session,inqueue) in enumerate(zip(sessions,inqueues))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        files = iter(rows)
+        pending = [0] * len(sessions)   #number of files given to session, not sent yet
+        inprogress = {}                 #remote filename -> [session, number of files]
+        def startnext(index):
+            ''' give next file to session; a file with the same remote filename as a file in progress goes to the session of that file.
+                returns False if there are no files left.
+            '''
+            for row in files:
+                task = self._newsendtransactions(row,filename_mask)
+                if not task:
+                    continue
+                if task[2] in inprogress:
+                    inprogress[task[2]][1] += 1
+                else:
+                    inprogress[task[2]] = [index,1]
+                target = inprogress[task[2]][0]
+                inqueues[target].put((row,task))
+                pending[target] += 1
+                if target == index:
+                    return True
+            return False
+        try:
+            for index in range(len(sessions)):
+                startnext(index)
+            while sum(pending):
+                index,row,task,tofilename,txt = results.get()
+                pending[index] -= 1
+                inprogress[task[2]][1] -= 1
+                if not inprogress[task[2]][1]:
+                    del inprogress[task[2]]
+                self._sendresult(row,task,tofilename,txt)
+                if not pending[index]:
+                    startnext(index)
+        finally:
+            for inqueue in inqueues:
+                inqueue.put(None)
+            for thread in threads:
+                thread.join()
+            for session in sessions[1:]:
+                try:
+                    session.disconnect()
+                except:
+                    pass
+
+    def _sendworker(self,index,inqueue,results,mode):
+        ''' runs in a thread: send files from inqueue (row,(ta_from,ta_to,tofilename)). No database access.'''
+        for row,task in iter(inqueue.get,None):
+            try:
+                tofilename = self.sendfile(row['filename'],task[2],mode)
+            except:
+                results.put((index,row,task,task[2],botslib.txtexc()))
+            else:
+                results.put((index,row,task,tofilename,None))
+
+    def _newsendtransactions(self,row,filename_mask):
+        ''' returns (ta_from,ta_to,tofilename) for file to send; None if no filename can be made (error is in ta_to).'''
+        ta_from = botslib.OldTransaction(row['idta'])
+        ta_to = ta_from.copyta(status=EXTERNOUT)
+        try:
+            tofilename = self.filename_formatter(filename_mask,ta_from)
+        except:
+            ta_to.update(statust=ERROR,errortext=botslib.txtexc(),numberofresends=row['numberofresends']+1)
+            ta_from.update(statust=DONE)
+            return None
+        return ta_from,ta_to,tofilename
+
+    def _sendresult(self,row,task,tofilename,txt=None):
+        ''' update transactions with result of sending file; txt is the error text if file is not sent.'''
+        ta_from,ta_to,dummy = task
+        if txt:
+            ta_to.update(statust=ERROR,errortext=txt,filename=self.remotefilename(tofilename),numberofresends=row['numberofresends']+1)
+        else:
+            ta_to.update(statust=DONE,filename=self.remotefilename(tofilename),numberofresends=row['numberofresends']+1)
+        ta_from.update(statust=DONE)
+
+    @staticmethod
+    def isascii(filename):
+        ''' True if data file contains only ascii characters; file is read in chunks.'''
+        infile = botslib.opendata(filename,'rb')
+        try:
+            for chunk in iter(lambda: infile.read(botslib.TRANSFERCHUNKSIZE),''):
+                try:
+                    chunk.decode('ascii')
+                except UnicodeDecodeError:
+                    return False
+            return True
+        finally:
+            infile.close()
+
+    @staticmethod
+    def writepayload(filename,outfile,encodebase64):
+        ''' write data file as payload of email in chunks.
+            base64: result is the same as for email.encoders.encode_base64 (lines of 76 characters; no extra newline at end).
+        '''
+        infile = botslib.opendata(filename,'rb')
+        if not encodebase64:
+            shutil.copyfileobj(infile,outfile,botslib.TRANSFERCHUNKSIZE)
+        else:
+            chunksize = 57 * (botslib.TRANSFERCHUNKSIZE // 57)      #57 bytes is one line of base64
+            encoded = lastchar = ''
+            for chunk in iter(lambda: infile.read(chunksize),''):
+                outfile.write(encoded)
+                encoded = base64.encodestring(chunk)
+                lastchar = chunk[-1]
+            if lastchar != '\n':
+                encoded = encoded[:-1]
+            outfile.write(encoded)
+        infile.close()
+
     @staticmethod
     def convertcodecformime(codec_in):
         convertdict = {
@@ -732,11 +1103,12 @@ class file(_comsession):
                         raise botslib.LockedFileError(_(u'Can not do a systemlock on this platform'))
                 #open tofile
                 tofilename = unicode(ta_to.idta)
-                tofile = botslib.opendata(tofilename, 'wb')
+                tofile = botslib.ChecksumFile(botslib.opendata(tofilename, 'wb'))
                 #copy
-                shutil.copyfileobj(fromfile,tofile,1048576)
+                shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
                 tofile.close()
                 fromfile.close()
+                self.logtransfer(fromfilename,tofile)
             except:
                 txt = botslib.txtexc()
                 botslib.ErrorProcess(functionname='file-incommunicate',errortext=txt,channeldict=self.channeldict)
@@ -799,11 +1171,12 @@ class file(_comsession):
                     else:
                         raise botslib.LockedFileError(_(u'Can not do a systemlock on this platform'))
                 #open fromfile
-                fromfile = botslib.opendata(row['filename'], 'rb')
+                fromfile = botslib.ChecksumFile(botslib.opendata(row['filename'], 'rb'))
                 #copy
-                shutil.copyfileobj(fromfile,tofile,1048576)
+                shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
                 fromfile.close()
                 tofile.close()
+                self.logtransfer(tofilename,fromfile)
                 #Rename filename after writing file.
                 #Function: safe file writing: do not want another process to read the file while it is being written.
                 #This is safe because file rename is atomic within same file system (?what about network shares?)
@@ -937,10 +1310,30 @@ class imap4(_comsession):
         self.session = imaplib.IMAP4(host=self.channeldict['host'],port=int(self.channeldict['port']))
         self.session.login(self.channeldict['username'],self.channeldict['secret'])
 
+    poolattributes = ('session',)
+
+    def reuseconnection(self):
+        response, data = self.session.noop()
+        if response != 'OK':
+            raise botslib.CommunicationError(_(u'IMAP server gives %(response)s on NOOP: %(data)s'),{'response':response,'data':data})
+
     @botslib.log_session
     def incommunicate(self):
         ''' Fetch messages from imap4-mailbox.
         '''
+        mailbox_name = self.startfetch()
+        # Get the message UIDs that should be read
+        response, data = self.session.uid('search', None, '(UNDELETED)')
+        if response != 'OK': # have never seen this happen, but just in case!
+            raise botslib.CommunicationError(mailbox_name + ': ' + data[0])
+
+        maillist = data[0].split()
+        startdatetime = datetime.datetime.now()
+        self.fetchfiles(maillist,'imap4-incommunicate',startdatetime)
+        self.endfetch()
+
+    def startfetch(self):
+        ''' select the mailbox; returns name of mailbox.'''
         # path may contain a mailbox name, otherwise use INBOX
         if self.channeldict['path']:
             mailbox_name = self.channeldict['path']
@@ -950,51 +1343,27 @@ class imap4(_comsession):
         response, data = self.session.select(mailbox_name)
         if response != 'OK': # eg. mailbox does not exist
             raise botslib.CommunicationError(mailbox_name + ': ' + data[0])
+        return mailbox_name
 
-        # Get the message UIDs that should be read
-        response, data = self.session.uid('search', None, '(UNDELETED)')
-        if response != 'OK': # have never seen this happen, but just in case!
-            raise botslib.CommunicationError(mailbox_name + ': ' + data[0])
+    def endfetch(self):
+        self.session.close()        #Close currently selected mailbox. This is the recommended command before 'LOGOUT'.
 
-        maillist = data[0].split()
-        startdatetime = datetime.datetime.now()
-        remove_ta = False
-        for mail in maillist:
-            try:
-                ta_from = botslib.NewTransaction(filename='imap4://'+self.channeldict['username']+'@'+self.channeldict['host'],
-                                                    status=EXTERNIN,
-                                                    fromchannel=self.channeldict['idchannel'],idroute=self.idroute)
-                ta_to =   ta_from.copyta(status=FILEIN)
-                remove_ta = True
-                filename = unicode(ta_to.idta)
-                # Get the message (header and body)
-                response, msg_data = self.session.uid('fetch',mail, '(RFC822)')
-                filehandler = botslib.opendata(filename, 'wb')
-                filesize = len(msg_data[0][1])
-                filehandler.write(msg_data[0][1])
-                filehandler.close()
-                # Flag message for deletion AND expunge. Direct expunge has advantages for bad (internet)connections.
-            except:
-                txt = botslib.txtexc()
-                botslib.ErrorProcess(functionname='imap4-incommunicate',errortext=txt,channeldict=self.channeldict)
-                if remove_ta:
-                    try:
-                        ta_from.delete()
-                        ta_to.delete()
-                    except:
-                        pass
-            else:
-                ta_to.update(statust=OK,filename=filename,filesize=filesize)
-                ta_from.update(statust=DONE)
-                if self.channeldict['remove']:
-                    self.session.uid('store',mail, '+FLAGS', r'(\Deleted)')
-                    self.session.expunge()
-            finally:
-                remove_ta = False
-                if (datetime.datetime.now()-startdatetime).seconds >= self.maxsecondsperchannel:
-                    break
+    def remotefilename(self,mail):
+        return 'imap4://'+self.channeldict['username']+'@'+self.channeldict['host']
 
-        self.session.close()        #Close currently selected mailbox. This is the recommended command before 'LOGOUT'.
+    def fetchfile(self,mail,ta_to):
+        # Get the message (header and body)
+        response, msg_data = self.session.uid('fetch',mail, '(RFC822)')
+        filehandler = botslib.opendata(unicode(ta_to.idta), 'wb')
+        filesize = len(msg_data[0][1])
+        filehandler.write(msg_data[0][1])
+        filehandler.close()
+        return filesize
+
+    def removefile(self,mail):
+        # Flag message for deletion AND expunge. Direct expunge has advantages for bad (internet)connections.
+        self.session.uid('store',mail, '+FLAGS', r'(\Deleted)')
+        self.session.expunge()
 
     @botslib.log_session
     def postcommunicate(self):
@@ -1028,6 +1397,13 @@ class smtp(_comsession):
         self.session.set_debuglevel(botsglobal.ini.getint('settings','smtpdebug',0))    #if used, gives information about session (on screen), for debugging smtp
         self.login()
 
+    poolattributes = ('session',)
+
+    def reuseconnection(self):
+        code = self.session.noop()[0]
+        if code != 250:
+            raise botslib.CommunicationError(_(u'SMTP server gives %(code)s on NOOP.'),{'code':code})
+
     def login(self):
         if self.channeldict['username'] and self.channeldict['secret']:
             try:
@@ -1127,8 +1503,21 @@ class ftp(_comsession):
         self.session.login(user=self.channeldict['username'],passwd=self.channeldict['secret'],acct=self.channeldict['ftpaccount'])
         self.set_cwd()
 
+    poolattributes = ('session','homedir')
+    homedir = None      #directory after login
+
+    def reuseconnection(self):
+        botslib.settimeout(botsglobal.ini.getint('settings','ftptimeout',10))
+        self.session.cwd(self.homedir)      #this also checks if connection is OK
+        self.set_cwd()
+
+    def releaseconnection(self):
+        botslib.settimeout(botsglobal.ini.getint('settings','globaltimeout',10))
+
     def set_cwd(self):
         self.dirpath = self.session.pwd()
+        if self.homedir is None:
+            self.homedir = self.dirpath
         if self.channeldict['path']:
             self.dirpath = posixpath.normpath(posixpath.join(self.dirpath,self.channeldict['path']))
             try:
@@ -1152,56 +1541,33 @@ class ftp(_comsession):
                 raise
 
         lijst = fnmatch.filter(files,self.channeldict['filename'])
-        remove_ta = False
-        for fromfilename in lijst:  #fetch messages from ftp-server.
-            try:
-                ta_from = botslib.NewTransaction(filename='ftp:/'+posixpath.join(self.dirpath,fromfilename),
-                                                    status=EXTERNIN,
-                                                    fromchannel=self.channeldict['idchannel'],
-                                                    idroute=self.idroute)
-                ta_to =   ta_from.copyta(status=FILEIN)
-                remove_ta = True
-                tofilename = unicode(ta_to.idta)
-                tofile = botslib.opendata(tofilename, 'wb')
-                try:
-                    if self.channeldict['ftpbinary']:
-                        self.session.retrbinary("RETR " + fromfilename, tofile.write)
-                    else:
-                        self.session.retrlines("RETR " + fromfilename, lambda s, w=tofile.write: w(s+"\n"))
-                except ftplib.error_perm as msg:
-                    if unicode(msg)[:3] in [u'550',]:     #we are trying to download a directory...
-                        raise botslib.BotsError(u'To be catched')
-                    else:
-                        raise
-                tofile.close()
-                filesize = os.path.getsize(botslib.abspathdata(tofilename))
-                if not filesize:
-                    raise botslib.BotsError(u'To be catched; directory (or empty file)')
-            except botslib.BotsError:   #directory or empty file; handle exception but generate no error.
-                if remove_ta:
-                    try:
-                        ta_from.delete()
-                        ta_to.delete()
-                    except:
-                        pass
-            except:
-                txt = botslib.txtexc()
-                botslib.ErrorProcess(functionname='ftp-incommunicate',errortext=txt,channeldict=self.channeldict)
-                if remove_ta:
-                    try:
-                        ta_from.delete()
-                        ta_to.delete()
-                    except:
-                        pass
+        self.fetchfiles(lijst,'ftp-incommunicate',startdatetime)
+
+    def remotefilename(self,fromfilename):
+        return 'ftp:/'+posixpath.join(self.dirpath,fromfilename)
+
+    def fetchfile(self,fromfilename,ta_to):
+        tofilename = unicode(ta_to.idta)
+        tofile = botslib.ChecksumFile(botslib.opendata(tofilename, 'wb'))
+        try:
+            if self.channeldict['ftpbinary']:
+                self.session.retrbinary("RETR " + fromfilename, tofile.write, botslib.TRANSFERCHUNKSIZE)
             else:
-                ta_to.update(filename=tofilename,statust=OK,filesize=filesize)
-                ta_from.update(statust=DONE)
-                if self.channeldict['remove']:
-                    self.session.delete(fromfilename)
-            finally:
-                remove_ta = False
-                if (datetime.datetime.now()-startdatetime).seconds >= self.maxsecondsperchannel:
-                    break
+                self.session.retrlines("RETR " + fromfilename, lambda s, w=tofile.write: w(s+"\n"))
+        except ftplib.error_perm as msg:
+            if unicode(msg)[:3] in [u'550',]:     #we are trying to download a directory...
+                return None
+            else:
+                raise
+        finally:
+            tofile.close()
+        if not tofile.size:
+            return None     #directory (or empty file)
+        self.logtransfer(fromfilename,tofile)
+        return tofile.size
+
+    def removefile(self,fromfilename):
+        self.session.delete(fromfilename)
 
     @botslib.log_session
     def outcommunicate(self):
@@ -1217,39 +1583,25 @@ class ftp(_comsession):
             mode = 'STOR '
         else:
             mode = 'APPE '
-        for row in botslib.query('''SELECT idta,filename,numberofresends
-                                    FROM ta
-                                    WHERE idta>%(rootidta)s
-                                      AND status=%(status)s
-                                      AND statust=%(statust)s
-                                      AND tochannel=%(tochannel)s
-                                        ''',
-                                    {'tochannel':self.channeldict['idchannel'],'rootidta':self.rootidta,
-                                    'status':FILEOUT,'statust':OK}):
-            try:
-                ta_from = botslib.OldTransaction(row['idta'])
-                ta_to = ta_from.copyta(status=EXTERNOUT)
-                tofilename = self.filename_formatter(filename_mask,ta_from)
-                if self.channeldict['ftpbinary']:
-                    fromfile = botslib.opendata(row['filename'], 'rb')
-                    self.session.storbinary(mode + tofilename, fromfile)
-                else:
-                    fromfile = botslib.opendata(row['filename'], 'r')
-                    self.session.storlines(mode + tofilename, fromfile)
-                fromfile.close()
-                #Rename filename after writing file.
-                #Function: safe file writing: do not want another process to read the file while it is being written.
-                if self.channeldict['mdnchannel']:
-                    tofilename_old = tofilename
-                    tofilename = botslib.rreplace(tofilename_old,self.channeldict['mdnchannel'])
-                    self.session.rename(tofilename_old,tofilename)
-            except:
-                txt = botslib.txtexc()
-                ta_to.update(statust=ERROR,errortext=txt,filename='ftp:/'+posixpath.join(self.dirpath,tofilename),numberofresends=row['numberofresends']+1)
-            else:
-                ta_to.update(statust=DONE,filename='ftp:/'+posixpath.join(self.dirpath,tofilename),numberofresends=row['numberofresends']+1)
-            finally:
-                ta_from.update(statust=DONE)
+        self.sendfiles(filename_mask,mode)
+
+    def sendfile(self,fromfilename,tofilename,mode):
+        ''' send file; returns name of remote file.'''
+        if self.channeldict['ftpbinary']:
+            fromfile = botslib.ChecksumFile(botslib.opendata(fromfilename, 'rb'))
+            self.session.storbinary(mode + tofilename, fromfile, botslib.TRANSFERCHUNKSIZE)
+        else:
+            fromfile = botslib.ChecksumFile(botslib.opendata(fromfilename, 'r'))
+            self.session.storlines(mode + tofilename, fromfile)
+        fromfile.close()
+        self.logtransfer(tofilename,fromfile)
+        #Rename filename after writing file.
+        #Function: safe file writing: do not want another process to read the file while it is being written.
+        if self.channeldict['mdnchannel']:
+            tofilename_old = tofilename
+            tofilename = botslib.rreplace(tofilename_old,self.channeldict['mdnchannel'])
+            self.session.rename(tofilename_old,tofilename)
+        return tofilename
 
     def disconnect(self):
         try:
@@ -1420,9 +1772,20 @@ class sftp(_comsession):
         channel.settimeout(botsglobal.ini.getint('settings','ftptimeout',10))
         self.set_cwd()
 
+    poolattributes = ('session','transport','homedir')
+    homedir = None      #directory after login
+
+    def reuseconnection(self):
+        if not self.transport.is_active():
+            raise botslib.CommunicationError(_(u'Connection is closed.'))
+        self.session.chdir(self.homedir)
+        self.set_cwd()
+
     def set_cwd(self):
         self.session.chdir('.') # getcwd does not work without this chdir first!
         self.dirpath = self.session.getcwd()
+        if self.homedir is None:
+            self.homedir = self.dirpath
         if self.channeldict['path']:
             self.dirpath = posixpath.normpath(posixpath.join(self.dirpath,self.channeldict['path']))
             try:
@@ -1445,41 +1808,23 @@ class sftp(_comsession):
         startdatetime = datetime.datetime.now()
         files = self.session.listdir('.')
         lijst = fnmatch.filter(files,self.channeldict['filename'])
-        remove_ta = False
-        for fromfilename in lijst:  #fetch messages from sftp-server.
-            try:
-                ta_from = botslib.NewTransaction(filename='sftp:/'+posixpath.join(self.dirpath,fromfilename),
-                                                    status=EXTERNIN,
-                                                    fromchannel=self.channeldict['idchannel'],
-                                                    idroute=self.idroute)
-                ta_to =   ta_from.copyta(status=FILEIN)
-                remove_ta = True
-                tofilename = unicode(ta_to.idta)
-                fromfile = self.session.open(fromfilename, 'r')    # SSH treats all files as binary
-                content = fromfile.read()
-                filesize = len(content)
-                tofile = botslib.opendata(tofilename, 'wb')
-                tofile.write(content)
-                tofile.close()
-                fromfile.close()
-            except:
-                txt = botslib.txtexc()
-                botslib.ErrorProcess(functionname='sftp-incommunicate',errortext=txt,channeldict=self.channeldict)
-                if remove_ta:
-                    try:
-                        ta_from.delete()
-                        ta_to.delete()
-                    except:
-                        pass
-            else:
-                ta_to.update(filename=tofilename,statust=OK,filesize=filesize)
-                ta_from.update(statust=DONE)
-                if self.channeldict['remove']:
-                    self.session.remove(fromfilename)
-            finally:
-                remove_ta = False
-                if (datetime.datetime.now()-startdatetime).seconds >= self.maxsecondsperchannel:
-                    break
+        self.fetchfiles(lijst,'sftp-incommunicate',startdatetime)
+
+    def remotefilename(self,fromfilename):
+        return 'sftp:/'+posixpath.join(self.dirpath,fromfilename)
+
+    def fetchfile(self,fromfilename,ta_to):
+        fromfile = self.session.open(fromfilename, 'r')    # SSH treats all files as binary
+        fromfile.prefetch()     #read requests are sent at once, not one after another
+        tofile = botslib.ChecksumFile(botslib.opendata(unicode(ta_to.idta), 'wb'))
+        shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
+        tofile.close()
+        fromfile.close()
+        self.logtransfer(fromfilename,tofile)
+        return tofile.size
+
+    def removefile(self,fromfilename):
+        self.session.remove(fromfilename)
 
     @botslib.log_session
     def outcommunicate(self):
@@ -1494,37 +1839,24 @@ class sftp(_comsession):
             mode = 'w'
         else:
             mode = 'a'
-        for row in botslib.query('''SELECT idta,filename,numberofresends
-                                    FROM ta
-                                    WHERE idta>%(rootidta)s
-                                      AND status=%(status)s
-                                      AND statust=%(statust)s
-                                      AND tochannel=%(tochannel)s
-                                        ''',
-                                    {'tochannel':self.channeldict['idchannel'],'rootidta':self.rootidta,
-                                    'status':FILEOUT,'statust':OK}):
-            try:
-                ta_from = botslib.OldTransaction(row['idta'])
-                ta_to = ta_from.copyta(status=EXTERNOUT)
-                tofilename = self.filename_formatter(filename_mask,ta_from)
-                fromfile = botslib.opendata(row['filename'], 'rb')
-                tofile = self.session.open(tofilename, mode)    # SSH treats all files as binary
-                tofile.write(fromfile.read())
-                tofile.close()
-                fromfile.close()
-                #Rename filename after writing file.
-                #Function: safe file writing: do not want another process to read the file while it is being written.
-                if self.channeldict['mdnchannel']:
-                    tofilename_old = tofilename
-                    tofilename = botslib.rreplace(tofilename_old,self.channeldict['mdnchannel'])
-                    self.session.rename(tofilename_old,tofilename)
-            except:
-                txt = botslib.txtexc()
-                ta_to.update(statust=ERROR,errortext=txt,filename='sftp:/'+posixpath.join(self.dirpath,tofilename),numberofresends=row['numberofresends']+1)
-            else:
-                ta_to.update(statust=DONE,filename='sftp:/'+posixpath.join(self.dirpath,tofilename),numberofresends=row['numberofresends']+1)
-            finally:
-                ta_from.update(statust=DONE)
+        self.sendfiles(filename_mask,mode)
+
+    def sendfile(self,fromfilename,tofilename,mode):
+        ''' send file; returns name of remote file.'''
+        fromfile = botslib.ChecksumFile(botslib.opendata(fromfilename, 'rb'))
+        tofile = self.session.open(tofilename, mode)    # SSH treats all files as binary
+        tofile.set_pipelined(True)      #do not wait for response on each write; errors are raised in close()
+        shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
+        tofile.close()
+        fromfile.close()
+        self.logtransfer(tofilename,fromfile)
+        #Rename filename after writing file.
+        #Function: safe file writing: do not want another process to read the file while it is being written.
+        if self.channeldict['mdnchannel']:
+            tofilename_old = tofilename
+            tofilename = botslib.rreplace(tofilename_old,self.channeldict['mdnchannel'])
+            self.session.rename(tofilename_old,tofilename)
+        return tofilename
 
 
 class xmlrpc(_comsession):
@@ -1763,11 +2095,12 @@ class communicationscript(_comsession):
                     filesize = os.fstat(fromfile.fileno()).st_size
                     #open tofile
                     tofilename = unicode(ta_to.idta)
-                    tofile = botslib.opendata(tofilename, 'wb')
+                    tofile = botslib.ChecksumFile(botslib.opendata(tofilename, 'wb'))
                     #copy
-                    shutil.copyfileobj(fromfile,tofile,1048576)
+                    shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
                     fromfile.close()
                     tofile.close()
+                    self.logtransfer(fromfilename,tofile)
                 except:
                     txt = botslib.txtexc()
                     botslib.ErrorProcess(functionname='communicationscript-incommunicate',errortext=txt,channeldict=self.channeldict)
@@ -1801,12 +2134,12 @@ class communicationscript(_comsession):
                     remove_ta = True
                     fromfile = open(fromfilename, 'rb')
                     tofilename = unicode(ta_to.idta)
-                    tofile = botslib.opendata(tofilename, 'wb')
-                    content = fromfile.read()
-                    filesize = len(content)
-                    tofile.write(content)
+                    tofile = botslib.ChecksumFile(botslib.opendata(tofilename, 'wb'))
+                    shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
+                    filesize = tofile.size
                     fromfile.close()
                     tofile.close()
+                    self.logtransfer(fromfilename,tofile)
                 except:
                     txt = botslib.txtexc()
                     botslib.ErrorProcess(functionname='communicationscript-incommunicate',errortext=txt,channeldict=self.channeldict)
@@ -1856,11 +2189,12 @@ class communicationscript(_comsession):
                 tofilename = botslib.join(outputdir,tofilename)
                 tofile = open(tofilename, mode)
                 #open fromfile
-                fromfile = botslib.opendata(row['filename'], 'rb')
+                fromfile = botslib.ChecksumFile(botslib.opendata(row['filename'], 'rb'))
                 #copy
-                shutil.copyfileobj(fromfile,tofile,1048576)
+                shutil.copyfileobj(fromfile,tofile,botslib.TRANSFERCHUNKSIZE)
                 fromfile.close()
                 tofile.close()
+                self.logtransfer(tofilename,fromfile)
                 #one file is written; call external
                 if botslib.tryrunscript(self.userscript,self.scriptname,'main',channeldict=self.channeldict,filename=tofilename,ta=ta_from):
                     if self.channeldict['remove']:
@@ -1927,6 +2261,7 @@ class http(_comsession):
             self.auth = None
         self.cert = None
         self.url = botslib.Uri(scheme=self.scheme,hostname=self.channeldict['host'],port=self.channeldict['port'],path=self.channeldict['path'])
+        self.session = self.requests.Session()      #connection is kept open for all files (keep-alive)
 
     @botslib.log_session
     def incommunicate(self):
@@ -1935,27 +2270,36 @@ class http(_comsession):
         while True:     #loop until no content is received or max communication time is expired
             try:
                 #fetch via requests library
-                outResponse = self.requests.get(self.url.uri(),
+                outResponse = self.session.get(self.url.uri(),
                                                 auth=self.auth,
                                                 cert=self.cert,
                                                 params=self.params,
                                                 headers=self.headers,
-                                                verify=self.verify)
-                if outResponse.status_code != self.requests.codes.ok: #communication not OK: exception
-                    raise botslib.CommunicationError(_(u'%(scheme)s receive error, response code: "%(status_code)s".'),{'scheme':self.scheme,'status_code':outResponse.status_code})
-                if not outResponse.content: #communication OK, but nothing received: break
+                                                verify=self.verify,
+                                                stream=True)    #content is read in chunks
+                try:
+                    if outResponse.status_code != self.requests.codes.ok: #communication not OK: exception
+                        raise botslib.CommunicationError(_(u'%(scheme)s receive error, response code: "%(status_code)s".'),{'scheme':self.scheme,'status_code':outResponse.status_code})
+                    ta_from = botslib.NewTransaction(filename=self.url.uri(),
+                                                        status=EXTERNIN,
+                                                        fromchannel=self.channeldict['idchannel'],
+                                                        idroute=self.idroute)
+                    ta_to =   ta_from.copyta(status=FILEIN)
+                    remove_ta = True
+                    tofilename = unicode(ta_to.idta)
+                    tofile = botslib.ChecksumFile(botslib.opendata(tofilename, 'wb'))
+                    for chunk in outResponse.iter_content(botslib.TRANSFERCHUNKSIZE):
+                        tofile.write(chunk)
+                    tofile.close()
+                finally:
+                    outResponse.close()     #streamed response: connection is released only when response is closed
+                filesize = tofile.size
+                if not filesize:    #communication OK, but nothing received: break
+                    ta_from.delete()
+                    ta_to.delete()
+                    botslib.deldata(tofilename)
                     break
-                ta_from = botslib.NewTransaction(filename=self.url.uri(),
-                                                    status=EXTERNIN,
-                                                    fromchannel=self.channeldict['idchannel'],
-                                                    idroute=self.idroute)
-                ta_to =   ta_from.copyta(status=FILEIN)
-                remove_ta = True
-                tofilename = unicode(ta_to.idta)
-                tofile = botslib.opendata(tofilename, 'wb')
-                tofile.write(outResponse.content)
-                tofile.close()
-                filesize = len(outResponse.content)
+                self.logtransfer(self.url.uri(),tofile)
             except:
                 txt = botslib.txtexc()
                 botslib.ErrorProcess(functionname='http-incommunicate',errortext=txt,channeldict=self.channeldict)
@@ -1995,17 +2339,19 @@ class http(_comsession):
             try:
                 ta_from = botslib.OldTransaction(row['idta'])
                 ta_to = ta_from.copyta(status=EXTERNOUT)
-                fromfile = botslib.opendata(row['filename'], 'rb')
-                content = fromfile.read()
-                fromfile.close()
-                #communicate via requests library
-                outResponse = self.requests.post(self.url.uri(),
-                                                auth=self.auth,
-                                                cert=self.cert,
-                                                params=self.params,
-                                                headers=self.headers,
-                                                data=content,
-                                                verify=self.verify)
+                fromfile = botslib.ChecksumFile(botslib.opendata(row['filename'], 'rb'))
+                #communicate via requests library; file is send in chunks
+                try:
+                    outResponse = self.session.post(self.url.uri(),
+                                                    auth=self.auth,
+                                                    cert=self.cert,
+                                                    params=self.params,
+                                                    headers=self.headers,
+                                                    data=fromfile,
+                                                    verify=self.verify)
+                finally:
+                    fromfile.close()
+                self.logtransfer(row['filename'],fromfile)
                 if outResponse.status_code != self.requests.codes.ok:
                     raise botslib.CommunicationError(_(u'%(scheme)s send error, response code: "%(status_code)s".'),{'scheme':self.scheme,'status_code':outResponse.status_code})
             except:
@@ -2017,7 +2363,7 @@ class http(_comsession):
                 ta_from.update(statust=DONE)
 
     def disconnect(self):
-        pass
+        self.session.close()
 
 
 class https(http):
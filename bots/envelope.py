@@ -8,6 +8,7 @@ import outmessage
 from botsconfig import *
 
                                 
+@botslib.batch_transactions
 def mergemessages(startstatus,endstatus,idroute,rootidta=None):
     ''' Merges and/or envelopes one or more messages to one file;
         In db-ta: attribute 'merge' indicates message should be merged with similar messages; 'merge' is generated in translation from messagetype-grammar
@@ -63,20 +64,28 @@ def mergemessages(startstatus,endstatus,idroute,rootidta=None):
             filename_list = []
             #gather individual idta and filenames
             #explicitly allow formpartner/topartner to be None/NULL
-            for row2 in botslib.query(u'''SELECT idta, filename
-                                            FROM ta
-                                            WHERE idta>%(rootidta)s
-                                            AND status=%(status)s
-                                            AND statust=%(statust)s
-                                            AND merge=%(merge)s
-                                            AND editype=%(editype)s
-                                            AND messagetype=%(messagetype)s
-                                            AND (frompartner=%(frompartner)s OR frompartner IS NULL)
-                                            AND (topartner=%(topartner)s OR topartner IS NULL)
-                                            AND testindicator=%(testindicator)s
-                                            AND charset=%(charset)s
-                                            ORDER BY idta
-                                            ''',
+            #when translated in parallel (worker processes) order of idta is not the order of the incoming edi files.
+            #than order by incoming edi file (via parents: translated->splitup->parsed->incoming file), so merged file is the same as when not in parallel.
+            if botslib.translateworkers() > 1:
+                joins = u''' LEFT JOIN ta splitup ON ta.parent=splitup.idta
+                            LEFT JOIN ta parsed ON splitup.parent=parsed.idta '''
+                orderby = u'COALESCE(parsed.parent,ta.idta),ta.idta'
+            else:
+                joins = u''
+                orderby = u'ta.idta'
+            for row2 in botslib.query(u'''SELECT ta.idta as idta, ta.filename as filename
+                                            FROM ta ''' + joins + '''
+                                            WHERE ta.idta>%(rootidta)s
+                                            AND ta.status=%(status)s
+                                            AND ta.statust=%(statust)s
+                                            AND ta.merge=%(merge)s
+                                            AND ta.editype=%(editype)s
+                                            AND ta.messagetype=%(messagetype)s
+                                            AND (ta.frompartner=%(frompartner)s OR ta.frompartner IS NULL)
+                                            AND (ta.topartner=%(topartner)s OR ta.topartner IS NULL)
+                                            AND ta.testindicator=%(testindicator)s
+                                            AND ta.charset=%(charset)s
+                                            ORDER BY ''' + orderby,
                                             {'rootidta':rootidta,'status':startstatus,'statust':OK,'merge':True,
                                             'editype':ta_info['editype'],'messagetype':ta_info['messagetype'],'frompartner':ta_info['frompartner'],
                                             'topartner':ta_info['topartner'],'testindicator':ta_info['testindicator'],'charset':ta_info['charset'],
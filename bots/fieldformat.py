@@ -0,0 +1,105 @@
+''' Checking and formatting of date, time and numeric fields; used by inmessage and outmessage.
+    Results are the same as with time.strptime and decimal.Decimal.quantize (as used before), but faster:
+    - date/time: regular expressions are compiled once (same expressions as time.strptime uses), datetime.date checks the date.
+    - numbers: plain numbers are formatted as strings; decimal.Decimal is only used for other numbers.
+'''
+import re
+import datetime
+try:
+    import cdecimal as decimal
+except ImportError:
+    import decimal
+
+#regular expressions as used by time.strptime for %Y,%y,%m,%d,%H,%M,%S
+_YEAR4 = r'(\d\d\d\d)'
+_YEAR2 = r'(\d\d)'
+_MONTH = r'(1[0-2]|0[1-9]|[1-9])'
+_DAY = r'(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])'
+_HOUR = r'(2[0-3]|[0-1]\d|\d)'
+_MINUTE = r'([0-5]\d|\d)'
+_SECOND = r'(6[0-1]|[0-5]\d|\d)'
+CCYYMMDD = re.compile(_YEAR4 + _MONTH + _DAY)
+YYMMDD = re.compile(_YEAR2 + _MONTH + _DAY)
+HHMM = re.compile(_HOUR + _MINUTE)
+HHMMSS = re.compile(_HOUR + _MINUTE + _SECOND)
+#plain number: optional minus sign, digits (at least one not zero), optional decimals. Leading zeros are not in group.
+_PLAINNUMBER = re.compile(r'(-?)0*([1-9][0-9]*)(?:\.([0-9]*))?\Z')
+#for quantize() of numeric fields: QUANTIZE[nrdecimals] is decimal.Decimal(10) ** -nrdecimals
+QUANTIZE = [decimal.Decimal(10) ** -nrdecimals for nrdecimals in range(20)]
+NODECIMAL = decimal.Decimal(1)
+
+
+def checkdate(value):
+    ''' check date in format CCYYMMDD or YYMMDD.
+        same as time.strptime(value,'%Y%m%d') or time.strptime(value,'%y%m%d').
+        returns True if date is valid.
+    '''
+    lenght = len(value)
+    if lenght == 8:
+        match = CCYYMMDD.match(value)
+    elif lenght == 6:
+        match = YYMMDD.match(value)
+    else:
+        return False
+    if match is None or match.end() != lenght:      #as strptime: no 'unconverted data'
+        return False
+    year,month,day = match.groups()
+    year = int(year)
+    if lenght == 6:     #as strptime: 2-digit year 69-99 is 1969-1999, 00-68 is 2000-2068
+        year += 2000 if year <= 68 else 1900
+    try:
+        datetime.date(year,int(month),int(day))
+    except ValueError:
+        return False
+    return True
+
+def checktime(value,decimalseconds=True):
+    ''' check time in format HHMM, HHMMSS, or (if decimalseconds) HHMMSSD or HHMMSSDD.
+        same as time.strptime(value,'%H%M') or time.strptime(value,'%H%M%S').
+        returns True if time is valid.
+    '''
+    lenght = len(value)
+    if lenght == 4:
+        match = HHMM.match(value)
+    elif lenght == 6:
+        match = HHMMSS.match(value)
+    elif (lenght == 7 or lenght == 8) and decimalseconds:
+        if not value[6:].isdigit():
+            return False
+        value = value[:6]
+        lenght = 6
+        match = HHMMSS.match(value)
+    else:
+        return False
+    return match is not None and match.end() == lenght
+
+def quantize(value,nrdecimals):
+    ''' format number with nrdecimals decimals; rounds if needed.
+        same as unicode(decimal.Decimal(value).quantize(decimal.Decimal(10) ** -nrdecimals)); raises same exceptions.
+        value: string with canonical decimal sign ('.').
+    '''
+    match = _PLAINNUMBER.match(value)
+    if match is not None:
+        minussign,digits,decimals = match.groups()
+        decimals = decimals or ''
+        #no rounding needed and within precision of decimal (default 28 digits)
+        if len(decimals) <= nrdecimals and len(digits) + nrdecimals <= 28:
+            if nrdecimals:
+                return u'%s%s.%s'%(minussign,digits,decimals.ljust(nrdecimals,'0'))
+            return unicode(minussign + digits)
+    if nrdecimals < len(QUANTIZE):
+        return unicode(decimal.Decimal(value).quantize(QUANTIZE[nrdecimals]))
+    return unicode(decimal.Decimal(value).quantize(decimal.Decimal(10) ** -nrdecimals))
+
+def implicitdecimals(value,nrdecimals):
+    ''' format number with implicit decimals: number is multiplied by 10 ** nrdecimals and rounded to whole number.
+        same as unicode((decimal.Decimal(value) * 10**nrdecimals).quantize(decimal.Decimal(1))); raises same exceptions.
+        value: string with canonical decimal sign ('.').
+    '''
+    match = _PLAINNUMBER.match(value)
+    if match is not None:
+        minussign,digits,decimals = match.groups()
+        decimals = decimals or ''
+        if len(decimals) <= nrdecimals and len(digits) + nrdecimals <= 28:
+            return unicode(minussign + digits + decimals.ljust(nrdecimals,'0'))
+    return unicode((decimal.Decimal(value) * 10**nrdecimals).quantize(NODECIMAL))
@@ -1,9 +1,28 @@
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 from django.utils.translation import ugettext as _
 #bots-modules
 import botslib
+import botsglobal
 from botsconfig import *
 
+#registry of grammars read in this process. key: (typeofgrammarfile,editype,grammarname); for partners grammarname is the partner.
+_grammarregistry = {}
+
 def grammarread(editype,grammarname,typeofgrammarfile='grammars'):
+    ''' read grammar via registry: each grammar is read (and checked) once per process.
+        later reads return the same grammar object (as grammar files are python modules these are imported once anyway).
+        grammars with errors are not in registry (read again, error is raised again).
+    '''
+    key = (typeofgrammarfile,editype,grammarname)
+    if key not in _grammarregistry:
+        _grammarregistry[key] = _grammarread(editype,grammarname,typeofgrammarfile)
+    return _grammarregistry[key]
+
+def _grammarread(editype,grammarname,typeofgrammarfile):
     ''' dispatch function for class Grammar and subclasses.
         read whole grammar or only syntax (parameter 'typeofgrammarfile').
         directory from where grammar is via parameter 'typeofgrammarfile'.
@@ -98,6 +117,10 @@ class Grammar(object):
                 raise botslib.GrammarError(_(u'Grammar "%(grammar)s": nextmessageblock and nextmessage not both allowed.'),
                                             {'grammar':self.grammarname})
         if self._get_fromsyntax_or_defaultsyntax('has_structure'):
+            usediskcache = self._usediskcache()
+            if usediskcache and self._readdiskcache():
+                self.extrachecks()
+                return
             try:
                 self._dorecorddefs()
             except:
@@ -113,8 +136,68 @@ class Grammar(object):
             except:
                 self.structure[0]['error'] = True                #mark the structure as having errors
                 raise
+            if usediskcache:
+                self._writediskcache()
         self.extrachecks()
 
+    #*** on-disk cache of checked grammars (bots.ini: grammarcache).
+    #*** saves the checking of grammars at start of each bots-engine: the checked and linked structure and recorddefs are pickled.
+    #*** cache file is valid if bots version, grammar class and grammar files are not changed (mtime of grammar file and of all grammar files in same directory).
+    _diskcachestamps = {}       #directory of grammar -> latest mtime of grammar files in directory
+    _diskcacheformat = 2        #change if the content of checked structure changes
+
+    def _diskcachefile(self):
+        return botslib.join(botsglobal.ini.get('directories','botssys'),'grammarcache',self.__class__.__name__,os.path.basename(self.grammarname) + '.pickle')
+
+    def _diskcachestamp(self):
+        ''' grammars often import recorddefs etc from other grammars in same directory; use latest mtime of all grammar files in directory.'''
+        directory = os.path.dirname(self.grammarname)
+        if directory not in Grammar._diskcachestamps:
+            stamp = 0
+            for filename in os.listdir(directory):
+                if filename.endswith('.py'):
+                    stamp = max(stamp,os.path.getmtime(os.path.join(directory,filename)))
+            Grammar._diskcachestamps[directory] = stamp
+        return (botsglobal.version,Grammar._diskcacheformat,self.__class__.__name__,Grammar._diskcachestamps[directory])
+
+    def _usediskcache(self):
+        ''' not if grammar is already read in this process (in-process markers are used then).'''
+        if not botsglobal.ini.getboolean('settings','grammarcache',False):
+            return False
+        structure = getattr(self.module,'structure',None)
+        return bool(structure) and isinstance(structure,list) and MPATH not in structure[0] and 'error' not in structure[0]
+
+    def _readdiskcache(self):
+        ''' returns True if grammar is read from a valid cache file.'''
+        try:
+            with open(self._diskcachefile(),'rb') as cachefile:
+                cached = pickle.load(cachefile)
+            if cached['stamp'] != self._diskcachestamp():
+                return False
+        except Exception:
+            return False
+        self.structure = self.module.structure = cached['structure']     #set module too; later reads in this process use in-process markers
+        self.recorddefs = self.module.recorddefs = cached['recorddefs']
+        if cached['syntax'] != self.syntax:        #eg class fixed sets startrecordID in syntax while linking
+            self.syntax = cached['syntax']
+            if not hasattr(self.module,'syntax'):
+                self.module.syntax = {}
+            self.module.syntax.update(cached['syntax'])
+        return True
+
+    def _writediskcache(self):
+        filename = self._diskcachefile()
+        try:
+            botslib.dirshouldbethere(os.path.dirname(filename))
+            tmpfilename = filename + '.tmp' + str(os.getpid())
+            with open(tmpfilename,'wb') as cachefile:
+                pickle.dump({'stamp':self._diskcachestamp(),'structure':self.structure,'recorddefs':self.recorddefs,'syntax':self.syntax},cachefile,pickle.HIGHEST_PROTOCOL)
+            if os.path.exists(filename):
+                os.remove(filename)         #windows: rename does not overwrite
+            os.rename(tmpfilename,filename)
+        except Exception as msg:            #cache is not essential
+            botsglobal.logger.debug(u'Could not write grammar cache "%(file)s": %(txt)s',{'file':filename,'txt':msg})
+
     def _dorecorddefs(self):
         ''' 1. check the recorddefinitions for validity.
             2. adapt in field-records: normalise length lists, set bool ISFIELD, etc
@@ -278,9 +361,26 @@ class Grammar(object):
             except KeyError:
                 raise botslib.GrammarError(_(u'Grammar "%(grammar)s": in recorddef no record "%(record)s".'),
                                             {'grammar':self.grammarname,'record':i[ID]})
+            i[FIELDINDEX] = self._fieldindex(i[ID])
             if LEVEL in i:
                 self._linkrecorddefs2structure(i[LEVEL])
 
+    def _fieldindex(self,recordid):
+        ''' dict field ID -> field definition, for lookup of fields in a record (instead of looping over the fields).
+            has the fields, the subfields of non-repeating composites and the repeating composites (content of these is a list of dicts).
+            a record can be used more than once in a structure; the index is made once per record.
+        '''
+        if recordid not in self._fieldindexes:
+            fieldindex = {}
+            for field_definition in self.recorddefs[recordid]:
+                if field_definition[ISFIELD] or field_definition[MAXREPEAT] != 1:
+                    fieldindex[field_definition[ID]] = field_definition
+                else:
+                    for grammarsubfield in field_definition[SUBFIELDS]:
+                        fieldindex[grammarsubfield[ID]] = grammarsubfield
+            self._fieldindexes[recordid] = fieldindex
+        return self._fieldindexes[recordid]
+
     def _dostructure(self):
         ''' 1. check the structure for validity.
             2. adapt in structure: Add keys: mpath, count
@@ -299,6 +399,7 @@ class Grammar(object):
             self._checkbackcollision(self.structure)
             self._checknestedcollision(self.structure)
         self._checkbotscollision(self.structure)
+        self._fieldindexes = {}
         self._linkrecorddefs2structure(self.structure)
 
     def _checkstructure(self,structure,mpath):
@@ -607,6 +708,7 @@ class fixed(Grammar):
                 position_in_record += field[LENGTH]
             #calculate recordlength
             i[F_LENGTH] = sum([field[LENGTH] for field in i[FIELDS]])
+            i[FIELDINDEX] = self._fieldindex(i[ID])
             #go recursive
             if LEVEL in i:
                 self._linkrecorddefs2structure(i[LEVEL])
@@ -1,5 +1,5 @@
 ''' Reading/lexing/parsing/splitting an edifile.'''
-import time
+import re
 #~ import sys
 try:
     import cPickle as pickle
@@ -26,20 +26,23 @@ import outmessage
 import message
 import node
 import grammar
+import fieldformat
 from botsconfig import *
 
-def parse_edi_file(**ta_info):
+def parse_edi_file(streaming=False,**ta_info):
     ''' Read,lex, parse edi-file. Is a dispatch function for Inmessage and subclasses.
         Error handling: there are different types of errors.
         For all errors related to incoming messages: catch these.
         Try to extract the relevant information for the message.
         - unicode errors: charset is wrong.
+        streaming (edifact, x12, xml, json): edi-file is only read here; lexing and parsing is done message by message in nextmessage.
     '''
     try:
         classtocall = globals()[ta_info['editype']]  #get inmessage class to call (subclass of Inmessage)
     except KeyError:
         raise botslib.InMessageError(_(u'Unknown editype for incoming message: %(editype)s'),ta_info)
     ediobject = classtocall(ta_info)
+    ediobject.streaming = streaming
     #read, lex, parse the incoming edi file
     #ALL errors are caught; these are 'fatal errors': processing has stopped.
     #get information from error/exception; format this into ediobject.errorfatal
@@ -67,6 +70,7 @@ class Inmessage(message.Message):
     def __init__(self,ta_info):
         super(Inmessage,self).__init__(ta_info)
         self.lex_records = []        #init list of lex_records
+        self.streaming = False       #if True: lex and parse one message at a time (see nextmessage)
 
     def initfromfile(self):
         ''' Initialisation from a edi file.
@@ -76,6 +80,8 @@ class Inmessage(message.Message):
         #**charset errors, lex errors
         self._readcontent_edifile()     #open file. variants: read with charset, read as binary & handled in sniff, only opened and read in _lex.
         self._sniff()           #some hard-coded examination of edi file; ta_info can be overruled by syntax-parameters in edi-file
+        if self.streaming:
+            return              #lexing and parsing is done in nextmessage, one message at a time.
         #start lexing
         self._lex()
         if hasattr(self,'rawinput'):
@@ -83,7 +89,9 @@ class Inmessage(message.Message):
         #**breaking parser errors
         self.root = node.Node()  #make root Node None.
         self.iternext_lex_record = iter(self.lex_records)
-        leftover = self._parse(structure_level=self.defmessage.structure,inode=self.root)
+        for dummy in self._parse(structure_level=self.defmessage.structure,inode=self.root):
+            pass    #not streaming: nothing is yielded
+        leftover = self.unmatched_lex_record
         if leftover:
             raise botslib.InMessageError(_(u'[A50] line %(line)s pos %(pos)s: Found non-valid data at end of edi file; probably a problem with separators or message structure.'),
                                             {'line':leftover[0][LIN], 'pos':leftover[0][POS]})  #probably not reached with edifact/x12 because of mailbag processing.
@@ -121,31 +129,12 @@ class Inmessage(message.Message):
                 self.add2errorlist(_(u'[F06]%(linpos)s: Record "%(record)s" field "%(field)s" too small (min %(min)s): "%(content)s".\n')%
                                     {'linpos':node_instance.linpos(),'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value,'min':field_definition[MINLENGTH]})
         elif field_definition[BFORMAT] in 'DT':
-            lenght = len(value)
             if field_definition[BFORMAT] == 'D':
-                try:
-                    if lenght == 6:
-                        time.strptime(value,'%y%m%d')
-                    elif lenght == 8:
-                        time.strptime(value,'%Y%m%d')
-                    else:
-                        raise ValueError(u'To be catched')
-                except ValueError:
+                if not fieldformat.checkdate(value):
                     self.add2errorlist(_(u'[F07]%(linpos)s: Record "%(record)s" date field "%(field)s" not a valid date: "%(content)s".\n')%
                                         {'linpos':node_instance.linpos(),'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
             else:   #field_definition[BFORMAT] == 'T':
-                try:
-                    if lenght == 4:
-                        time.strptime(value,'%H%M')
-                    elif lenght == 6:
-                        time.strptime(value,'%H%M%S')
-                    elif lenght == 7 or lenght == 8:
-                        time.strptime(value[0:6],'%H%M%S')
-                        if not value[6:].isdigit():
-                            raise ValueError(u'To be catched')
-                    else:
-                        raise ValueError(u'To be catched')
-                except  ValueError:
+                if not fieldformat.checktime(value):
                     self.add2errorlist(_(u'[F08]%(linpos)s: Record "%(record)s" time field "%(field)s" not a valid time: "%(content)s".\n')%
                                         {'linpos':node_instance.linpos(),'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
         else:   #elif field_definition[BFORMAT] in 'RNI':   #numerics (R, N, I)
@@ -203,7 +192,7 @@ class Inmessage(message.Message):
                                             {'linpos':node_instance.linpos(),'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
         return value
 
-    def _parse(self,structure_level,inode):
+    def _parse(self,structure_level,inode,streaming=False):
         ''' This is the heart of the parsing of incoming messages (but not for xml, json)
             Read the lex_records one by one (self.iternext_lex_record, is an iterator)
             - parse the records.
@@ -213,7 +202,10 @@ class Inmessage(message.Message):
             Parameters:
             - structure_level: current grammar/segmentgroup of the grammar-structure.
             - inode: parent node; all parsed records are added as children of inode
+            - streaming: if True each parsed SUBTRANSLATION (eg edifact UNH, x12 ST) is yielded as soon as it is parsed and checked.
             2x recursive: SUBTRANSLATION and segmentgroups
+            Is a generator (only yields when streaming). A generator can not return a value:
+            the last lex_record (not matched in this level) is passed back in self.unmatched_lex_record.
         '''
         structure_index = 0     #keep track of where we are in the structure_level
         countnrofoccurences = 0 #number of occurences of current record in structure
@@ -242,7 +234,8 @@ class Inmessage(message.Message):
                     if current_lex_record is not None and structure_level == self.defmessage.structure:
                         raise botslib.InMessageError(self.messagetypetxt + _(u'[S50]: Line:%(line)s pos:%(pos)s record:"%(record)s": message has an error in its structure; this record is not allowed here. Scanned in message definition until mandatory record: "%(looked)s".'),
                                                                             {'record':current_lex_record[ID][VALUE],'line':current_lex_record[ID][LIN],'pos':current_lex_record[ID][POS],'looked':self.mpathformat(structure_level[structure_index-1][MPATH])})
-                    return current_lex_record    #return either None (no more lex_records to parse) or the last current_lex_record (the last current_lex_record is not found in this level)
+                    self.unmatched_lex_record = current_lex_record    #either None (no more lex_records to parse) or the last current_lex_record (the last current_lex_record is not found in this level)
+                    return
                 countnrofoccurences = 0
                 continue  #continue while-loop: get_next_lex_record is false as no match with structure is made; go and look at next record of structure
             #record is found in grammar
@@ -250,6 +243,12 @@ class Inmessage(message.Message):
             newnode = node.Node(record=self._parsefields(current_lex_record,structure_level[structure_index]),
                                 linpos_info=(current_lex_record[0][LIN],current_lex_record[0][POS]) )  #make new node
             inode.append(newnode)   #succes! append new node as a child to current (parent)node
+            if streaming:
+                #when streaming the messages are passed before the whole envelope is parsed; so get queries of envelope right now.
+                #queries are passed down to every record on the path to the message (also records without QUERIES, eg x12 GS).
+                if QUERIES in structure_level[structure_index]:
+                    self._queriesstreaming(newnode,structure_level[structure_index])
+                newnode.queries = inode.queries     #same as processqueries in nextmessage
             if SUBTRANSLATION in structure_level[structure_index]:
                 # start a SUBTRANSLATION; find the right messagetype, etc
                 messagetype = newnode.enhancedget(structure_level[structure_index][SUBTRANSLATION])
@@ -274,15 +273,26 @@ class Inmessage(message.Message):
                                                                 {'editype':self.__class__.__name__,'messagetype':messagetype})
                 self.messagecount += 1
                 self.messagetypetxt = _(u'Message nr %(count)s, type %(type)s, '%{'count':self.messagecount,'type':messagetype})
-                current_lex_record = self._parse(structure_level=defmessage.structure[0][LEVEL],inode=newnode)
+                for dummy in self._parse(structure_level=defmessage.structure[0][LEVEL],inode=newnode):
+                    pass    #no streaming within a SUBTRANSLATION: nothing is yielded
+                current_lex_record = self.unmatched_lex_record
                 newnode.queries = {'messagetype':messagetype}       #copy messagetype into 1st segment of subtranslation (eg UNH, ST)
                 self.checkmessage(newnode,defmessage,subtranslation=True)      #check the results of the subtranslation
                 #~ end SUBTRANSLATION
                 self.messagetypetxt = ''
+                if streaming:
+                    self._checkenvelopemessage(newnode,inode)       #check counters etc in envelope of this message
+                    self.checkforerrorlist()
+                    newnode.queries = inode.queries     #same as processqueries in nextmessage
+                    yield newnode
+                    #message is handled. Drop the content of message; the first record (UNH, ST) is kept for counting of messages and confirmations.
+                    newnode.setchildren([])
                 # get_next_lex_record is still False; we are trying to match the last (not matched) record from the SUBTRANSLATION (named 'current_lex_record').
             else:
                 if LEVEL in structure_level[structure_index]:        #if header, go parse segmentgroup (recursive)
-                    current_lex_record = self._parse(structure_level=structure_level[structure_index][LEVEL],inode=newnode)
+                    for messagenode in self._parse(structure_level=structure_level[structure_index][LEVEL],inode=newnode,streaming=streaming):
+                        yield messagenode
+                    current_lex_record = self.unmatched_lex_record
                     # get_next_lex_record is still False; the current_lex_record that was not matched in lower segmentgroups is still being parsed.
                 else:
                     get_next_lex_record = True
@@ -317,11 +327,35 @@ class Inmessage(message.Message):
     def checkenvelope(self):
         pass
 
+    def _queriesstreaming(self,inode,record_definition):
+        ''' when streaming: get queries of a record (eg UNB, ISA) right after it is parsed.
+            queries get formatted values, as when not streaming (eg x12 ISA13 '000000000' is '0').
+            record itself is formatted and checked when the whole envelope is parsed; errors are reported then.
+        '''
+        formattednode = node.Node(record=inode.record.copy())
+        nrerrors = len(self.errorlist)
+        self._canonicalfields(formattednode,record_definition)
+        del self.errorlist[nrerrors:]
+        formattednode.get_queries_from_edi(record_definition)
+        inode.queries = formattednode.queries
+
+    def _checkenvelopemessage(self,nodemessage,inode):
+        ''' when streaming: check envelope of one message (counters & references) before message content is dropped.
+            method is specified in subclasses.
+        '''
+        pass
+
     def nextmessage(self):
         ''' Generates each message as a separate Inmessage.
         '''
         #~ self.root.display()
-        if self.defmessage.nextmessage is not None: #if nextmessage defined in grammar: split up messages
+        if self.streaming:  #lex and parse the edi file while generating the messages
+            for eachmessage in self._parsestreaming():
+                ta_info = self.ta_info.copy()
+                ta_info.update(eachmessage.queries)
+                ta_info['bots_accessenvelope'] = self.root   #give mappingscript access to envelope
+                yield self._initmessagefromnode(eachmessage,ta_info)
+        elif self.defmessage.nextmessage is not None: #if nextmessage defined in grammar: split up messages
             first = True
             for eachmessage in self.getloop(*self.defmessage.nextmessage):  #get node of each message
                 if first:
@@ -482,31 +516,12 @@ class fixed(Inmessage):
         if field_definition[BFORMAT] == 'A':
             pass
         elif field_definition[BFORMAT] in 'DT':
-            lenght = len(value)
             if field_definition[BFORMAT] == 'D':
-                try:
-                    if lenght == 6:
-                        time.strptime(value,'%y%m%d')
-                    elif lenght == 8:
-                        time.strptime(value,'%Y%m%d')
-                    else:
-                        raise ValueError(u'To be catched')
-                except ValueError:
+                if not fieldformat.checkdate(value):
                     self.add2errorlist(_(u'[F07]%(linpos)s: Record "%(record)s" date field "%(field)s" not a valid date: "%(content)s".\n')%
                                         {'linpos':node_instance.linpos(),'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
             else:   #if field_definition[BFORMAT] == 'T':
-                try:
-                    if lenght == 4:
-                        time.strptime(value,'%H%M')
-                    elif lenght == 6:
-                        time.strptime(value,'%H%M%S')
-                    elif lenght == 7 or lenght == 8:
-                        time.strptime(value[0:6],'%H%M%S')
-                        if not value[6:].isdigit():
-                            raise ValueError(u'To be catched')
-                    else:
-                        raise ValueError(u'To be catched')
-                except  ValueError:
+                if not fieldformat.checktime(value):
                     self.add2errorlist(_(u'[F08]%(linpos)s: Record "%(record)s" time field "%(field)s" not a valid time: "%(content)s".\n')%
                                         {'linpos':node_instance.linpos(),'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
         else:   #elif field_definition[BFORMAT] in 'RNI':   #numerics (R, N, I)
@@ -563,6 +578,174 @@ class var(Inmessage):
     ''' abstract class for edi-objects with records of variabele length.'''
     def _lex(self):
         ''' lexes file with variable records to list of lex_records, fields and subfields (build self.lex_records).'''
+        for lex_record in self._lexrecords():
+            self.lex_records.append(lex_record)
+
+    def _parsestreaming(self):
+        ''' Generator: lexes and parses edi file, yields each message (SUBTRANSLATION, eg UNH or ST) as soon as it is parsed and checked.
+            After a message is handled its content is dropped: memory use depends on the largest message, not on the size of the edi file.
+            Checks for whole edi file (envelope counters, etc) are done after the last message.
+            If errors are found an exception is raised; processing of edi file stops.
+        '''
+        self.errorfatal = True      #no decent node tree until whole edi file is parsed
+        self.root = node.Node()  #make root Node None.
+        self.iternext_lex_record = self._lexrecords()
+        for messagenode in self._parse(structure_level=self.defmessage.structure,inode=self.root,streaming=True):
+            yield messagenode
+        leftover = self.unmatched_lex_record
+        if leftover:
+            raise botslib.InMessageError(_(u'[A50] line %(line)s pos %(pos)s: Found non-valid data at end of edi file; probably a problem with separators or message structure.'),
+                                            {'line':leftover[0][LIN], 'pos':leftover[0][POS]})
+        del self.iternext_lex_record
+        del self.rawinput
+        self.checkenvelope()
+        self.checkmessage(self.root,self.defmessage)
+        for childnode in self.root.children:
+            self.ta_info.update(childnode.queries)
+            break
+        self.checkforerrorlist()
+        self.errorfatal = False
+
+    def _lexrecords(self):
+        ''' returns generator for the lex_records of the edi file.
+            if there are no quotes in the edi file the fast lexer is used, else the lexer that does char-by-char.
+            both lexers give the same lex_records (incl line and position).
+        '''
+        quote_char = self.ta_info['quote_char']
+        if quote_char and quote_char in self.rawinput:
+            return self._lexcharbychar()
+        else:
+            return self._lexfast()
+
+    def _lexfast(self):
+        ''' generator for lex_records of file with variable records; same results as _lexcharbychar, but faster.
+            Uses a regular expression to find the chars that need attention: separators, escape, skip_char and new-line.
+            The chars between these are added to the token in one go; the chars that need attention are handled char by char,
+            in the same way as in _lexcharbychar.
+            Can not handle quotes: is only used if there is no quote_char in the edi file.
+        '''
+        record_sep  = self.ta_info['record_sep']
+        mode_inrecord = 0  # 1 indicates: lexing in record, 0 is lexing 'between records'.
+        field_sep   = self.ta_info['field_sep'] + self.ta_info['record_tag_sep']    #for tradacoms; field_sep and record_tag_sep have same function.
+        sfield_sep  = self.ta_info['sfield_sep']
+        rep_sep     = self.ta_info['reserve']
+        sfield      = 0 # 1: subfield, 0: not a subfield, 2:repeat
+        escape      = self.ta_info['escape']      #char after escape-char is not interpreted as separator
+        mode_escape = 0    #0=not escaping, 1=escaping
+        skip_char   = self.ta_info['skip_char']   #chars to ignore/skip/discard. eg edifact: if wrapped to 80pos lines and <CR/LF> at end of segment
+        lex_record  = []   #gather the content of a record
+        value       = u''  #gather the content of (sub)field; the current token
+        valueline   = 1    #record line of token
+        valuepos    = 1    #record position of token in line
+        countline   = 1    #count number of lines; start with 1
+        countpos    = 0    #count position/number of chars within line
+        sep = field_sep + sfield_sep + record_sep + escape + rep_sep
+        tab_is_field_sep = isinstance(self,csv)     #see _lexcharbychar: for csv a field_sep that is whitespace is not ignored between records.
+        specialchars = u''.join(set(sep + skip_char + u'\n'))
+        rawinput = self.rawinput
+        startpos = 0
+        for match in re.finditer(u'[' + re.escape(specialchars) + u']',rawinput):
+            endpos = match.start()
+            if startpos < endpos:
+                #handle chunk of 'normal' chars: no separators, no skip_char, no new-line
+                chunk = rawinput[startpos:endpos]
+                chunkpos = countpos
+                countpos += len(chunk)
+                if not mode_inrecord:
+                    #whitespace 'between' records is ignored
+                    stripped_chunk = chunk.lstrip()
+                    if stripped_chunk:
+                        mode_inrecord = 1   #not whitespace - a new record has started
+                        chunkpos += len(chunk) - len(stripped_chunk)
+                        chunk = stripped_chunk
+                    else:
+                        chunk = u''
+                if chunk:
+                    if mode_escape:
+                        #first char of chunk is escaped: is appended to token, no new token.
+                        mode_escape = 0
+                    elif not value:
+                        #this is a new token, get line and pos for (new) token
+                        valueline = countline
+                        valuepos = chunkpos + 1
+                    value += chunk
+            startpos = match.end()
+            #handle the char that needs attention
+            char = match.group()
+            if char == u'\n':
+                countline += 1      #count line
+                countpos = 0        #position back to 0
+            else:
+                countpos += 1       #position within line
+            if not mode_inrecord:
+                if char.isspace() and not (char in field_sep and tab_is_field_sep):
+                    continue    #ignore character
+                mode_inrecord = 1   #not whitespace - a new record has started
+            if char in skip_char:
+                continue
+            if mode_escape:
+                mode_escape = 0
+                value += char
+                continue
+            if not value:
+                valueline = countline
+                valuepos = countpos
+            if char not in sep:         #new-line that is not a separator
+                value += char
+                continue
+            if char in field_sep:
+                lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #write current value to lex_record
+                value = u''
+                sfield = 0      #new token is field
+                continue
+            if char == sfield_sep:
+                lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #write current value to lex_record
+                value = u''
+                sfield = 1        #new token is sub-field
+                continue
+            if char in record_sep:      #end of record
+                lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #write current value to lex_record
+                yield lex_record                 #lex_record is complete
+                lex_record = []
+                value = u''
+                sfield = 0      #new token is field
+                mode_inrecord = 0    #we are not in a record
+                continue
+            if char == escape:
+                mode_escape = 1
+                continue
+            if char == rep_sep:
+                lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #write current value to lex_record
+                value = u''
+                sfield = 2        #new token is repeating
+                continue
+        #handle the chars after the last char that needs attention
+        chunk = rawinput[startpos:]
+        if not mode_inrecord:
+            stripped_chunk = chunk.lstrip()
+            if stripped_chunk:
+                mode_inrecord = 1
+                countpos += len(chunk) - len(stripped_chunk)
+            chunk = stripped_chunk
+        if chunk:
+            if not mode_escape and not value:
+                valueline = countline
+                valuepos = countpos + 1
+            value += chunk
+        #end of input. see _lexcharbychar for this.
+        if mode_inrecord and self.ta_info.get('allow_lastrecordnotclosedproperly',False):
+            lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #append element in record
+            yield lex_record
+        else:
+            leftover = value.strip('\x00\x1a')
+            if leftover:
+                raise botslib.InMessageError(_(u'[A51]: Found non-valid data at end of edi file; probably a problem with separators or message structure: "%(leftover)s".'),
+                                                {'leftover':leftover})
+
+    def _lexcharbychar(self):
+        ''' generator for lex_records of file with variable records: fields and subfields.
+            Char by char; handles all situations (incl quotes).
+        '''
         record_sep  = self.ta_info['record_sep']
         mode_inrecord = 0  # 1 indicates: lexing in record, 0 is lexing 'between records'.
         field_sep   = self.ta_info['field_sep'] + self.ta_info['record_tag_sep']    #for tradacoms; field_sep and record_tag_sep have same function.
@@ -655,7 +838,7 @@ class var(Inmessage):
                 continue
             if char in record_sep:      #end of record
                 lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #write current value to lex_record
-                self.lex_records.append(lex_record)                 #write lex_record to self.lex_records
+                yield lex_record                 #lex_record is complete
                 lex_record = []
                 value = u''
                 sfield = 0      #new token is field 
@@ -674,7 +857,7 @@ class var(Inmessage):
         #it appears a csv record is not always closed properly, so force the closing of the last record of csv file:
         if mode_inrecord and self.ta_info.get('allow_lastrecordnotclosedproperly',False):
             lex_record.append({VALUE:value,SFIELD:sfield,LIN:valueline,POS:valuepos})    #append element in record
-            self.lex_records.append(lex_record)    #write record to recordlist
+            yield lex_record
         else:
             leftover = value.strip('\x00\x1a')
             if leftover:
@@ -820,7 +1003,9 @@ class excel(csv):
             del self.rawinput
         self.root = node.Node()  #make root Node None.
         self.iternext_lex_record = iter(self.lex_records)
-        leftover = self._parse(structure_level=self.defmessage.structure,inode=self.root)
+        for dummy in self._parse(structure_level=self.defmessage.structure,inode=self.root):
+            pass    #not streaming: nothing is yielded
+        leftover = self.unmatched_lex_record
         if leftover:
             raise botslib.InMessageError(_(u'[A52]: Found non-valid data at end of excel file: "%(leftover)s".'),
                                             {'leftover':leftover})
@@ -990,18 +1175,9 @@ class edifact(var):
                     self.add2errorlist(_(u'[E02]: Count of messages in UNZ is %(unzcount)s; should be equal to number of messages %(messagecount)s.\n')%{'unzcount':unzcount,'messagecount':messagecount})
             except:
                 self.add2errorlist(_(u'[E03]: Count of messages in UNZ is invalid: "%(count)s".\n')%{'count':unzcount})
-            for nodeunh in nodeunb.getloop({'BOTSID':'UNB'},{'BOTSID':'UNH'}):
-                unhreference = nodeunh.get({'BOTSID':'UNH','0062':None})
-                untreference = nodeunh.get({'BOTSID':'UNH'},{'BOTSID':'UNT','0062':None})
-                if unhreference and untreference and unhreference != untreference:
-                    self.add2errorlist(_(u'[E04]: UNH-reference is "%(unhreference)s"; should be equal to UNT-reference "%(untreference)s".\n')%{'unhreference':unhreference,'untreference':untreference})
-                untcount = nodeunh.get({'BOTSID':'UNH'},{'BOTSID':'UNT','0074':None})
-                segmentcount = nodeunh.getcount()
-                try:
-                    if int(untcount) != segmentcount:
-                        self.add2errorlist(_(u'[E05]: Segmentcount in UNT is %(untcount)s; should be equal to number of segments %(segmentcount)s.\n')%{'untcount':untcount,'segmentcount':segmentcount})
-                except:
-                    self.add2errorlist(_(u'[E06]: Count of segments in UNT is invalid: "%(count)s".\n')%{'count':untcount})
+            if not self.streaming:      #when streaming messages are checked while parsing
+                for nodeunh in nodeunb.getloop({'BOTSID':'UNB'},{'BOTSID':'UNH'}):
+                    self._checkenvelopemessage(nodeunh,nodeunb)
             for nodeung in nodeunb.getloop({'BOTSID':'UNB'},{'BOTSID':'UNG'}):
                 ungreference = nodeung.get({'BOTSID':'UNG','0048':None})
                 unereference = nodeung.get({'BOTSID':'UNG'},{'BOTSID':'UNE','0048':None})
@@ -1014,20 +1190,35 @@ class edifact(var):
                         self.add2errorlist(_(u'[E08]: Groupcount in UNE is %(unecount)s; should be equal to number of groups %(groupcount)s.\n')%{'unecount':unecount,'groupcount':groupcount})
                 except:
                     self.add2errorlist(_(u'[E09]: Groupcount in UNE is invalid: "%(count)s".\n')%{'count':unecount})
-                for nodeunh in nodeung.getloop({'BOTSID':'UNG'},{'BOTSID':'UNH'}):
-                    unhreference = nodeunh.get({'BOTSID':'UNH','0062':None})
-                    untreference = nodeunh.get({'BOTSID':'UNH'},{'BOTSID':'UNT','0062':None})
-                    if unhreference and untreference and unhreference != untreference:
-                        self.add2errorlist(_(u'[E10]: UNH-reference is "%(unhreference)s"; should be equal to UNT-reference "%(untreference)s".\n')%{'unhreference':unhreference,'untreference':untreference})
-                    untcount = nodeunh.get({'BOTSID':'UNH'},{'BOTSID':'UNT','0074':None})
-                    segmentcount = nodeunh.getcount()
-                    try:
-                        if int(untcount) != segmentcount:
-                            self.add2errorlist(_(u'[E11]: Segmentcount in UNT is %(untcount)s; should be equal to number of segments %(segmentcount)s.\n')%{'untcount':untcount,'segmentcount':segmentcount})
-                    except:
-                        self.add2errorlist(_(u'[E12]: Count of segments in UNT is invalid: "%(count)s".\n')%{'count':untcount})
+                if not self.streaming:      #when streaming messages are checked while parsing
+                    for nodeunh in nodeung.getloop({'BOTSID':'UNG'},{'BOTSID':'UNH'}):
+                        self._checkenvelopemessage(nodeunh,nodeung)
             botsglobal.logmap.debug(u'Parsing edifact envelopes is OK')
 
+    def _checkenvelopemessage(self,nodeunh,inode):
+        ''' check UNH-UNT counters & references for one message. inode is the UNB or UNG of the message.
+        '''
+        unhreference = nodeunh.get({'BOTSID':'UNH','0062':None})
+        untreference = nodeunh.get({'BOTSID':'UNH'},{'BOTSID':'UNT','0062':None})
+        untcount = nodeunh.get({'BOTSID':'UNH'},{'BOTSID':'UNT','0074':None})
+        segmentcount = nodeunh.getcount()
+        if inode.record['BOTSID'] == 'UNB':
+            if unhreference and untreference and unhreference != untreference:
+                self.add2errorlist(_(u'[E04]: UNH-reference is "%(unhreference)s"; should be equal to UNT-reference "%(untreference)s".\n')%{'unhreference':unhreference,'untreference':untreference})
+            try:
+                if int(untcount) != segmentcount:
+                    self.add2errorlist(_(u'[E05]: Segmentcount in UNT is %(untcount)s; should be equal to number of segments %(segmentcount)s.\n')%{'untcount':untcount,'segmentcount':segmentcount})
+            except:
+                self.add2errorlist(_(u'[E06]: Count of segments in UNT is invalid: "%(count)s".\n')%{'count':untcount})
+        else:   #message in UNG-group
+            if unhreference and untreference and unhreference != untreference:
+                self.add2errorlist(_(u'[E10]: UNH-reference is "%(unhreference)s"; should be equal to UNT-reference "%(untreference)s".\n')%{'unhreference':unhreference,'untreference':untreference})
+            try:
+                if int(untcount) != segmentcount:
+                    self.add2errorlist(_(u'[E11]: Segmentcount in UNT is %(untcount)s; should be equal to number of segments %(segmentcount)s.\n')%{'untcount':untcount,'segmentcount':segmentcount})
+            except:
+                self.add2errorlist(_(u'[E12]: Count of segments in UNT is invalid: "%(count)s".\n')%{'count':untcount})
+
     def handleconfirm(self,ta_fromfile,error):
         ''' done at end of edifact file handling.
             generates CONTRL messages (or not)
@@ -1216,22 +1407,28 @@ class x12(var):
                         self.add2errorlist(_(u'[E17]: Count in GE-GE01 is %(gecount)s; should be equal to number of transactions: %(messagecount)s.\n')%{'gecount':gecount,'messagecount':messagecount})
                 except:
                     self.add2errorlist(_(u'[E18]: Count of messages in GE is invalid: "%(count)s".\n')%{'count':gecount})
-                for nodest in nodegs.getloop({'BOTSID':'GS'},{'BOTSID':'ST'}):
-                    #~ stqualifier = nodest.get({'BOTSID':'ST','ST01':None})
-                    streference = nodest.get({'BOTSID':'ST','ST02':None})
-                    sereference = nodest.get({'BOTSID':'ST'},{'BOTSID':'SE','SE02':None})
-                    #referencefields are numerical; should I compare values??
-                    if streference and sereference and streference != sereference:
-                        self.add2errorlist(_(u'[E19]: ST-reference is "%(streference)s"; should be equal to SE-reference "%(sereference)s".\n')%{'streference':streference,'sereference':sereference})
-                    secount = nodest.get({'BOTSID':'ST'},{'BOTSID':'SE','SE01':None})
-                    segmentcount = nodest.getcount()
-                    try:
-                        if int(secount) != segmentcount:
-                            self.add2errorlist(_(u'[E20]: Count in SE-SE01 is %(secount)s; should be equal to number of segments %(segmentcount)s.\n')%{'secount':secount,'segmentcount':segmentcount})
-                    except:
-                        self.add2errorlist(_(u'[E21]: Count of segments in SE is invalid: "%(count)s".\n')%{'count':secount})
+                if not self.streaming:      #when streaming messages are checked while parsing
+                    for nodest in nodegs.getloop({'BOTSID':'GS'},{'BOTSID':'ST'}):
+                        self._checkenvelopemessage(nodest,nodegs)
             botsglobal.logmap.debug(u'Parsing X12 envelopes is OK')
 
+    def _checkenvelopemessage(self,nodest,inode):
+        ''' check ST-SE counters & references for one message.
+        '''
+        #~ stqualifier = nodest.get({'BOTSID':'ST','ST01':None})
+        streference = nodest.get({'BOTSID':'ST','ST02':None})
+        sereference = nodest.get({'BOTSID':'ST'},{'BOTSID':'SE','SE02':None})
+        #referencefields are numerical; should I compare values??
+        if streference and sereference and streference != sereference:
+            self.add2errorlist(_(u'[E19]: ST-reference is "%(streference)s"; should be equal to SE-reference "%(sereference)s".\n')%{'streference':streference,'sereference':sereference})
+        secount = nodest.get({'BOTSID':'ST'},{'BOTSID':'SE','SE01':None})
+        segmentcount = nodest.getcount()
+        try:
+            if int(secount) != segmentcount:
+                self.add2errorlist(_(u'[E20]: Count in SE-SE01 is %(secount)s; should be equal to number of segments %(segmentcount)s.\n')%{'secount':secount,'segmentcount':segmentcount})
+        except:
+            self.add2errorlist(_(u'[E21]: Count of segments in SE is invalid: "%(count)s".\n')%{'count':secount})
+
     def try_to_retrieve_info(self):
         ''' when edi-file is not correct, (try to) get info about eg partnerID's in message
             for now: look around in lexed record
@@ -1348,11 +1545,56 @@ class tradacoms(var):
             botsglobal.logmap.debug(u'Parsing tradacoms envelopes is OK')
 
 
+class _XmlEventTarget(object):
+    ''' target for ET.XMLParser: builds the xml elements (via ET.TreeBuilder) and collects 'start' and 'end' events.
+        Same as ET.iterparse, but iterparse of cElementTree can not be used with extra_character_entity.
+    '''
+    def __init__(self):
+        self.builder = ET.TreeBuilder()
+        self.events = []
+
+    def start(self,tag,attrib):
+        self.events.append(('start',self.builder.start(tag,attrib)))
+
+    def end(self,tag):
+        self.events.append(('end',self.builder.end(tag)))
+
+    def data(self,data):
+        self.builder.data(data)
+
+    def close(self):
+        return self.builder.close()
+
+def _iterparse(filename,extra_character_entity):
+    ''' generator: read xml file in chunks, yield (event,xml element) for each start and end of an xml element.
+        The element is complete (text, children) at its 'end' event.
+    '''
+    target = _XmlEventTarget()
+    parser = ET.XMLParser(target=target)
+    for key,value in extra_character_entity.iteritems():
+        parser.entity[key] = value
+    filehandler = botslib.opendata(filename=filename,mode='rb')
+    try:
+        while True:
+            content = filehandler.read(65536)
+            if content:
+                parser.feed(content)
+            else:
+                parser.close()
+            for event in target.events:
+                yield event
+            del target.events[:]
+            if not content:
+                break
+    finally:
+        filehandler.close()
+
 class xml(Inmessage):
     ''' class for ediobjects in XML. Uses ElementTree'''
     def initfromfile(self):
         botsglobal.logger.debug(u'Read edi file "%(filename)s".',self.ta_info)
         filename = botslib.abspathdata(self.ta_info['filename'])
+        etreeroot = None
 
         if self.ta_info['messagetype'] == 'mailbag':
             # the messagetype is not know.
@@ -1370,33 +1612,39 @@ class xml(Inmessage):
             except botslib.BotsImportError:
                 botsglobal.logger.error(u'Missing mailbag definitions for xml, should be there.')
                 raise
-            parser = ET.XMLParser()
-            try:
-                extra_character_entity = getattr(module, 'extra_character_entity')
-                for key,value in extra_character_entity.iteritems():
-                    parser.entity[key] = value
-            except AttributeError:
-                pass    #there is no extra_character_entity in the mailbag definitions, is OK.
-            etree =  ET.ElementTree()   #ElementTree: lexes, parses, makes etree; etree is quite similar to bots-node trees but conversion is needed
-            etreeroot = etree.parse(filename, parser)
-            for item in mailbagsearch:
-                if 'xpath' not in item or 'messagetype' not in item:
-                    raise botslib.InMessageError(_(u'Invalid search parameters in xml mailbag.'))
-                #~ print 'search' ,item
-                found = etree.find(item['xpath'])
-                if found is not None:
-                    #~ print '    found'
-                    if 'content' in item and found.text != item['content']:
-                        continue
-                    self.ta_info['messagetype'] = item['messagetype']
-                    #~ print '    found right messagedefinition'
-                    break
+            if self.streaming:
+                self.ta_info['messagetype'] = self._mailbagsearchstreaming(self.ta_info['filename'],getattr(module,'extra_character_entity',{}),mailbagsearch)
             else:
-                raise botslib.InMessageError(_(u'Could not find right xml messagetype for mailbag.'))
-
-            self.messagegrammarread()
-        else:
-            self.messagegrammarread()
+                parser = ET.XMLParser()
+                try:
+                    extra_character_entity = getattr(module, 'extra_character_entity')
+                    for key,value in extra_character_entity.iteritems():
+                        parser.entity[key] = value
+                except AttributeError:
+                    pass    #there is no extra_character_entity in the mailbag definitions, is OK.
+                etree =  ET.ElementTree()   #ElementTree: lexes, parses, makes etree; etree is quite similar to bots-node trees but conversion is needed
+                etreeroot = etree.parse(filename, parser)
+                for item in mailbagsearch:
+                    if 'xpath' not in item or 'messagetype' not in item:
+                        raise botslib.InMessageError(_(u'Invalid search parameters in xml mailbag.'))
+                    #~ print 'search' ,item
+                    found = etree.find(item['xpath'])
+                    if found is not None:
+                        #~ print '    found'
+                        if 'content' in item and found.text != item['content']:
+                            continue
+                        self.ta_info['messagetype'] = item['messagetype']
+                        #~ print '    found right messagedefinition'
+                        break
+                else:
+                    raise botslib.InMessageError(_(u'Could not find right xml messagetype for mailbag.'))
+        self.messagegrammarread()
+        if self.streaming:
+            self.messagepath = self._messagepath()
+            if self.messagepath is not None:
+                return          #reading and parsing is done in nextmessage, one message at a time.
+            self.streaming = False  #grammar does not indicate how to split up in messages: read whole file.
+        if etreeroot is None:
             parser = ET.XMLParser()
             for key,value in self.ta_info['extra_character_entity'].iteritems():
                 parser.entity[key] = value
@@ -1408,33 +1656,197 @@ class xml(Inmessage):
         self.checkmessage(self.root,self.defmessage)
         self.ta_info.update(self.root.queries)
 
+    def _mailbagsearchstreaming(self,filename,extra_character_entity,mailbagsearch):
+        ''' as the search for messagetype of mailbag in initfromfile, but xml file is read incrementally.
+            The xpaths are used on the root with one child of the root at a time; after that this child is dropped.
+            As in initfromfile only the first xml element found for a xpath is compared with 'content'.
+            Returns messagetype of first item in mailbagsearch that is found.
+        '''
+        for item in mailbagsearch:
+            if 'xpath' not in item or 'messagetype' not in item:
+                raise botslib.InMessageError(_(u'Invalid search parameters in xml mailbag.'))
+        results = [None] * len(mailbagsearch)     #for each item: None (not found yet), True (found), False (found but not right content)
+        level = 0
+        for event,xmlnode in _iterparse(filename,extra_character_entity):
+            if event == 'start':
+                if not level:
+                    etree = ET.ElementTree(xmlnode)
+                level += 1
+                continue
+            level -= 1
+            if level > 1:
+                continue
+            #a child of root or the root itself is complete: search
+            for index,item in enumerate(mailbagsearch):
+                if results[index] is None:
+                    found = etree.find(item['xpath'])
+                    if found is not None:
+                        results[index] = 'content' not in item or found.text == item['content']
+            if True in results and None not in results[:results.index(True)]:
+                break       #no better match possible
+            if level:
+                etree.getroot().remove(xmlnode)
+        if True not in results:
+            raise botslib.InMessageError(_(u'Could not find right xml messagetype for mailbag.'))
+        return mailbagsearch[results.index(True)]['messagetype']
+
+    def _messagepath(self):
+        ''' for streaming: returns the record definitions (from structure in grammar) from root to message, as indicated by nextmessage in grammar.
+            Returns None if file can not be split up while reading: no nextmessage, message is the root, or nextmessage uses other fields than BOTSID.
+        '''
+        if self.defmessage.nextmessage is None or self.defmessage.nextmessage2 is not None or len(self.defmessage.nextmessage) < 2:
+            return None
+        messagepath = []
+        structure_level = self.defmessage.structure
+        for mpath in self.defmessage.nextmessage:
+            if 'BOTSID' not in mpath or set(mpath) - set(['BOTSID','BOTSIDnr']):
+                return None
+            for structure_record in structure_level:
+                if structure_record[ID] == mpath['BOTSID'] and structure_record[BOTSIDNR] == mpath.get('BOTSIDnr',u'1'):
+                    break
+            else:
+                return None
+            messagepath.append(structure_record)
+            structure_level = structure_record.get(LEVEL,[])
+        return messagepath
+
+    def _parsestreaming(self):
+        ''' Generator: reads xml file incrementally, yields each message (xml element as indicated by nextmessage in grammar) as soon as it is read and checked.
+            After a message is handled its content is dropped (both the xml element and the nodes):
+            memory use depends on the largest message, not on the size of the xml file.
+            The xml elements around the messages (the envelope) are kept; the envelope is checked after the last message.
+        '''
+        self.errorfatal = True      #no decent node tree until whole xml file is read
+        messagepath = self.messagepath
+        messagedefinition = messagepath[-1]
+        envelope = []       #nodes for the open xml elements around the messages (root, ...)
+        xmlenvelope = []    #the open xml elements around the messages
+        level = 0           #number of open xml elements
+        for event,xmlnode in _iterparse(self.ta_info['filename'],self.ta_info['extra_character_entity']):
+            if event == 'start':
+                if not level and xmlnode.tag != messagepath[0][ID]:
+                    raise botslib.MessageRootError(_(u'[G50]: Grammar "%(grammar)s" starts with record "%(grammarroot)s"; but in edi-file found start-record "%(root)s".'),
+                                                {'root':xmlnode.tag,'grammarroot':messagepath[0][ID],'grammar':self.defmessage.grammarname})
+                if level == len(envelope) and level < len(messagepath) - 1 and xmlnode.tag == messagepath[level][ID]:
+                    #xml element around the messages; only the xml-attributes are known now.
+                    self._handle_empty(xmlnode)
+                    envelopenode = node.Node(record=self._etreenode2botstreenode(xmlnode))
+                    if envelope:
+                        envelope[-1].append(envelopenode)
+                    else:
+                        self.root = envelopenode
+                    envelope.append(envelopenode)
+                    xmlenvelope.append(xmlnode)
+                level += 1
+                continue
+            level -= 1
+            if envelope and xmlnode is xmlenvelope[-1]:
+                #end of xml element around the messages
+                if xmlnode.text and xmlnode.text.strip():
+                    envelope[-1].record['BOTSCONTENT'] = xmlnode.text.strip()
+                envelope.pop()
+                xmlenvelope.pop()
+                if xmlenvelope:
+                    xmlenvelope[-1].remove(xmlnode)
+            elif level == len(envelope):
+                #xml element within envelope is complete: a message, or another field/record of envelope
+                self._handle_empty(xmlnode)
+                self.stack = [messagepath[level-1]]
+                newnode = self._etreechild2botstree(envelope[-1],xmlnode)
+                xmlenvelope[-1].remove(xmlnode)
+                xmlnode.clear()
+                if newnode is not None and level == len(messagepath) - 1 and xmlnode.tag == messagedefinition[ID]:
+                    self.messagecount += 1
+                    self._checkifrecordsingrammar(newnode,messagedefinition,self.defmessage.grammarname)
+                    self._canonicaltree(newnode,messagedefinition)
+                    if botsglobal.ini.getboolean('settings','readrecorddebug',False):
+                        self._logmessagecontent(newnode)
+                    self.checkforerrorlist()
+                    #when streaming the messages are passed before the whole envelope is read; so get queries of envelope right now.
+                    queries = {}
+                    for envelopenode,structure_record in zip(envelope,messagepath):
+                        if QUERIES in structure_record:
+                            envelopenode.get_queries_from_edi(structure_record)
+                        envelopenode.queries = queries  #same as processqueries in nextmessage
+                        queries = envelopenode.queries
+                    newnode.queries = queries
+                    yield newnode
+                    #message is handled. Replace message by a node with only BOTSID; this is used in check of envelope.
+                    siblings = envelope[-1].children
+                    for index in xrange(len(siblings)-1,-1,-1):
+                        if siblings[index] is newnode:
+                            siblings[index] = node.Node(record={'BOTSID':newnode.record['BOTSID'],'BOTSIDnr':newnode.record['BOTSIDnr']})
+                            envelope[-1].setchildren(siblings)  #drops index of children, that still refers to the message
+                            break
+        #check the envelope. The messages are replaced by nodes with only BOTSID, so use grammar with only BOTSID for messages.
+        structure_record = dict((key,value) for key,value in messagedefinition.iteritems() if key not in (LEVEL,QUERIES,SUBTRANSLATION))
+        structure_record[FIELDS] = [field_definition for field_definition in messagedefinition[FIELDS] if field_definition[ID] == 'BOTSID']
+        structure_record[FIELDINDEX] = {'BOTSID':messagedefinition[FIELDINDEX]['BOTSID']}
+        for depth in xrange(len(messagepath)-2,-1,-1):
+            child_record = structure_record
+            structure_record = messagepath[depth].copy()
+            structure_record[LEVEL] = [child_record if record_definition is messagepath[depth+1] else record_definition
+                                        for record_definition in messagepath[depth][LEVEL]]
+        self._checkifrecordsingrammar(self.root,structure_record,self.defmessage.grammarname)
+        self._canonicaltree(self.root,structure_record)
+        self.ta_info.update(self.root.queries)
+        self.checkforerrorlist()
+        self.errorfatal = False
+
     def _handle_empty(self,xmlnode):
-        if xmlnode.text:
-            xmlnode.text = xmlnode.text.strip()
-        for key,value in xmlnode.items():
-            xmlnode.attrib[key] = value.strip()
-        for xmlchildnode in xmlnode:   #for every node in mpathtree
-            self._handle_empty(xmlchildnode)
-            
+        ''' strip text and xml-attributes of xmlnode and all xml elements within xmlnode.'''
+        for xmlchildnode in xmlnode.iter():
+            if xmlchildnode.text:
+                xmlchildnode.text = xmlchildnode.text.strip()
+            for key,value in xmlchildnode.items():
+                xmlchildnode.attrib[key] = value.strip()
+
     def _etree2botstree(self,xmlnode):
-        ''' recursive. '''
-        newnode = node.Node(record=self._etreenode2botstreenode(xmlnode))   #make new node, use fields
-        for xmlchildnode in xmlnode:   #for every node in mpathtree
-            entitytype = self._entitytype(xmlchildnode)
-            if not entitytype:  #is a field, or unknown that looks like a field
-                if xmlchildnode.text:       #if xml element has content, add as field
-                    newnode.record[xmlchildnode.tag] = xmlchildnode.text      #add as a field
-                #convert the xml-attributes of this 'xml-filed' to fields in dict with attributemarker.
-                newnode.record.update((xmlchildnode.tag + self.ta_info['attributemarker'] + key, value) for key,value in xmlchildnode.items() if value)
-            elif entitytype == 1:  #childnode is a record according to grammar
-                newnode.append(self._etree2botstree(xmlchildnode))           #go recursive and add child (with children) as a node/record
-                self.stack.pop()    #handled the xmlnode, so remove it from the stack
-            else:   #is a record, but not in grammar
-                if self.ta_info['checkunknownentities']:
-                    self.add2errorlist(_(u'[S02]%(linpos)s: Unknown xml-tag "%(recordunkown)s" (within "%(record)s") in message.\n')%
-                                        {'linpos':newnode.linpos(),'recordunkown':xmlchildnode.tag,'record':newnode.record['BOTSID']})
-                continue
-        return newnode  #return the new node
+        ''' convert xmlnode (with the xml elements within) to bots-nodes-tree.
+            not recursive (deep xml would exceed the recursion limit): uses a stack of the records that are being converted.
+        '''
+        rootnode = node.Node(record=self._etreenode2botstreenode(xmlnode))   #make new node, use fields
+        todo = [(rootnode,iter(xmlnode))]   #for each record being converted: node, iterator over the xml elements within
+        while todo:
+            newnode,xmlchildnodes = todo[-1]
+            for xmlchildnode in xmlchildnodes:
+                if self._etreefield2botstree(newnode,xmlchildnode) == 1:  #childnode is a record according to grammar
+                    childnode = node.Node(record=self._etreenode2botstreenode(xmlchildnode))
+                    newnode.append(childnode)
+                    todo.append((childnode,iter(xmlchildnode)))     #convert the xml elements within childnode first
+                    break
+            else:   #all xml elements within newnode are converted
+                todo.pop()
+                if todo:
+                    self.stack.pop()    #handled the xmlnode, so remove it from the stack
+        return rootnode
+
+    def _etreechild2botstree(self,newnode,xmlchildnode):
+        ''' add xmlchildnode to newnode: as field or as child node (record).
+            returns the child node, or None if xmlchildnode is not added as record.
+        '''
+        if self._etreefield2botstree(newnode,xmlchildnode) == 1:  #childnode is a record according to grammar
+            childnode = self._etree2botstree(xmlchildnode)  #add child (with children) as a node/record
+            newnode.append(childnode)
+            self.stack.pop()    #handled the xmlnode, so remove it from the stack
+            return childnode
+        return None
+
+    def _etreefield2botstree(self,newnode,xmlchildnode):
+        ''' add xmlchildnode to newnode if it is a field; report if it is a record not in grammar.
+            returns entitytype of xmlchildnode: 1 is a record according to grammar, this is not added.
+        '''
+        entitytype = self._entitytype(xmlchildnode)
+        if not entitytype:  #is a field, or unknown that looks like a field
+            if xmlchildnode.text:       #if xml element has content, add as field
+                newnode.record[xmlchildnode.tag] = xmlchildnode.text      #add as a field
+            #convert the xml-attributes of this 'xml-filed' to fields in dict with attributemarker.
+            newnode.record.update((xmlchildnode.tag + self.ta_info['attributemarker'] + key, value) for key,value in xmlchildnode.items() if value)
+        elif entitytype != 1:   #is a record, but not in grammar
+            if self.ta_info['checkunknownentities']:
+                self.add2errorlist(_(u'[S02]%(linpos)s: Unknown xml-tag "%(recordunkown)s" (within "%(record)s") in message.\n')%
+                                    {'linpos':newnode.linpos(),'recordunkown':xmlchildnode.tag,'record':newnode.record['BOTSID']})
+        return entitytype
 
     def _etreenode2botstreenode(self,xmlnode):
         ''' build a basic dict from xml-node. Add BOTSID, xml-attributes (of 'record'), xmlnode.text as BOTSCONTENT.'''
@@ -1474,9 +1886,17 @@ class xmlnocheck(xml):
     def stackinit(self):
         self.stack = [0,]     #stack to track where we are in stucture of grammar
 
+    def _messagepath(self):
+        ''' no structure in grammar: no streaming.'''
+        return None
+
 class json(Inmessage):
     def initfromfile(self):
         self.messagegrammarread()
+        if self.streaming:
+            if self._islist() and self.defmessage.nextmessage2 is None and self.defmessage.nextmessageblock is None:
+                return          #json file is a list of messages: reading and parsing is done in nextmessage, one message at a time.
+            self.streaming = False  #read whole file.
         self._readcontent_edifile()
 
         jsonobject = simplejson.loads(self.rawinput)
@@ -1508,6 +1928,102 @@ class json(Inmessage):
             #root in JSON is neither dict or list.
             raise botslib.InMessageError(_(u'[J53]: Content must be a "list" or "object".'))
 
+    def _islist(self):
+        ''' for streaming: check if json file is a list (first char that is not whitespace is '[').'''
+        filehandler = botslib.opendata(filename=self.ta_info['filename'],mode='rb',charset=self.ta_info['charset'],errors=self.ta_info['checkcharsetin'])
+        try:
+            while True:
+                content = filehandler.read(1024)
+                if not content:
+                    return False
+                content = content.lstrip(u' \t\n\r')
+                if content:
+                    return content[0] == u'['
+        finally:
+            filehandler.close()
+
+    def _parsestreaming(self):
+        ''' Generator: reads json file (a list) incrementally, yields each message as soon as it is read and checked.
+            Each item of the list is converted and checked as in initfromfile; if nextmessage is in grammar the messages are searched in the item.
+            After a message is handled it is dropped: memory use depends on the largest item in the list, not on the size of the json file.
+        '''
+        self.errorfatal = True      #no decent node tree until whole json file is read
+        self.root = node.Node()  #initialise empty node; items of the list are not kept.
+        rootid = self._getrootid()
+        for jsonobject in self._iterjsonlist():
+            if not isinstance(jsonobject,dict):    #check list item is dict/object
+                if self.ta_info['checkunknownentities']:
+                    raise botslib.InMessageError(_(u'[J54]: List content must be a "object".'))
+                continue
+            child = self._dojsonobject(jsonobject,rootid)
+            del jsonobject
+            if not child:
+                continue
+            self.checkmessage(child,self.defmessage)
+            self.checkforerrorlist()
+            self.ta_info.update(child.queries)
+            if self.defmessage.nextmessage is not None:
+                child.processqueries({},len(self.defmessage.nextmessage)-1)     #same as processqueries in nextmessage
+                for messagenode in child.getloop(*self.defmessage.nextmessage):
+                    yield messagenode
+            else:
+                yield child
+        self.errorfatal = False
+
+    def _iterjsonlist(self):
+        ''' generator: reads json file (a list) in chunks, yields the items of the list one by one.
+            A chunk that ends within an item is extended with the next chunk(s) until the item is complete.
+        '''
+        decoder = simplejson.JSONDecoder()
+        whitespace = re.compile(u'[ \t\n\r]*')
+        filehandler = botslib.opendata(filename=self.ta_info['filename'],mode='rb',charset=self.ta_info['charset'],errors=self.ta_info['checkcharsetin'])
+        try:
+            content = u''
+            position = 0
+            endoffile = False
+            expect = u'['   #'[': start of list; 'first': first item or end of list; 'item': item; ',': separator or end of list; 'end': end of file
+            while True:
+                position = whitespace.match(content,position).end()
+                if position == len(content):
+                    if endoffile:
+                        break
+                    content = filehandler.read(65536)
+                    endoffile = not content
+                    position = 0
+                    continue
+                char = content[position]
+                if expect == u'[' and char == u'[':
+                    expect = u'first'
+                elif expect == u',' and char == u',':
+                    expect = u'item'
+                elif expect in (u',',u'first') and char == u']':
+                    expect = u'end'
+                elif expect in (u'first',u'item'):
+                    try:
+                        item,end = decoder.raw_decode(content,position)
+                    except ValueError:
+                        if endoffile:
+                            raise
+                        end = None
+                    if end is None or (end == len(content) and not endoffile):
+                        #item is not complete (or might not be complete): read more. Read size grows with content, so an item is parsed only a few times.
+                        morecontent = filehandler.read(max(65536,len(content)))
+                        endoffile = not morecontent
+                        content = content[position:] + morecontent
+                        position = 0
+                        continue
+                    position = end
+                    expect = u','
+                    yield item
+                    continue
+                else:
+                    raise botslib.InMessageError(_(u'[J56]: Non-valid json: unexpected "%(char)s".'),{'char':char})
+                position += 1
+            if expect != u'end':
+                raise botslib.InMessageError(_(u'[J57]: Unexpected end of json file; list is not complete.'))
+        finally:
+            filehandler.close()
+
     def _getrootid(self):
         return self.defmessage.structure[0][ID]
 
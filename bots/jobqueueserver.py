@@ -1,12 +1,13 @@
 #!/usr/bin/env python
 import sys
 import os
-import xmlrpclib
 from SimpleXMLRPCServer import SimpleXMLRPCServer
 import time
 import datetime
 import subprocess
 import threading
+import heapq
+import logging
 import botsinit
 import botslib
 import botsglobal
@@ -16,49 +17,152 @@ import botsglobal
 PRIORITY = 0
 JOBNUMBER = 1
 TASK = 2
+ADDED = 3
 class Jobqueue(object):
     ''' handles the jobqueue.
         methodes can be called over xmlrpc (except the methods starting with '_')
+        jobqueue is a heap: job with lowest priority (and within priority: lowest jobnumber) is first.
     '''
     def __init__(self,logger):
-        self.jobqueue = []       # list of jobs. in jobqueue are jobs are: (priority,jobnumber,task)
+        self.jobqueue = []       # heap of jobs. in jobqueue are jobs are: [priority,jobnumber,task,time added]
+        self.tasks = {}          # task -> job; to find duplicates. Jobs in heap that are not in tasks are removed (changed priority).
         self.jobcounter = 0      # to assign unique sequential job-number
         self.logger = logger
-                
+        self.condition = threading.Condition()  # launcher waits on this till a job is added or a running job is finished
+        self.running = {}        # jobnumber -> conflictkey of running jobs
+        self.jobsfinished = 0
+        self.waittime = 0.0      # total and maximum wait time (seconds) of started jobs
+        self.maxwaittime = 0.0
+        self.runtime = 0.0       # total and maximum run time (seconds) of finished jobs
+        self.maxruntime = 0.0
+
     def addjob(self,task,priority):
         #canonize task (to better find duplicates)??. Is dangerous, as non-bots-tasks might be started....
-        #first check if job already in queue
-        for job in self.jobqueue:
-            if job[TASK] == task:
+        self.condition.acquire()
+        try:
+            #first check if job already in queue
+            job = self.tasks.get(tuple(task))
+            if job is not None:
                 if job[PRIORITY] != priority:   #change priority. is this useful?
-                    job[PRIORITY] = priority
+                    self._push([priority,job[JOBNUMBER],task,job[ADDED]])   #old job stays in heap, but is not in tasks anymore
                     self.logger.info(u'Duplicate job, changed priority to %(priority)s: %(task)s',{'priority':priority,'task':task})
-                    self._sort()
                     return 0        #zero or other code??
                 else:
                     self.logger.info(u'Duplicate job not added: %(task)s',{'task':task})
                     return 4
-        #add the job
-        self.jobcounter += 1
-        self.jobqueue.append([priority, self.jobcounter,task])
-        self.logger.info(u'Added job %(job)s, priority %(priority)s: %(task)s',{'job':self.jobcounter,'priority':priority,'task':task})
-        self._sort()
-        return 0
+            #add the job
+            self.jobcounter += 1
+            self._push([priority,self.jobcounter,task,time.time()])
+            self.logger.info(u'Added job %(job)s, priority %(priority)s: %(task)s',{'job':self.jobcounter,'priority':priority,'task':task})
+            return 0
+        finally:
+            self.condition.release()
 
     def clearjobq(self):
-        self.jobqueue = []
-        self.logger.info(u'Job queue cleared.')
-        return 0
+        self.condition.acquire()
+        try:
+            self.jobqueue = []
+            self.tasks = {}
+            self.logger.info(u'Job queue cleared.')
+            return 0
+        finally:
+            self.condition.release()
 
     def getjob(self):
-        if len(self.jobqueue):
-            return self.jobqueue.pop()
-        return 0
+        self.condition.acquire()
+        try:
+            job = self._pop(conflictkeys=())
+            if job:
+                return job[:ADDED]
+            return 0
+        finally:
+            self.condition.release()
+
+    def getstatus(self):
+        ''' returns status of the jobqueue: jobs in queue, running jobs, and wait time and run time (in seconds) of jobs.'''
+        self.condition.acquire()
+        try:
+            now = time.time()
+            return {'queued':len(self.tasks),
+                    'running':len(self.running),
+                    'finished':self.jobsfinished,
+                    'oldestwaiting':max([now - job[ADDED] for job in self.tasks.itervalues()] or [0.0]),
+                    'averagewaittime':self.waittime / (self.jobsfinished + len(self.running) or 1),
+                    'maxwaittime':self.maxwaittime,
+                    'averageruntime':self.runtime / (self.jobsfinished or 1),
+                    'maxruntime':self.maxruntime,
+                    }
+        finally:
+            self.condition.release()
+
+    def _push(self,job):
+        ''' add job to heap and notify launcher. Caller has acquired condition.'''
+        self.tasks[tuple(job[TASK])] = job
+        heapq.heappush(self.jobqueue,job)
+        self.condition.notify_all()
+        if self.logger.isEnabledFor(logging.DEBUG):     #sorting the queue for logging is only done when needed
+            self.logger.debug(u'Job queue changed. New queue: %(queue)s',{'queue':''.join(['\n    ' + repr(queuedjob[:ADDED]) for queuedjob in sorted(self.tasks.itervalues())])})
+
+    def _pop(self,conflictkeys):
+        ''' get first job in heap that does not conflict with jobs in conflictkeys; returns None if there is no such job.
+            Caller has acquired condition.
+        '''
+        skipped = []
+        found = None
+        while self.jobqueue:
+            job = heapq.heappop(self.jobqueue)
+            key = tuple(job[TASK])
+            if self.tasks.get(key) is not job:
+                continue        #removed job
+            if conflictkey(job[TASK]) in conflictkeys:
+                skipped.append(job)
+                continue
+            del self.tasks[key]
+            found = job
+            break
+        for job in skipped:
+            heapq.heappush(self.jobqueue,job)
+        return found
+
+    def _nextjob(self,maxworkers):
+        ''' get job to start (or None): if less than maxworkers jobs are running, and there is a job that does not conflict with running jobs.
+            Caller has acquired condition.
+        '''
+        if len(self.running) >= maxworkers:
+            return None
+        job = self._pop(conflictkeys=set(self.running.itervalues()))
+        if job:
+            self.running[job[JOBNUMBER]] = conflictkey(job[TASK])
+            waittime = time.time() - job[ADDED]
+            self.waittime += waittime
+            self.maxwaittime = max(self.maxwaittime,waittime)
+        return job
+
+    def _jobfinished(self,job,runtime):
+        self.condition.acquire()
+        try:
+            del self.running[job[JOBNUMBER]]
+            self.jobsfinished += 1
+            self.runtime += runtime
+            self.maxruntime = max(self.maxruntime,runtime)
+            self.condition.notify_all()
+        finally:
+            self.condition.release()
 
-    def _sort(self):
-        self.jobqueue.sort(reverse=True)
-        self.logger.debug(u'Job queue changed. New queue: %(queue)s',{'queue':''.join(['\n    ' + repr(job) for job in self.jobqueue])})
-        #~ print self.jobqueue
+
+def conflictkey(task):
+    ''' jobs with the same conflictkey are not run at the same time.
+        bots-engine: only one engine can run for a configuration directory (bots-engine locks the database).
+        other jobs: the task itself.
+    '''
+    for arg in task:
+        if 'bots-engine' in arg:
+            configdir = 'config'
+            for arg2 in task:
+                if arg2.startswith('-c'):
+                    configdir = arg2[2:]
+            return ('bots-engine',configdir)
+    return tuple(task)
 
 #-------------------------------------------------------------------------------
 def maxruntimeerror(logger,maxruntime,jobnumber,task_to_run):
@@ -67,31 +171,43 @@ def maxruntimeerror(logger,maxruntime,jobnumber,task_to_run):
                                 u'Job %(job)s exceeded maxruntime of %(maxruntime)s minutes:\n %(task)s' % {'job':jobnumber,'maxruntime':maxruntime,'task':task_to_run})
 
 #-------------------------------------------------------------------------------
-def launcher(logger,port,lauchfrequency,maxruntime):
-    xmlrpcclient = xmlrpclib.ServerProxy(u'http://localhost:' + unicode(port))
-    maxseconds = maxruntime*60
-    time.sleep(3)   #to allow jobqserver to start
+def launcher(logger,jobqueue,maxworkers,maxruntime):
+    ''' starts jobs from the jobqueue. Waits until a job is added or a running job is finished (no polling).
+        at most maxworkers jobs run at the same time; jobs that conflict are not run at the same time.
+    '''
     while True:
-        time.sleep(lauchfrequency)
-        job = xmlrpcclient.getjob()
-
-        if job:       #0 means nothing to launch
-            jobnumber = job[1]
-            task_to_run = job[2]
-            # Start a timer thread for maxruntime error
-            timer_thread = threading.Timer(maxseconds,maxruntimeerror,args=(logger,maxruntime,jobnumber,task_to_run))
-            timer_thread.start()
-            try:
-                starttime = datetime.datetime.now()
-                logger.info(u'Starting job %(job)s',{'job':jobnumber})
-                result = subprocess.call(task_to_run,stdin=open(os.devnull,'r'),stdout=open(os.devnull,'w'),stderr=open(os.devnull,'w'))
-                time_taken = datetime.timedelta(seconds=(datetime.datetime.now() - starttime).seconds)
-                logger.info(u'Finished job %(job)s, elapsed time %(time_taken)s, result %(result)s',{'job':jobnumber,'time_taken':time_taken,'result':result})
-            except Exception as msg:
-                logger.error(u'Error starting job %(job)s: %(msg)s',{'job':jobnumber,'msg':msg})
-                botslib.sendbotserrorreport(u'[Bots Job Queue] - Error starting job',
-                                            u'Error starting job %(job)s:\n %(task)s\n\n %(msg)s' % {'job':jobnumber,'task':task_to_run,'msg':msg})
-            timer_thread.cancel()
+        jobqueue.condition.acquire()
+        try:
+            job = jobqueue._nextjob(maxworkers)
+            while not job:
+                jobqueue.condition.wait()
+                job = jobqueue._nextjob(maxworkers)
+        finally:
+            jobqueue.condition.release()
+        worker_thread = threading.Thread(name='job%s'%job[JOBNUMBER], target=runjob, args=(logger,jobqueue,job,maxruntime))
+        worker_thread.daemon = True
+        worker_thread.start()
+
+
+def runjob(logger,jobqueue,job,maxruntime):
+    jobnumber = job[JOBNUMBER]
+    task_to_run = job[TASK]
+    # Start a timer thread for maxruntime error
+    timer_thread = threading.Timer(maxruntime*60,maxruntimeerror,args=(logger,maxruntime,jobnumber,task_to_run))
+    timer_thread.start()
+    starttime = datetime.datetime.now()
+    try:
+        logger.info(u'Starting job %(job)s',{'job':jobnumber})
+        result = subprocess.call(task_to_run,stdin=open(os.devnull,'r'),stdout=open(os.devnull,'w'),stderr=open(os.devnull,'w'))
+        time_taken = datetime.timedelta(seconds=(datetime.datetime.now() - starttime).seconds)
+        logger.info(u'Finished job %(job)s, elapsed time %(time_taken)s, result %(result)s',{'job':jobnumber,'time_taken':time_taken,'result':result})
+    except Exception as msg:
+        logger.error(u'Error starting job %(job)s: %(msg)s',{'job':jobnumber,'msg':msg})
+        botslib.sendbotserrorreport(u'[Bots Job Queue] - Error starting job',
+                                    u'Error starting job %(job)s:\n %(task)s\n\n %(msg)s' % {'job':jobnumber,'task':task_to_run,'msg':msg})
+    timer_thread.cancel()
+    elapsed = datetime.datetime.now() - starttime
+    jobqueue._jobfinished(job,elapsed.days * 86400 + elapsed.seconds + elapsed.microseconds / 1000000.0)
 
 
 def start():
@@ -100,7 +216,8 @@ def start():
     usage = '''
     This is "%(name)s" version %(version)s, part of Bots open source edi translator (http://bots.sourceforge.net).
     Server program that ensures only a single bots-engine runs at any time, and no engine run requests are 
-    lost/discarded. Each request goes to a queue and is run in sequence when the previous run completes. 
+    lost/discarded. Each request goes to a queue and is run in sequence when the previous run completes
+    (jobs that do not conflict can run at the same time, see maxworkers in bots.ini). 
     Use of the job queue is optional and must be configured in bots.ini (jobqueue section, enabled = True).
     Usage:
         %(name)s  -c<directory>
@@ -131,9 +248,10 @@ def start():
     logger.log(25,u'Bots %(process_name)s listens for xmlrpc at port: "%(port)s".',{'process_name':process_name,'port':port})
 
     #start launcher thread
-    lauchfrequency = botsglobal.ini.getint('jobqueue','lauchfrequency',5)
+    maxworkers = botsglobal.ini.getint('jobqueue','maxworkers',1)
     maxruntime = botsglobal.ini.getint('settings','maxruntime',60)
-    launcher_thread = threading.Thread(name='launcher', target=launcher, args=(logger,port,lauchfrequency,maxruntime))
+    jobqueue = Jobqueue(logger)
+    launcher_thread = threading.Thread(name='launcher', target=launcher, args=(logger,jobqueue,maxworkers,maxruntime))
     launcher_thread.daemon = True
     launcher_thread.start()
     logger.info(u'Jobqueue launcher started.')
@@ -141,7 +259,7 @@ def start():
     #the main thread is the xmlrpc server: all adding, getting etc for jobqueue is done via xmlrpc.
     logger.info(u'Jobqueue server started.')
     server = SimpleXMLRPCServer(('localhost', port),logRequests=False)        
-    server.register_instance(Jobqueue(logger))
+    server.register_instance(jobqueue)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
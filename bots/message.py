@@ -122,7 +122,7 @@ class Message(object):
             if self.ta_info['checkunknownentities']:
                 self.add2errorlist(_(u'[S01]%(linpos)s: Record "%(record)s" in message has children, but these are not in grammar "%(grammar)s". Found record "%(xx)s".\n')%
                                     {'linpos':node_instance.linpos(),'record':node_instance.record['BOTSID'],'grammar':grammarname,'xx':node_instance.children[0].record['BOTSID']})
-            node_instance.children = []
+            node_instance.setchildren([])
             return
         for childnode in node_instance.children:          #for every record/childnode:
             for record_definition in structure[LEVEL]:                   #search in grammar-records
@@ -144,27 +144,13 @@ class Message(object):
         ''' checks for every field in record if field exists in record_definition (from grammar).
             for inmessage of type (var,fixed,??) this is not needed 
         '''
+        fieldindex = record_definition[FIELDINDEX]     #fields, subfields of non-repeating composites, repeating composites
         for field in node_instance.record.keys():     #check every field in the record
             if field == 'BOTSIDnr':     #BOTSIDnr is not in grammar, so skip check
                 continue
-            for field_definition in record_definition[FIELDS]:
-                if field_definition[ISFIELD]:    #if field (no composite)
-                    if field == field_definition[ID]:
-                        break   #OK!
-                else:   #if composite
-                    if field_definition[MAXREPEAT] == 1:    #non-repeating composite 
-                        for grammarsubfield in field_definition[SUBFIELDS]:   #loop subfields
-                            if field == grammarsubfield[ID]:
-                                break   #break out of grammarsubfield-for-loop ->goto break out of field_definition-for-loop
-                        else:
-                            continue    #nothing found; continue with next gammarfield
-                        break   #break out of field_definition-for-loop
-                    else: #repeating composite
-                        if field == field_definition[ID]:
-                            #OK. Contents is a list of dicts;
-                            #TODO: check for each dict if sub-fields exist in grammar. 
-                            break
-            else:           #field not found in grammar
+            #for repeating composite: contents is a list of dicts;
+            #TODO: check for each dict if sub-fields exist in grammar. 
+            if field not in fieldindex:           #field not found in grammar
                 if self.ta_info['checkunknownentities']:
                     self.add2errorlist(_(u'[F01]%(linpos)s: Record: "%(mpath)s" has unknown field "%(field)s".\n')%
                                             {'linpos':node_instance.linpos(),'field':field,'mpath':self.mpathformat(record_definition[MPATH])})
@@ -178,21 +164,28 @@ class Message(object):
         if node_instance.structure is None:
             node_instance.structure = structure
         if LEVEL in structure:
+            #first put the childnodes in buckets per record (BOTSID,BOTSIDnr); order of childnodes within a record is kept.
+            #childnodes that are not in a bucket for a record_definition are not in the grammar, and are dropped.
+            buckets = {}
+            for childnode in node_instance.children:
+                key = (childnode.record['BOTSID'],childnode.record['BOTSIDnr'])
+                if key in buckets:
+                    buckets[key].append(childnode)
+                else:
+                    buckets[key] = [childnode]
             for record_definition in structure[LEVEL]:  #for every record_definition (in grammar) of this level
-                count = 0                           #count number of occurences of record
-                for childnode in node_instance.children:            #for every node in mpathtree; SPEED: delete nodes from list when found
-                    if childnode.record['BOTSID'] != record_definition[ID] or childnode.record['BOTSIDnr'] != record_definition[BOTSIDNR]:   #if it is not the right NODE":
-                        continue
-                    count += 1
+                childnodes = buckets.get((record_definition[ID],record_definition[BOTSIDNR]),[])
+                count = len(childnodes)              #number of occurences of record
+                for childnode in childnodes:
                     self._canonicaltree(childnode,record_definition)         #use rest of index in deeper level
-                    sortednodelist.append(childnode)
+                sortednodelist.extend(childnodes)
                 if record_definition[MIN] > count:
                     self.add2errorlist(_(u'[S03]%(linpos)s: Record "%(mpath)s" occurs %(count)d times, min is %(mincount)d.\n')%
                                         {'linpos':node_instance.linpos(),'mpath':self.mpathformat(record_definition[MPATH]),'count':count,'mincount':record_definition[MIN]})
                 if record_definition[MAX] < count:
                     self.add2errorlist(_(u'[S04]%(linpos)s: Record "%(mpath)s" occurs %(count)d times, max is %(maxcount)d.\n')%
                                         {'linpos':node_instance.linpos(),'mpath':self.mpathformat(record_definition[MPATH]),'count':count,'maxcount':record_definition[MAX]})
-            node_instance.children = sortednodelist
+            node_instance.setchildren(sortednodelist)
 
     def _canonicalfields(self,node_instance,record_definition):
         ''' For all fields: check M/C, format.
@@ -6,6 +6,7 @@ import os
 import urllib
 import re
 from django.db import models
+from django.db.models import signals
 from django.utils.translation import ugettext_lazy as _     #djnago 1.7: have to use ugettext_lazy here
 #~ from django.core.validators import validate_email
 from django.core.validators import validate_integer
@@ -571,3 +572,12 @@ class uniek(models.Model):
         db_table = 'uniek'
         verbose_name = _(u'counter')
         ordering = ['domein']
+
+#lookups in ccode and partner are cached by bots-engine (botslib.lookupcache).
+#changes made via django (GUI, plugins) are counted in uniek; bots-engine checks this counter at start of each run.
+def _count_lookupchange(sender,**kwargs):
+    if not uniek.objects.filter(domein='bots_lookupchanges').update(nummer=models.F('nummer')+1):
+        uniek.objects.create(domein='bots_lookupchanges',nummer=1)
+for _sender in (ccode,partner,partnergroep):
+    signals.post_save.connect(_count_lookupchange,sender=_sender)
+    signals.post_delete.connect(_count_lookupchange,sender=_sender)
@@ -13,7 +13,9 @@ class Node(object):
     '''
     #slots: python optimalisation to preserve memory. Disadv.: no dynamic attr in this class
     #in tests: for normal translations less memory and faster; no effect fo one-on-one translations.
-    __slots__ = ('record','children','_queries','linpos_info','structure')
+    __slots__ = ('record','children','_queries','linpos_info','structure','_childindex')
+    #nodes with this number of children (or more) get an index for searching children (see _matchingchildren)
+    indexthreshold = 8
     def __init__(self,record=None,linpos_info=None):
         if record and 'BOTSIDnr' not in record:
             record['BOTSIDnr'] = u'1'
@@ -22,6 +24,7 @@ class Node(object):
         self.linpos_info = linpos_info
         self._queries = None
         self.structure = None
+        self._childindex = None
 
     def linpos(self):
         if self.linpos_info:
@@ -31,7 +34,90 @@ class Node(object):
 
     def append(self,childnode):
         '''append child to node'''
+        if self._childindex is not None:
+            if self._childindexisvalid():
+                self._addtochildindex(childnode)
+            else:
+                self._childindex = None
         self.children.append(childnode)
+        if self._childindex is not None:
+            self._childindex[1] = len(self.children)
+            self._childindex[2] = childnode
+
+    def setchildren(self,children):
+        ''' replace the children of node (eg with [] to drop them).
+            index of children is dropped too, else the old children are kept in memory by the index.
+        '''
+        self.children = children
+        self._childindex = None
+
+    #********************************************************
+    #*** index of children **********************************
+    #********************************************************
+    #for nodes with many children (eg LIN's in an order) searching via mpath is slow: for each child all items of the mpath are compared.
+    #the index gives the children with the right BOTSID and BOTSIDnr (other children never match an mpath).
+    #index is build when needed. As self.children is also changed outside this class (eg children.remove()),
+    #index is checked each time: same list, same length, same last child; else it is build again.
+    #use setchildren() to replace self.children: this drops the index (and the old children it refers to).
+    #_childindex is list: [children (list), number of children, last child, dict (BOTSID,BOTSIDnr)->list of children]
+    def _childindexisvalid(self):
+        index = self._childindex
+        return index[0] is self.children and index[1] == len(self.children) and (not self.children or index[2] is self.children[-1])
+
+    def _buildchildindex(self):
+        self._childindex = [self.children,len(self.children),self.children[-1] if self.children else None,{}]
+        for childnode in self.children:
+            self._addtochildindex(childnode)
+
+    def _addtochildindex(self,childnode):
+        lookup = self._childindex[3]
+        if lookup is None:
+            return
+        record = childnode.record
+        if not record or 'BOTSID' not in record or 'BOTSIDnr' not in record:   #child can not be indexed; no index for this node
+            self._childindex[3] = None
+            return
+        key = (record['BOTSID'],record['BOTSIDnr'])
+        if key in lookup:
+            lookup[key].append(childnode)
+        else:
+            lookup[key] = [childnode]
+
+    def _removechild(self,childnode):
+        ''' remove childnode from self.children, keep index up to date.'''
+        indexisvalid = self._childindex is not None and self._childindexisvalid()
+        for i, child in enumerate(self.children):
+            if child is childnode:
+                del self.children[i]    #remove node
+                break
+        if not indexisvalid:
+            self._childindex = None
+            return
+        lookup = self._childindex[3]
+        if lookup is not None:
+            samechildren = lookup.get((childnode.record['BOTSID'],childnode.record['BOTSIDnr']),[])
+            for i, child in enumerate(samechildren):
+                if child is childnode:
+                    del samechildren[i]
+                    break
+        self._childindex[1] = len(self.children)
+        self._childindex[2] = self.children[-1] if self.children else None
+
+    def _matchingchildren(self,mpath):
+        ''' returns the children that might match mpath (part of mpaths); in same order as in self.children.
+        '''
+        if len(self.children) < Node.indexthreshold:
+            return self.children
+        botsid = mpath.get('BOTSID')
+        botsidnr = mpath.get('BOTSIDnr')
+        if botsid is None or botsidnr is None:
+            return self.children
+        if self._childindex is None or not self._childindexisvalid():
+            self._buildchildindex()
+        lookup = self._childindex[3]
+        if lookup is None:
+            return self.children
+        return lookup.get((botsid,botsidnr),())
 
     #********************************************************
     #*** queries ********************************************
@@ -146,7 +232,7 @@ class Node(object):
             if len(mpaths) == 1:    #mpath is exhausted; so we are there!!! #replace values with values in 'change'; delete if None
                 return self.record
             else:           #go recursive
-                for childnode in self.children:
+                for childnode in self._matchingchildren(mpaths[1]):
                     terug = childnode._getrecordcore(mpaths[1:])
                     if terug:
                         return terug
@@ -192,7 +278,7 @@ class Node(object):
                         self.record[key] = value
                 return True
             else:           #go recursive
-                for childnode in self.children:
+                for childnode in self._matchingchildren(where[1]):
                     if childnode._changecore(where[1:],change):
                         return True
                 else:   #no child has given a valid return
@@ -218,10 +304,10 @@ class Node(object):
             if len(mpaths) == 1:    #mpath is exhausted; so we are there!!!
                 return 2  #indicates node should be removed
             else:
-                for i, childnode in enumerate(self.children):
+                for childnode in self._matchingchildren(mpaths[1]):
                     terug =  childnode._deletecore(mpaths[1:]) #search recursive for rest of mpaths
                     if terug == 2:  #indicates node should be removed
-                        del self.children[i]    #remove node
+                        self._removechild(childnode)
                         return 1    #this indicates: deleted successfull, do not remove anymore (no removal of parents)
                     if terug:
                         return terug
@@ -267,7 +353,7 @@ class Node(object):
                 if key not in self.record or value != self.record[key]:  #does not match/is not right node
                     return None
             else:   #all items in mpath are matched and OK; recursuve search
-                for childnode in self.children:
+                for childnode in self._matchingchildren(mpaths[1]):
                     terug =  childnode._getcore(mpaths[1:]) #recursive search for rest of mpaths
                     if terug is not None:
                         return terug
@@ -334,7 +420,7 @@ class Node(object):
             if len(mpaths) == 1:
                 yield self      #found!
             else:
-                for childnode in self.children:
+                for childnode in self._matchingchildren(mpaths[1]):
                     for terug in childnode._getloopcore(mpaths[1:]): #search recursive for rest of mpaths
                         yield terug
 
@@ -403,7 +489,7 @@ class Node(object):
     def _putcore(self,mpaths):
         if not mpaths:  #newmpath is exhausted, stop searching.
             return
-        for childnode in self.children:
+        for childnode in self._matchingchildren(mpaths[0]):
             if childnode.record['BOTSID'] == mpaths[0]['BOTSID'] and childnode._sameoccurence(mpaths[0]):    #checking of BOTSID is also done in sameoccurance!->performance!
                 childnode._putcore(mpaths[1:])
                 return
@@ -439,7 +525,7 @@ class Node(object):
         if len(mpaths) ==1: #end of mpath reached; always make new child-node
             self.append(Node(mpaths[0]))
             return self.children[-1]
-        for childnode in self.children:  #if first part of mpaths exists already in children go recursive
+        for childnode in self._matchingchildren(mpaths[0]):  #if first part of mpaths exists already in children go recursive
             if childnode.record['BOTSID'] == mpaths[0]['BOTSID'] and childnode._sameoccurence(mpaths[0]):    #checking of BOTSID is also done in sameoccurance!->performance!
                 return childnode._putloopcore(mpaths[1:])
         else:   #is not present in children, so append a child, and go recursive
@@ -490,6 +576,7 @@ class Node(object):
             self.children.sort(key=lambda s: s.get(*comparekey))
         finally:
             Node.checklevel = remember
+        self._childindex = None     #order of children is changed
     #********************************************************
     #*** utility functions **********************************
     #********************************************************
@@ -519,8 +606,9 @@ class Node(object):
             for record_definition in structure:
                 if record_definition[ID] == mpath['BOTSID'] and record_definition[BOTSIDNR] == mpath['BOTSIDnr']:
                     for key in mpath:
-                        if key == 'BOTSIDnr':   #BOTSIDnr is not in grammar, so do not check
+                        if key == 'BOTSIDnr' or key in record_definition[FIELDINDEX]:   #BOTSIDnr is not in grammar, so do not check
                             continue
+                        #not in index are: composite ID of non-repeating composite, subfields of repeating composite
                         for field_definition in record_definition[FIELDS]:
                             if field_definition[ISFIELD]:
                                 if key == field_definition[ID]:
@@ -586,7 +674,7 @@ class Node(object):
             else:               #just append, no change
                 new.append(childnode)
                 childnode.collectlines(print_as_row)   #go recursive
-        self.children = new
+        self.setchildren(new)
 
     def copynode(self):
         ''' make a 'safe' copy of node; return the new node
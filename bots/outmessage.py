@@ -1,14 +1,9 @@
-import time
 import sys
+import re
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
-try:
-    import cdecimal as decimal
-except ImportError:
-    import decimal
-NODECIMAL = decimal.Decimal(1)
 try:
     import cElementTree as ET
 except ImportError:
@@ -34,6 +29,7 @@ import botsglobal
 import message
 import grammar
 import node
+import fieldformat
 from botsconfig import *
 
 def outmessage_init(**ta_info):
@@ -128,23 +124,20 @@ class Outmessage(message.Message):
             Classses that write using other libraries (xml, json, template, db) use specific write methods.
         '''
         self.tree2records(node_instance)
-        value = self.record2string(self.lex_records)
         wrap_length = int(self.ta_info.get('wrap_length', 0))
-        if wrap_length:
-            try:
+        try:
+            if wrap_length:
+                value = self.record2string(self.lex_records)
                 for i in range(0,len(value),wrap_length):  #split in fixed lengths
                     self._outstream.write(value[i:i+wrap_length] + '\r\n')
-            except UnicodeError as msg:
-                content = botslib.get_relevant_text_for_UnicodeError(msg)
-                raise botslib.OutMessageError(_(u'[F50]: Characters not in character-set "%(char)s": %(content)s'),
-                                                {'char':self.ta_info['charset'],'content':content})
-        else:
-            try:
-                self._outstream.write(value)
-            except UnicodeError as msg:
-                content = botslib.get_relevant_text_for_UnicodeError(msg)
-                raise botslib.OutMessageError(_(u'[F50]: Characters not in character-set "%(char)s": %(content)s'),
-                                                {'char':self.ta_info['charset'],'content':content})
+            else:
+                recordwriter = self._getrecordwriter()
+                for lex_record in self.lex_records:     #each record is written directly to file
+                    self._outstream.write(self._record2string(lex_record,recordwriter))
+        except UnicodeError as msg:
+            content = botslib.get_relevant_text_for_UnicodeError(msg)
+            raise botslib.OutMessageError(_(u'[F50]: Characters not in character-set "%(char)s": %(content)s'),
+                                            {'char':self.ta_info['charset'],'content':content})
 
     def tree2records(self,node_instance):
         self.lex_records = []                   #tree of nodes is flattened to these lex_records
@@ -284,14 +277,7 @@ class Outmessage(message.Message):
         elif field_definition[BFORMAT] in 'DT':
             lenght = len(value)
             if field_definition[BFORMAT] == 'D':
-                try:
-                    if lenght == 6:
-                        time.strptime(value,'%y%m%d')
-                    elif lenght == 8:
-                        time.strptime(value,'%Y%m%d')
-                    else:
-                        raise ValueError(u'To be catched')
-                except ValueError:
+                if not fieldformat.checkdate(value):
                     self.add2errorlist(_(u'[F22]: Record "%(record)s" date field "%(field)s" not a valid date: "%(content)s".\n')%
                                         {'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
                 if lenght > field_definition[LENGTH]:
@@ -301,14 +287,7 @@ class Outmessage(message.Message):
                     self.add2errorlist(_(u'[F32]: Record "%(record)s" date field "%(field)s" too small (min %(min)s): "%(content)s".\n')%
                                         {'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value,'min':field_definition[MINLENGTH]})
             else:   #if field_definition[BFORMAT] == 'T':
-                try:
-                    if lenght == 4:
-                        time.strptime(value,'%H%M')
-                    elif lenght == 6:
-                        time.strptime(value,'%H%M%S')
-                    else:
-                        raise ValueError(u'To be catched')
-                except ValueError:
+                if not fieldformat.checktime(value,decimalseconds=False):
                     self.add2errorlist(_(u'[F23]: Record "%(record)s" time field "%(field)s" not a valid time: "%(content)s".\n')%
                                         {'record':self.mpathformat(structure_record[MPATH]),'field':field_definition[ID],'content':value})
                 if lenght > field_definition[LENGTH]:
@@ -339,7 +318,7 @@ class Outmessage(message.Message):
                     if decimalsign:
                         lengthcorrection += 1
                 try:
-                    value = unicode(decimal.Decimal(minussign + digits + decimalsign + decimals).quantize(decimal.Decimal(10) ** -len(decimals)))
+                    value = fieldformat.quantize(minussign + digits + decimalsign + decimals,len(decimals))
                 except:
                     self.add2errorlist(_(u'[F25]: Record "%(record)s" field "%(field)s" numerical format not valid: "%(content)s".\n')%
                                         {'field':field_definition[ID],'content':value,'record':self.mpathformat(structure_record[MPATH])})
@@ -357,7 +336,7 @@ class Outmessage(message.Message):
                     if field_definition[DECIMALS]:
                         lengthcorrection += 1
                 try:
-                    value = unicode(decimal.Decimal(minussign + digits + decimalsign + decimals).quantize(decimal.Decimal(10) ** -field_definition[DECIMALS]))
+                    value = fieldformat.quantize(minussign + digits + decimalsign + decimals,field_definition[DECIMALS])
                 except:
                     self.add2errorlist(_(u'[F26]: Record "%(record)s" field "%(field)s" numerical format not valid: "%(content)s".\n')%
                                         {'field':field_definition[ID],'content':value,'record':self.mpathformat(structure_record[MPATH])})
@@ -373,8 +352,7 @@ class Outmessage(message.Message):
                     if minussign:
                         lengthcorrection += 1
                 try:
-                    dec_value = decimal.Decimal(minussign + digits + decimalsign + decimals) * 10**field_definition[DECIMALS]
-                    value = unicode(dec_value.quantize(NODECIMAL ))
+                    value = fieldformat.implicitdecimals(minussign + digits + decimalsign + decimals,field_definition[DECIMALS])
                 except:
                     self.add2errorlist(_(u'[F27]: Record "%(record)s" field "%(field)s" numerical format not valid: "%(content)s".\n')%
                                         {'field':field_definition[ID],'content':value,'record':self.mpathformat(structure_record[MPATH])})
@@ -397,86 +375,115 @@ class Outmessage(message.Message):
             if field_definition[BFORMAT] == 'R':    #floating point: use all decimals received
                 value = value.zfill(field_definition[MINLENGTH] )
             elif field_definition[BFORMAT] == 'N':  #fixed decimals; round
-                value = unicode(decimal.Decimal(value).quantize(decimal.Decimal(10) ** -field_definition[DECIMALS]))
+                value = fieldformat.quantize(value,field_definition[DECIMALS])
                 value = value.zfill(field_definition[MINLENGTH])
                 value = value.replace('.',self.ta_info['decimaal'],1)    #replace '.' by required decimal sep.
             elif field_definition[BFORMAT] == 'I':  #implicit decimals
-                dec_value = decimal.Decimal(value) * 10**field_definition[DECIMALS]
-                value = unicode(dec_value.quantize(NODECIMAL ))
+                value = fieldformat.implicitdecimals(value,field_definition[DECIMALS])
                 value = value.zfill(field_definition[MINLENGTH])
         return value
 
     def record2string(self,lex_records):
-        ''' write lex_records to a file.
+        ''' write lex_records to a string.
             using the right editype (edifact, x12, etc) and charset.
             write (all fields of) each record using the right separators, escape etc
         '''
-        sfield_sep = self.ta_info['sfield_sep']
-        if self.ta_info['record_tag_sep']:
-            record_tag_sep = self.ta_info['record_tag_sep']
-        else:
-            record_tag_sep = self.ta_info['field_sep']
-        field_sep = self.ta_info['field_sep']
+        recordwriter = self._getrecordwriter()
+        return ''.join([self._record2string(lex_record,recordwriter) for lex_record in lex_records])
+
+    def _getrecordwriter(self):
+        ''' separators and escape/quote translation tables used to write records.
+            computed once per set of separators in ta_info (these can change, eg by partner syntax or in envelope).
+        '''
+        escapechars = self._getescapechars()
+        key = (escapechars,self.ta_info['sfield_sep'],self.ta_info['record_tag_sep'],self.ta_info['field_sep'],self.ta_info['quote_char'],
+                self.ta_info['escape'],self.ta_info['record_sep'],self.ta_info['add_crlfafterrecord_sep'],self.ta_info['forcequote'],
+                self.ta_info.get('noBOTSID',False),self.ta_info['reserve'],self.ta_info.get('replacechar'))
+        if getattr(self,'_recordwriterkey',None) == key:
+            return self._recordwriter
         quote_char = self.ta_info['quote_char']
         escape = self.ta_info['escape']
-        record_sep = self.ta_info['record_sep'] + self.ta_info['add_crlfafterrecord_sep']
-        forcequote = self.ta_info['forcequote']
-        escapechars = self._getescapechars()
-        noBOTSID = self.ta_info.get('noBOTSID',False)
-        rep_sep     = self.ta_info['reserve']
-
-        lijst = []
-        for lex_record in lex_records:
-            if noBOTSID:  #for csv/fixed: do not write BOTSID so remove it
-                del lex_record[0]
-            fieldcount = 0
+        escapetable = {}            #for unicode.translate: escape (edifact, tradacoms) or replace (x12) separators in content
+        escapesearch = None         #for x12 without replacechar: separator in content is an error
+        for char in escapechars:
+            if isinstance(self,x12):
+                if self.ta_info['replacechar']:
+                    escapetable[ord(char)] = self.ta_info['replacechar']
+                elif escapesearch is None:
+                    escapesearch = re.compile(u'[%s]'%re.escape(escapechars)).search
+            else:
+                escapetable[ord(char)] = escape + char
+        quotetable = dict(escapetable)  #in quoted field quote_char is doubled (if not escaped)
+        if quote_char and len(quote_char) == 1 and ord(quote_char) not in quotetable:
+            quotetable[ord(quote_char)] = quote_char + quote_char
+        #translate is only done if content has a character to translate; searching is much faster than translating.
+        escapefind = re.compile(u'[%s]'%re.escape(u''.join(unichr(char) for char in escapetable))).search if escapetable else None
+        quotefind = re.compile(u'[%s]'%re.escape(u''.join(unichr(char) for char in quotetable))).search if quotetable else None
+        self._recordwriter = (self.ta_info['record_tag_sep'] or self.ta_info['field_sep'],
+                                self.ta_info['field_sep'],
+                                self.ta_info['sfield_sep'],
+                                self.ta_info['reserve'],
+                                quote_char,
+                                self.ta_info['forcequote'],
+                                self.ta_info['record_sep'] + self.ta_info['add_crlfafterrecord_sep'],
+                                self.ta_info.get('noBOTSID',False),
+                                escapetable,
+                                escapefind,
+                                quotetable,
+                                quotefind,
+                                escapesearch)
+        self._recordwriterkey = key
+        return self._recordwriter
+
+    def _record2string(self,lex_record,recordwriter):
+        ''' write (all fields of) one lex_record to a string; separators, escape, quotes are done via recordwriter.
+        '''
+        record_tag_sep,field_sep,sfield_sep,rep_sep,quote_char,forcequote,record_sep,noBOTSID,escapetable,escapefind,quotetable,quotefind,escapesearch = recordwriter
+        if noBOTSID:  #for csv/fixed: do not write BOTSID so remove it
+            del lex_record[0]
+        fieldcount = 0
+        recordbuffer = []     #to collect the formatted record-string.
+        for field in lex_record:        #loop all fields in lex_record
+            if not field[SFIELD]:   #is a field:
+                if fieldcount == 0:  #do nothing because first field in lex_record is not preceded by a separator
+                    fieldcount = 1
+                elif fieldcount == 1:
+                    recordbuffer.append(record_tag_sep)
+                    fieldcount = 2
+                else:
+                    recordbuffer.append(field_sep)
+            elif field[SFIELD] == 1:   #is a subfield:
+                recordbuffer.append(sfield_sep)
+            else:                   #repeat
+                recordbuffer.append(rep_sep)
+            fieldvalue = field[VALUE]
             mode_quote = False
-            value = u''     #to collect the formatted record-string.
-            for field in lex_record:        #loop all fields in lex_record
-                if not field[SFIELD]:   #is a field:
-                    if fieldcount == 0:  #do nothing because first field in lex_record is not preceded by a separator
-                        fieldcount = 1
-                    elif fieldcount == 1:
-                        value += record_tag_sep
-                        fieldcount = 2
-                    else:
-                        value += field_sep
-                elif field[SFIELD] == 1:   #is a subfield:
-                    value += sfield_sep
-                else:                   #repeat
-                    value += rep_sep
-                if quote_char:      #quote char only used for csv
-                    start_to__quote = False
-                    if forcequote == 2:
-                        if field[FORMATFROMGRAMMAR] in ['AN','A','AR']:
-                            start_to__quote = True
-                    elif forcequote:    #always quote; this catches values 1, '1', '0'
-                        start_to__quote = True
-                    else:
-                        if field_sep in field[VALUE] or quote_char in field[VALUE] or record_sep in field[VALUE]:
-                            start_to__quote = True
-                    if start_to__quote:
-                        value += quote_char
+            if quote_char:      #quote char only used for csv
+                if forcequote == 2:
+                    if field[FORMATFROMGRAMMAR] in ['AN','A','AR']:
                         mode_quote = True
-                for char in field[VALUE]:   #use escape (edifact, tradacom). For x12 is warned if content contains separator
-                    if char in escapechars:
-                        if isinstance(self,x12):
-                            if self.ta_info['replacechar']:
-                                char = self.ta_info['replacechar']
-                            else:
-                                raise botslib.OutMessageError(_(u'[F51]: Character "%(char)s" is used as separator in this x12 file, so it can not be used in content. Field: "%(content)s".'),
-                                                                {'char':char,'content':field[VALUE]})
-                        else:
-                            value +=escape
-                    elif mode_quote and char == quote_char:
-                        value += quote_char
-                    value += char
-                if mode_quote:
-                    value += quote_char
-                    mode_quote = False
-            value += record_sep
-            lijst.append(value)
-        return ''.join(lijst)
+                elif forcequote:    #always quote; this catches values 1, '1', '0'
+                    mode_quote = True
+                else:
+                    if field_sep in fieldvalue or quote_char in fieldvalue or record_sep in fieldvalue:
+                        mode_quote = True
+            if escapesearch is not None:    #x12: warn if content contains separator
+                found = escapesearch(fieldvalue)
+                if found:
+                    raise botslib.OutMessageError(_(u'[F51]: Character "%(char)s" is used as separator in this x12 file, so it can not be used in content. Field: "%(content)s".'),
+                                                    {'char':found.group(),'content':fieldvalue})
+            if mode_quote:
+                if quotefind is not None and quotefind(fieldvalue):
+                    fieldvalue = unicode(fieldvalue).translate(quotetable)
+                recordbuffer.append(quote_char)
+                recordbuffer.append(fieldvalue)
+                recordbuffer.append(quote_char)
+            else:
+                if escapefind is not None and escapefind(fieldvalue):
+                    fieldvalue = unicode(fieldvalue).translate(escapetable)
+                recordbuffer.append(fieldvalue)
+        recordbuffer.append(record_sep)
+        return u''.join(recordbuffer)
 
     def _getescapechars(self):
         return ''
@@ -501,7 +508,7 @@ class fixed(Outmessage):
                 else:
                     value = '0'.zfill(field_definition[MINLENGTH] )
             elif field_definition[BFORMAT] == 'N':  #fixed decimals; round
-                value = unicode(decimal.Decimal('0').quantize(decimal.Decimal(10) ** -field_definition[DECIMALS]))
+                value = fieldformat.quantize('0',field_definition[DECIMALS])
                 if field_definition[FORMAT] == 'NL':    #if field format is numeric right aligned
                     value = value.ljust(field_definition[MINLENGTH])
                 elif field_definition[FORMAT] == 'NR':    #if field format is numeric right aligned
@@ -510,8 +517,7 @@ class fixed(Outmessage):
                     value = value.zfill(field_definition[MINLENGTH])
                 value = value.replace('.',self.ta_info['decimaal'],1)    #replace '.' by required decimal sep.
             elif field_definition[BFORMAT] == 'I':  #implicit decimals
-                dec_value = decimal.Decimal('0') * 10**field_definition[DECIMALS]
-                value = unicode(dec_value.quantize(NODECIMAL ))
+                value = fieldformat.implicitdecimals('0',field_definition[DECIMALS])
                 value = value.zfill(field_definition[MINLENGTH])
         return value
 
@@ -582,6 +588,14 @@ class x12(var):
         return terug
 
 
+def _escape_xmltext(text,charset):
+    ''' escape and encode text of xml element; as ElementTree does.'''
+    return text.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;').encode(charset,'xmlcharrefreplace')
+
+def _escape_xmlattrib(text,charset):
+    ''' escape and encode value of xml attribute; as ElementTree does.'''
+    return text.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;').replace('"','&quot;').replace('\n','&#10;').encode(charset,'xmlcharrefreplace')
+
 class xml(Outmessage):
     ''' Some problems with right xml prolog, standalone, DOCTYPE, processing instructons: Different ET versions give different results.
         Things work OK for python 2.7
@@ -589,10 +603,17 @@ class xml(Outmessage):
         For python <2.7: do not generate standalone, DOCTYPE, processing instructions for encoding !=utf-8,ascii OR if elementtree package is installed (version 1.3.0 or bigger)
     '''
     def _write(self,node_instance):
-        ''' write normal XML messages (no envelope)'''
-        xmltree = ET.ElementTree(self._node2xml(node_instance))
-        root = xmltree.getroot()
-        self._xmlcorewrite(xmltree,root)
+        ''' write normal XML messages (no envelope)
+            the xml is written while walking the node tree, so there is no ElementTree for the whole message.
+            if namespaces are used ElementTree is used: it generates the namespace prefixes and declarations for the whole tree.
+        '''
+        if self._namespacesused(node_instance):
+            xmltree = ET.ElementTree(self._node2xml(node_instance))
+            root = xmltree.getroot()
+            self._xmlcorewrite(xmltree,root)
+        else:
+            self._xmlprolog()
+            self._node2xmlstream(node_instance,0)
 
     def envelopewrite(self,node_instance):
         ''' write envelope for XML messages'''
@@ -609,6 +630,17 @@ class xml(Outmessage):
         if sys.version_info[1] >= 7 and self.ta_info['namespace_prefixes']:   # Register any namespace prefixes specified in syntax
             for eachns in self.ta_info['namespace_prefixes']:
                 ET.register_namespace(eachns[0], eachns[1])        
+        self._xmlprolog()
+        #indent the xml elements
+        if self.ta_info['indented']:
+            botslib.indent_xml(root)
+        #write tree to file; this is differnt for different python/elementtree versions
+        if sys.version_info[1] < 7 and ET.VERSION < '1.3.0':
+            xmltree.write(self._outstream,encoding=self.ta_info['charset'])
+        else:
+            xmltree.write(self._outstream,encoding=self.ta_info['charset'],xml_declaration=False)
+
+    def _xmlprolog(self):
         #xml prolog: always use.*********************************
         #standalone, DOCTYPE, processing instructions: only possible in python >= 2.7 or if encoding is utf-8/ascii
         if sys.version_info[1] >= 7 or self.ta_info['charset'] in ['us-ascii','utf-8'] or ET.VERSION >= '1.3.0':
@@ -630,14 +662,6 @@ class xml(Outmessage):
                 for eachpi in self.ta_info['processing_instructions']:
                     processing_instruction = ET.ProcessingInstruction(eachpi[0], eachpi[1])
                     self._outstream.write(ET.tostring(processing_instruction) + indentstring) #do not use encoding here. gives double xml prolog; possibly because ET.ElementTree.write i used again by write()
-        #indent the xml elements
-        if self.ta_info['indented']:
-            botslib.indent_xml(root)
-        #write tree to file; this is differnt for different python/elementtree versions
-        if sys.version_info[1] < 7 and ET.VERSION < '1.3.0':
-            xmltree.write(self._outstream,encoding=self.ta_info['charset'])
-        else:
-            xmltree.write(self._outstream,encoding=self.ta_info['charset'],xml_declaration=False)
 
     def _node2xml(self,node_instance):
         ''' recursive method.
@@ -647,6 +671,62 @@ class xml(Outmessage):
             newnode.append(self._node2xml(childnode))
         return newnode
 
+    @staticmethod
+    def _namespacesused(node_instance):
+        ''' check if there are namespaces ('{namespace}tag') in tags or attributes of the node tree.'''
+        stack = [node_instance]
+        while stack:
+            node_instance = stack.pop()
+            for key in node_instance.record:
+                if '{' in key:
+                    return True
+            stack.extend(node_instance.children)
+        return False
+
+    def _node2xmlstream(self,node_instance,level):
+        ''' recursive method. write xml for node and its children directly to file.
+            output is the same as via ElementTree (ElementTree.write of python 2.7, indenting by botslib.indent_xml).
+        '''
+        charset = self.ta_info['charset']
+        xmlrecord = self._node2xmlfields(node_instance.record)     #xml-record-entity with xml-field-entities, no child records
+        buffer = ['<',xmlrecord.tag.encode(charset)]
+        for key,value in sorted(xmlrecord.items()):
+            buffer += [' ',key.encode(charset),'="',_escape_xmlattrib(value,charset),'"']
+        fields = list(xmlrecord)
+        if not xmlrecord.text and not fields and not node_instance.children:
+            buffer.append(' />')
+            self._outstream.write(''.join(buffer))
+            return
+        buffer.append('>')
+        if self.ta_info['indented']:
+            indentstring = '\n' + (level + 1) * '    '
+            if fields or node_instance.children:
+                if not xmlrecord.text or not xmlrecord.text.strip():
+                    xmlrecord.text = indentstring
+                #as botslib.indent_xml: the tail of each child is indentstring, the tail of the last child is the indentstring of this level.
+                tails = [indentstring] * (len(fields) + len(node_instance.children))
+                tails[-1] = '\n' + level * '    '
+            else:
+                tails = []
+        else:
+            tails = [''] * (len(fields) + len(node_instance.children))
+        if xmlrecord.text:
+            buffer.append(_escape_xmltext(xmlrecord.text,charset))
+        for xmlfield,tail in zip(fields,tails):
+            buffer += ['<',xmlfield.tag.encode(charset)]
+            for key,value in sorted(xmlfield.items()):
+                buffer += [' ',key.encode(charset),'="',_escape_xmlattrib(value,charset),'"']
+            if xmlfield.text:
+                buffer += ['>',_escape_xmltext(xmlfield.text,charset),'</',xmlfield.tag.encode(charset),'>',tail]
+            else:
+                buffer += [' />',tail]
+        self._outstream.write(''.join(buffer))
+        for childnode,tail in zip(node_instance.children,tails[len(fields):]):
+            self._node2xmlstream(childnode,level+1)
+            if tail:
+                self._outstream.write(tail)
+        self._outstream.write('</' + xmlrecord.tag.encode(charset) + '>')
+
     def _node2xmlfields(self,noderecord):
         ''' write record as xml-record-entity plus xml-field-entities within the xml-record-entity.
             output is sorted according to grammar, attributes alfabetically.
@@ -744,17 +824,22 @@ class json(Outmessage):
             self._outstream.write(u'[')
 
     def _write(self,node_instance):
-        ''' convert node tree to appropriate python object.
-            python objects are written to json by simplejson.
+        ''' write node tree as json.
+            json is written while walking the node tree, so there is no python object for the whole message.
+            output is the same as simplejson.dump of the python object made by _node2json.
         '''
         if self.nrmessagewritten:
             self._outstream.write(u',')
-        jsonobject = {node_instance.record['BOTSID']:self._node2json(node_instance)}
         if self.ta_info['indented']:
             indent = 2
         else:
             indent = None
-        simplejson.dump(jsonobject, self._outstream, skipkeys=False, ensure_ascii=False, check_circular=False, indent=indent)
+        self._jsonencoder = simplejson.JSONEncoder(skipkeys=False, ensure_ascii=False, check_circular=False, indent=indent)
+        self._outstream.write(u'{')
+        self._writejsonseparator(True,1)
+        self._outstream.write(self._jsonencoder.encode(node_instance.record['BOTSID']) + u': ')
+        self._node2jsonstream(node_instance,1)
+        self._writejsonend(u'}',0)
 
     def _closewrite(self):
         if self.multiplewrite:
@@ -776,6 +861,69 @@ class json(Outmessage):
         del newjsonobject['BOTSIDnr']
         return newjsonobject
 
+    def _node2jsonstream(self,node_instance,level):
+        ''' recursive method. write json object for node and its children directly to file.
+            keys are in same order as in the python object of _node2json.
+        '''
+        #jsonobject has the same keys as in _node2json; values for child records are lists of nodes.
+        jsonobject = node_instance.record.copy()
+        for childnode in node_instance.children:
+            key = childnode.record['BOTSID']
+            if key in jsonobject:
+                jsonobject[key].append(childnode)
+            else:
+                jsonobject[key] = [childnode]
+        del jsonobject['BOTSID']
+        del jsonobject['BOTSIDnr']
+        if not jsonobject:
+            self._outstream.write(u'{}')
+            return
+        self._outstream.write(u'{')
+        first = True
+        for key,value in jsonobject.iteritems():
+            self._writejsonseparator(first,level+1)
+            first = False
+            self._outstream.write(self._jsonencoder.encode(key) + u': ')
+            self._writejsonvalue(value,level+1)
+        self._writejsonend(u'}',level)
+
+    def _writejsonvalue(self,value,level):
+        ''' write value of a key: list of child nodes, field, repeating field or composite.
+            lists and dicts are written item by item, indented at their nesting level (as simplejson.dump does).
+        '''
+        if isinstance(value,list) and value:
+            self._outstream.write(u'[')
+            for nr,item in enumerate(value):
+                self._writejsonseparator(not nr,level+1)
+                if isinstance(item,node.Node):
+                    self._node2jsonstream(item,level+1)
+                else:
+                    self._writejsonvalue(item,level+1)
+            self._writejsonend(u']',level)
+        elif isinstance(value,dict) and value:
+            self._outstream.write(u'{')
+            first = True
+            for key,item in value.iteritems():
+                self._writejsonseparator(first,level+1)
+                first = False
+                self._outstream.write(self._jsonencoder.encode(key) + u': ')
+                self._writejsonvalue(item,level+1)
+            self._writejsonend(u'}',level)
+        else:
+            self._outstream.write(self._jsonencoder.encode(value))
+
+    def _writejsonseparator(self,first,level):
+        ''' as simplejson.dump: items are separated by ', '; with indent each item starts on a new line.'''
+        if not first:
+            self._outstream.write(u', ')
+        if self._jsonencoder.indent is not None:
+            self._outstream.write(u'\n' + u' ' * (self._jsonencoder.indent * level))
+
+    def _writejsonend(self,char,level):
+        if self._jsonencoder.indent is not None:
+            self._outstream.write(u'\n' + u' ' * (self._jsonencoder.indent * level))
+        self._outstream.write(char)
+
     def _node2jsonold(self,node_instance):
         ''' recursive method.
         '''
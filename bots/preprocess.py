@@ -1,5 +1,6 @@
 import os
 import re
+import mmap
 import zipfile
 import string
 from django.utils.translation import ugettext as _
@@ -113,6 +114,8 @@ HEADER = re.compile('''
         )
     )
     ''',re.DOTALL|re.VERBOSE)
+NOTWHITESPACE = re.compile('[^%s]'%re.escape(string.whitespace+'\x1A\x00'))
+CHUNKSIZE = 1048576     #interchanges are copied from mailbag to their own file in chunks of this size
 
 def mailbag(ta_from,endstatus,frommessagetype,**argv):
     ''' 2 main functions:
@@ -123,14 +126,29 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
         - handle multiple UNA in one file, including different charsets.
         - handle multiple ISA's with different separators in one file
         in bots > 3.0.0 all mailbag, edifact, x12 and tradacoms go via mailbag.
+        the edi file is memory-mapped and scanned once (searches start at a position, no slicing of the edi file).
+    '''
+    filehandler = botslib.opendata(ta_from.filename,'rb')
+    try:
+        if not os.fstat(filehandler.fileno()).st_size:  #mmap can not handle empty file
+            raise botslib.InMessageError(_(u'[M52]: Edi file contains only whitespace.'))
+        edifile = mmap.mmap(filehandler.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+            _splitmailbag(edifile,ta_from,endstatus,frommessagetype)
+        finally:
+            edifile.close()
+    finally:
+        filehandler.close()
+
+def _splitmailbag(edifile,ta_from,endstatus,frommessagetype):
+    ''' does the work for mailbag. edifile is a mmap (or a string).
     '''
-    edifile = botslib.readdata(filename=ta_from.filename)
     startpos = 0
     nr_interchanges = 0
     while (1):
-        found = HEADER.match(edifile[startpos:])
+        found = HEADER.match(edifile,startpos)
         if found is None:
-            if edifile[startpos:].strip(string.whitespace+'\x1A\x00'):  #there is content...but not valid
+            if NOTWHITESPACE.search(edifile,startpos):  #there is content...but not valid
                 if nr_interchanges:    #found interchanges, but remainder is not valid
                     raise botslib.InMessageError(_(u'[M50]: Found data not in a valid interchange at position %(pos)s.'),{'pos':startpos})                
                 else:   #no interchanges found, content is not a valid edifact/x12/tradacoms interchange
@@ -150,7 +168,7 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
                     raise botslib.InMessageError(_(u'[M52]: Edi file contains only whitespace.'))
         elif found.group('x12'):
             editype = 'x12'
-            headpos = startpos + found.start('x12')
+            headpos = found.start('x12')
             #determine field_sep and record_sep
             count = 0
             for char in edifile[headpos:headpos+120]:  #search first 120 characters to determine separators
@@ -166,26 +184,26 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
                 elif count == 106:
                     record_sep = char
                     break
-            foundtrailer = re.search('''%(record_sep)s
+            foundtrailer = re.compile('''%(record_sep)s
                                         \s*
                                         I[\n\r]*E[\n\r]*A
                                         .+?
                                         %(record_sep)s
                                         '''%{'record_sep':re.escape(record_sep)},
-                                        edifile[headpos:],re.DOTALL|re.VERBOSE)
+                                        re.DOTALL|re.VERBOSE).search(edifile,headpos)
             if not foundtrailer:
-                foundtrailer2 = re.search('''%(record_sep)s
+                foundtrailer2 = re.compile('''%(record_sep)s
                                             \s*
                                             I[\n\r]*E[\n\r]*A
                                             '''%{'record_sep':re.escape(record_sep)},
-                                            edifile[headpos:],re.DOTALL|re.VERBOSE)
+                                            re.DOTALL|re.VERBOSE).search(edifile,headpos)
                 if foundtrailer2:
                     raise botslib.InMessageError(_(u'[M60]: Found no segment terminator for IEA trailer at position %(pos)s.'),{'pos':foundtrailer2.start()})
                 else:
                     raise botslib.InMessageError(_(u'[M54]: Found no valid IEA trailer for the ISA header at position %(pos)s.'),{'pos':headpos})
         elif found.group('edifact'):
             editype = 'edifact'
-            headpos = startpos + found.start('edifact')
+            headpos = found.start('edifact')
             #parse UNA. valid UNA: UNA:+.? '
             if found.group('UNA'):
                 count = 0
@@ -213,7 +231,7 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
                 else:
                     raise botslib.InMessageError(_(u'[M57]: Edifact file with non-standard separators. UNA segment should be used.'))
             #search trailer
-            foundtrailer = re.search('''[^%(escape)s\n\r]       #char that is not escape or cr/lf
+            foundtrailer = re.compile('''[^%(escape)s\n\r]       #char that is not escape or cr/lf
                                         [\n\r]*?                #maybe some cr/lf's
                                         %(record_sep)s          #segment separator
                                         \s*                     #whitespace between segments
@@ -223,7 +241,7 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
                                         [\n\r]*?                #maybe some cr/lf's
                                         %(record_sep)s          #segment separator
                                         '''%{'escape':escape,'record_sep':re.escape(record_sep)},
-                                        edifile[headpos:],re.DOTALL|re.VERBOSE)
+                                        re.DOTALL|re.VERBOSE).search(edifile,headpos)
             if not foundtrailer:
                 raise botslib.InMessageError(_(u'[M58]: Found no valid UNZ trailer for the UNB header at position %(pos)s.'),{'pos':headpos})
         elif found.group('tradacoms'):
@@ -231,8 +249,8 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
             #~ field_sep = '='     #the tradacoms 'after-segment-tag-separator'
             record_sep = "'"
             escape = '?'
-            headpos = startpos + found.start('STX')
-            foundtrailer = re.search('''[^%(escape)s\n\r]       #char that is not escape or cr/lf
+            headpos = found.start('STX')
+            foundtrailer = re.compile('''[^%(escape)s\n\r]       #char that is not escape or cr/lf
                                         [\n\r]*?                #maybe some cr/lf's
                                         %(record_sep)s          #segment separator
                                         \s*                     #whitespace between segments
@@ -242,16 +260,17 @@ def mailbag(ta_from,endstatus,frommessagetype,**argv):
                                         [\n\r]*?                #maybe some cr/lf's
                                         %(record_sep)s          #segment separator
                                         '''%{'escape':escape,'record_sep':re.escape(record_sep)},
-                                        edifile[headpos:],re.DOTALL|re.VERBOSE)
+                                        re.DOTALL|re.VERBOSE).search(edifile,headpos)
             if not foundtrailer:
                 raise botslib.InMessageError(_(u'[M59]: Found no valid END trailer for the STX header at position %(pos)s.'),{'pos':headpos})
         #so: found an interchange (from headerpos until endpos)
-        endpos = headpos + foundtrailer.end()
+        endpos = foundtrailer.end()
         ta_to = ta_from.copyta(status=endstatus)  #make transaction for translated message; gets ta_info of ta_frommes
         tofilename = unicode(ta_to.idta)
-        filesize = len(edifile[headpos:endpos])
+        filesize = endpos - headpos
         tofile = botslib.opendata(tofilename,'wb')
-        tofile.write(edifile[headpos:endpos])
+        for chunkpos in xrange(headpos,endpos,CHUNKSIZE):
+            tofile.write(edifile[chunkpos:min(chunkpos+CHUNKSIZE,endpos)])
         tofile.close()
         #editype is now either edifact, x12 or tradacoms
         #frommessagetype is the original frommessagetype (from route).
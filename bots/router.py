@@ -1,3 +1,5 @@
+import multiprocessing
+import posixpath
 from django.utils.translation import ugettext as _
 #bots-modules
 import automaticmaintenance
@@ -14,13 +16,98 @@ def rundispatcher(command,routestorun):
     ''' one run for each command
     '''
     classtocall = globals()[command]           #get the route class from this module
+    botslib.lookupcache.newrun()
     botsglobal.currentrun = classtocall(command,routestorun)
-    if botsglobal.currentrun.run():
+    try:
+        dorun = botsglobal.currentrun.run()
+    finally:
+        communication.closeconnectionpool()     #connections are reused within a run
+    if dorun:
         return botsglobal.currentrun.evaluate()      #return result of evaluation of run: nr of errors, 0 (no error)
     else:
         botsglobal.logger.info(_(u'Nothing to do in run.'))
         return 0      #return 0 (no error) 
 
+def _runroutegroup(routes):
+    ''' run routes of the current run one after another.'''
+    for route in routes:
+        botslib.setrouteid(route)
+        botsglobal.currentrun.router(route)
+        botslib.setrouteid('')
+
+#*********************************************************************
+#*** independent route groups in parallel (pool of worker processes).
+#*** bots.ini: routeworkers. Worker processes are initialised as for translateworkers (own database connection and log file).
+#*** a route group is run completely by one worker; errors in routes are handled as usual (statust of ta's); other errors are raised in the bots-engine.
+#*********************************************************************
+def _runroutegroups_in_pool(command,routegroups):
+    botslib.flush_transactions()    #workers should see all changes
+    pool = multiprocessing.Pool(processes=min(botslib.routeworkers(),len(routegroups)),initializer=transform._initworker,initargs=(botsglobal.ini.get('directories','config_org'),))
+    state = {'processlist':botslib._Transaction.processlist[:]}
+    try:
+        for routes,(errortext,hits,misses) in zip(routegroups,pool.imap(_runroutegroup_in_worker,[(command,routes,state) for routes in routegroups])):
+            botslib.lookupcache.hits += hits        #lookups of worker are counted in run report
+            botslib.lookupcache.misses += misses
+            if errortext:
+                raise botslib.BotsError(_(u'Error in worker process running routes "%(routes)s": %(txt)s'),{'routes':u','.join(routes),'txt':errortext})
+    finally:
+        pool.close()
+        pool.join()
+
+def _runroutegroup_in_worker(task):
+    ''' runs in worker process. returns (errortext,hits,misses):
+        errortext is None, or text of an error that is not handled in the routes;
+        hits and misses of lookup cache for this route group (counted in bots-engine).
+    '''
+    command,routes,state = task
+    errortext = None
+    try:
+        botsglobal.ini.set('settings','translateworkers','1')   #worker process can not have its own worker processes
+        botslib._Transaction.processlist[:] = state['processlist']
+        botslib.lookupcache.newrun()
+        botsglobal.currentrun = globals()[command](command,routes)  #root of run is last in processlist, as in bots-engine
+        try:
+            _runroutegroup(routes)
+        finally:
+            communication.closeconnectionpool()
+    except:
+        errortext = botslib.txtexc()
+    hits,misses = botslib.lookupcache.hits,botslib.lookupcache.misses
+    botslib.lookupcache.hits = botslib.lookupcache.misses = 0
+    return errortext,hits,misses
+
+def _channelendpoint(channeltype,host,path):
+    ''' where a channel reads or writes edi files: (host,path). Routes using the same endpoint are dependent, even if they use different channels
+        (eg route 1 writes to a directory, route 2 reads from that directory).
+        for local channels path is the full path of the directory; returns None if the channel has no endpoint.
+    '''
+    if channeltype in ['file','mimefile','communicationscript']:
+        if not path:
+            return None
+        return ('',botslib.join(path))
+    if channeltype in ['trash','db','database'] or not host:
+        return None
+    return (host.lower(),posixpath.normpath(path) if path else '')
+
+def _groupsofroutes(routestorun,dependencies):
+    ''' union-find: routes that have a dependency (channel, translation, etc) in common are in the same group.
+        dependencies: list of (route,dependency).
+        returns list of groups; each group is a list of routes in the same order as routestorun; groups are in order of their first route.
+    '''
+    parent = {}     #union-find: route/dependency -> parent
+    def find(key):
+        parent.setdefault(key,key)
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+    for route,dependency in dependencies:
+        parent[find(('route',route))] = find(dependency)
+    routegroups = {}
+    for route in routestorun:
+        routegroups.setdefault(find(('route',route)),[]).append(route)
+    return sorted(routegroups.itervalues(),key=lambda routes: routestorun.index(routes[0]))
+
 class new(object):
     def __init__(self,command,routestorun):
         self.routestorun = routestorun
@@ -29,11 +116,52 @@ class new(object):
         self.keep_track_if_outchannel_deferred = {}
         
     def run(self):
-        for route in self.routestorun:
-            botslib.setrouteid(route)
-            self.router(route)
-            botslib.setrouteid('')
+        if self.command == 'new' and botslib.routeworkers() > 1:
+            routegroups = self.get_routegroups()
+            if len(routegroups) > 1:
+                botsglobal.logger.info(_(u'Running %(nr)s independent groups of routes in worker processes.'),{'nr':len(routegroups)})
+                _runroutegroups_in_pool(self.command,routegroups)
+                return True
+        _runroutegroup(self.routestorun)
         return True 
+
+    def get_routegroups(self):
+        ''' split routestorun in groups of routes that are independent of each other; routes of different groups can run at the same time.
+            routes are dependent if they use the same channel (in or out) or the same directory/host (see _channelendpoint), or translate the same editype/messagetype.
+            routes with a routescript are dependent of each other, unless the routescript indicates the route is independent: routeindependent = True
+            returns list of groups; each group is a list of routes in the same order as routestorun.
+        '''
+        dependencies = []
+        for route in self.routestorun:
+            try:
+                userscript,scriptname = botslib.botsimport('routescripts',route)
+            except botslib.BotsImportError:      #routescript is not there
+                pass
+            else:
+                if not getattr(userscript,'routeindependent',False):
+                    dependencies.append((route,('routescript',)))
+        endpoints = {}
+        for row in botslib.query('''SELECT idchannel,type,host,path FROM channel '''):
+            endpoints[row['idchannel']] = _channelendpoint(row['type'],row['host'],row['path'])
+        for row in botslib.query('''SELECT idroute,
+                                           fromchannel_id as fromchannel,
+                                           tochannel_id as tochannel,
+                                           fromeditype,
+                                           frommessagetype,
+                                           translateind
+                                    FROM routes
+                                    WHERE active=%(active)s ''',
+                                    {'active':True}):
+            if row['idroute'] not in self.routestorun:
+                continue
+            for channel in [row['fromchannel'],row['tochannel']]:
+                if channel:
+                    dependencies.append((row['idroute'],('channel',channel)))
+                    if endpoints.get(channel):
+                        dependencies.append((row['idroute'],('endpoint',)+endpoints[channel]))
+            if int(row['translateind']) in [1,3]:
+                dependencies.append((row['idroute'],('translate',row['fromeditype'],row['frommessagetype'])))
+        return _groupsofroutes(self.routestorun,dependencies)
         
     @botslib.log_session
     def router(self,route):
@@ -1,5 +1,7 @@
 ''' module contains functions to be called from user scripts. '''
 import os
+import atexit
+import multiprocessing
 try:
     import cPickle as pickle
 except ImportError:
@@ -12,6 +14,7 @@ import botsglobal
 import inmessage
 import outmessage
 import grammar
+import botsinit
 from botsconfig import *
 
 #*******************************************************************************************************************
@@ -23,6 +26,7 @@ from communication import run
 
 
 @botslib.log_session
+@botslib.batch_transactions
 def translate(startstatus,endstatus,routedict,rootidta):
     ''' query edifiles to be translated.
         status: FILEIN--PARSED-<SPLITUP--TRANSLATED
@@ -32,16 +36,105 @@ def translate(startstatus,endstatus,routedict,rootidta):
     except botslib.BotsImportError:       #userscript is not there; other errors like syntax errors are not catched
         userscript = scriptname = None
     #select edifiles to translate
-    for rawrow in botslib.query(u'''SELECT idta,frompartner,topartner,filename,messagetype,testindicator,editype,charset,alt,fromchannel,filesize
-                                FROM ta
-                                WHERE idta>%(rootidta)s
-                                AND status=%(status)s
-                                AND statust=%(statust)s
-                                AND idroute=%(idroute)s ''',
-                                {'status':startstatus,'statust':OK,'idroute':routedict['idroute'],'rootidta':rootidta}):
-            row = dict(rawrow)   #convert to real dictionary
+    rows = [dict(rawrow) for rawrow in botslib.query(u'''SELECT idta,frompartner,topartner,filename,messagetype,testindicator,editype,charset,alt,fromchannel,filesize
+                                                        FROM ta
+                                                        WHERE idta>%(rootidta)s
+                                                        AND status=%(status)s
+                                                        AND statust=%(statust)s
+                                                        AND idroute=%(idroute)s
+                                                        ORDER BY idta ''',
+                                                        {'status':startstatus,'statust':OK,'idroute':routedict['idroute'],'rootidta':rootidta})]
+    if len(rows) > 1 and botslib.translateworkers() > 1:
+        _translate_in_pool(rows,routedict,endstatus)
+    else:
+        for row in rows:
             _translate_one_file(row,routedict,endstatus,userscript,scriptname)
 
+#*********************************************************************
+#*** translation of edi files in parallel (pool of worker processes).
+#*** bots.ini: translateworkers. Each worker process has its own database connection and log file.
+#*** each edi file is translated completely by one worker; results of translation (ta's) are written by the worker.
+#*** errors per edi file are handled as usual (statust of ta's); other errors are raised in the bots-engine.
+#*********************************************************************
+_translatepool = None
+
+def _translate_in_pool(rows,routedict,endstatus):
+    global _translatepool
+    botslib.flush_transactions()    #workers should see all changes
+    if _translatepool is None:      #pool is started once and used for all translations in this bots-engine
+        _translatepool = multiprocessing.Pool(processes=botslib.translateworkers(),initializer=_initworker,initargs=(botsglobal.ini.get('directories','config_org'),))
+        atexit.register(_stoptranslatepool)
+    state = {'processlist':botslib._Transaction.processlist[:],
+             'routeid':botslib.getrouteid(),
+             'minta4query':botsglobal.currentrun.get_minta4query(),
+             'minta4query_route':botsglobal.currentrun.get_minta4query_route(),
+             'minta4query_routepart':botsglobal.currentrun.get_minta4query_routepart(),
+             }
+    #results are received in same order as rows.
+    for row,(errortext,hits,misses) in zip(rows,_translatepool.imap(_translate_one_file_in_worker,[(row,routedict,endstatus,state) for row in rows])):
+        botslib.lookupcache.hits += hits        #lookups of worker are counted in run report
+        botslib.lookupcache.misses += misses
+        if errortext:
+            raise botslib.BotsError(_(u'Error in worker process translating file "%(filename)s": %(txt)s'),{'filename':row['filename'],'txt':errortext})
+
+def _stoptranslatepool():
+    global _translatepool
+    if _translatepool is not None:
+        _translatepool.close()
+        _translatepool.join()
+        _translatepool = None
+
+_parentdb = []      #forked worker: keeps database connection of bots-engine (should not be closed by worker).
+
+def _initworker(configdir):
+    ''' initialise worker process: own database connection, own logging.'''
+    if botsglobal.ini is None:      #worker is a new python process (windows): full initialisation
+        botsinit.generalinit(configdir)
+        os.chdir(botsglobal.ini.get('directories','botspath'))
+    else:                           #worker is a fork of bots-engine
+        _parentdb.append(botsglobal.db)
+    botslib._Transaction.batchlevel = 0
+    botslib._Transaction.pendingupdates = {}
+    botslib._Transaction.uncommitted = 0
+    botsglobal.logger = botsinit.initenginelogging('engine_' + multiprocessing.current_process().name)
+    botsinit.connect()
+    botslib.prepare_confirmrules()
+
+class _RunInWorker(object):
+    ''' in worker process: get_minta4query etc as in the run of bots-engine.'''
+    def __init__(self,state):
+        self.state = state
+    def get_minta4query(self):
+        return self.state['minta4query']
+    def get_minta4query_route(self):
+        return self.state['minta4query_route']
+    def get_minta4query_routepart(self):
+        return self.state['minta4query_routepart']
+
+def _translate_one_file_in_worker(task):
+    ''' runs in worker process. returns (errortext,hits,misses):
+        errortext is None, or text of an error that is not handled in _translate_one_file;
+        hits and misses of lookup cache for this file (counted in bots-engine).
+    '''
+    row,routedict,endstatus,state = task
+    errortext = None
+    try:
+        if botsglobal.currentrun is None or botsglobal.currentrun.get_minta4query() != state['minta4query']:   #new run
+            botslib.lookupcache.newrun()
+        botsglobal.currentrun = _RunInWorker(state)
+        botslib._Transaction.processlist[:] = state['processlist']
+        botslib.setrouteid(state['routeid'])
+        try:
+            userscript,scriptname = botslib.botsimport('mappings','translation')
+        except botslib.BotsImportError:
+            userscript = scriptname = None
+        botslib.batch_transactions(_translate_one_file)(row,routedict,endstatus,userscript,scriptname)
+    except:
+        errortext = botslib.txtexc()
+    hits,misses = botslib.lookupcache.hits,botslib.lookupcache.misses
+    botslib.lookupcache.hits = botslib.lookupcache.misses = 0
+    return errortext,hits,misses
+
 def _translate_one_file(row,routedict,endstatus,userscript,scriptname):
     ''' -   read, lex, parse, make tree of nodes.
         -   split up files into messages (using 'nextmessage' of grammar)
@@ -51,13 +144,17 @@ def _translate_one_file(row,routedict,endstatus,userscript,scriptname):
     try:
         ta_fromfile = botslib.OldTransaction(row['idta'])
         ta_parsed = ta_fromfile.copyta(status=PARSED)
-        if row['filesize'] > botsglobal.ini.getint('settings','maxfilesizeincoming',5000000):
+        #big edifact, x12, xml and json files can be parsed and translated one message at a time (streaming)
+        streamingfilesizeincoming = botsglobal.ini.getint('settings','streamingfilesizeincoming',0)
+        streaming = bool(streamingfilesizeincoming and row['filesize'] > streamingfilesizeincoming and row['editype'] in ['edifact','x12','xml','json'])
+        if not streaming and row['filesize'] > botsglobal.ini.getint('settings','maxfilesizeincoming',5000000):
             ta_parsed.update(filesize=row['filesize'])
             raise botslib.FileTooLargeError(_(u'File size of %(filesize)s is too big; option "maxfilesizeincoming" in bots.ini is %(maxfilesizeincoming)s.'),
                                             {'filesize':row['filesize'],'maxfilesizeincoming':botsglobal.ini.getint('settings','maxfilesizeincoming',5000000)})
         botsglobal.logger.debug(_(u'Start translating file "%(filename)s" editype "%(editype)s" messagetype "%(messagetype)s".'),row)
         #read whole edi-file: read, parse and made into a inmessage-object. Message is represented as a tree (inmessage.root is the root of the tree).
-        edifile = inmessage.parse_edi_file(frompartner=row['frompartner'],
+        edifile = inmessage.parse_edi_file(streaming=streaming,
+                                            frompartner=row['frompartner'],
                                             topartner=row['topartner'],
                                             filename=row['filename'],
                                             messagetype=row['messagetype'],
@@ -71,6 +168,9 @@ def _translate_one_file(row,routedict,endstatus,userscript,scriptname):
         edifile.checkforerrorlist() #no exception if infile has been lexed and parsed OK else raises an error
 
         if int(routedict['translateind']) == 3: #parse & passthrough; file is parsed, partners are known, no mapping, does confirm.
+            if streaming:   #when streaming file is parsed in nextmessage
+                for inn_splitup in edifile.nextmessage():
+                    pass
             raise botslib.GotoException('dummy')    
         
         #edifile.ta_info contains info: QUERIES, charset etc
@@ -275,12 +375,8 @@ def ccode(ccodeid,leftcode,field='rightcode',safe=False):
     ''' converts code using a db-table.
         converted value is returned, exception if not there.
     '''
-    for row in botslib.query(u'''SELECT ''' +field+ '''
-                                FROM ccode
-                                WHERE ccodeid_id = %(ccodeid)s
-                                AND leftcode = %(leftcode)s''',
-                                {'ccodeid':ccodeid,'leftcode':leftcode}):
-        return row[field]
+    for value in _ccodelookup(ccodeid,'leftcode',leftcode,field):
+        return value
     if safe is None:
         return None
     elif safe:
@@ -294,12 +390,8 @@ def safe_ccode(ccodeid,leftcode,field='rightcode'):   #depreciated, use ccode wi
 
 def reverse_ccode(ccodeid,rightcode,field='leftcode',safe=False):
     ''' as ccode but reversed lookup.'''
-    for row in botslib.query(u'''SELECT ''' +field+ '''
-                                FROM ccode
-                                WHERE ccodeid_id = %(ccodeid)s
-                                AND rightcode = %(rightcode)s''',
-                                {'ccodeid':ccodeid,'rightcode':rightcode}):
-        return row[field]
+    for value in _ccodelookup(ccodeid,'rightcode',rightcode,field):
+        return value
     if safe is None:
         return None
     elif safe:
@@ -321,14 +413,28 @@ safercodetconversion = safe_reverse_ccode
 def getcodeset(ccodeid,leftcode,field='rightcode'):
     ''' Returns a list of all 'field' values in ccode with right ccodeid and leftcode.
     '''
-    terug = []
-    for row in botslib.query(u'''SELECT ''' +field+ '''
-                                FROM ccode
-                                WHERE ccodeid_id = %(ccodeid)s
-                                AND leftcode = %(leftcode)s''',
-                                {'ccodeid':ccodeid,'leftcode':leftcode}):
-        terug.append(row[field])
-    return  terug
+    return list(_ccodelookup(ccodeid,'leftcode',leftcode,field))
+
+def _ccodelookup(ccodeid,codefield,code,field):
+    ''' lookup in ccode via lookup cache; returns list of values of 'field'.'''
+    terug = botslib.lookupcache.lookup_preloaded(('ccode',ccodeid),codefield,code,field)
+    if terug is not None:
+        return terug
+    return botslib.lookupcache.query(u'''SELECT ''' +field+ '''
+                                        FROM ccode
+                                        WHERE ccodeid_id = %(ccodeid)s
+                                        AND ''' +codefield+ ''' = %(code)s''',
+                                        {'ccodeid':ccodeid,'code':code},field)
+
+def preload_ccode(ccodeid):
+    ''' read all codes of ccodeid in one query; following lookups (ccode, reverse_ccode, getcodeset) for this ccodeid do not use the database.
+        use for ccodeid's with many lookups in a run.
+    '''
+    botslib.lookupcache.preload(('ccode',ccodeid),('leftcode','rightcode'),
+                                u'''SELECT *
+                                    FROM ccode
+                                    WHERE ccodeid_id = %(ccodeid)s''',
+                                    {'ccodeid':ccodeid})
 
 #*********************************************************************
 #*** utily functions for calculating/generating/checking EAN/GTIN/GLN
@@ -450,12 +556,12 @@ def partnerlookup(value,field,field_where_value_is_searched='idpartner',safe=Fal
         - False: if not found throw exception
         - None: if not found, return None
     '''
-    for row in botslib.query(u'''SELECT ''' +field+ '''
-                                FROM partner
-                                WHERE '''+field_where_value_is_searched+ ''' = %(value)s
-                                ''',{'value':value}):
-        if row[field]:
-            return row[field]
+    for result in botslib.lookupcache.query(u'''SELECT ''' +field+ '''
+                                                FROM partner
+                                                WHERE '''+field_where_value_is_searched+ ''' = %(value)s
+                                                ''',{'value':value},field):
+        if result:
+            return result
     #nothing found in partner table
     if safe is None:
         return None
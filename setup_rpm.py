@@ -73,6 +73,7 @@ setup(
     scripts = [ 'bots-webserver.py',
             'bots-engine.py',
             'bots-grammarcheck.py',
+            'bots-benchmark.py',
             'bots-xml2botsgrammar.py',
             'bots-updatedb.py',
             'bots-dirmonitor.py',
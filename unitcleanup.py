@@ -0,0 +1,110 @@
+import unittest
+import time
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.cleanup as cleanup
+
+''' cleanup of old transactions in chunks (bots.ini: cleanupchunksize, cleanupmaxseconds):
+    - boundaries of the chunks in _deletechunks (done on a test table, not on ta).
+    - not finished in time: continue in next run via uniek 'bots_cleanup_maxidta' (deleting itself is replaced).
+    - no full VACUUM of SQLite database if there is a deadline.
+    no plugin needed; not an acceptance test.
+'''
+TABLE = 'unitcleanup'
+
+class TestCleanup(unittest.TestCase):
+    def setUp(self):
+        self.chunksize = botsglobal.ini.get('settings','cleanupchunksize',None)
+        self.progress = cleanup._getcleanupprogress()
+        self.changeq = botslib.changeq
+        self.deletechunks = cleanup._deletechunks
+        self.deletes = []
+        botslib.changeq(u'''CREATE TABLE ''' + TABLE + ''' (idta INTEGER)''')
+
+    def tearDown(self):
+        botslib.changeq = self.changeq
+        cleanup._deletechunks = self.deletechunks
+        if self.chunksize is None:
+            botsglobal.ini.remove_option('settings','cleanupchunksize')
+        else:
+            botsglobal.ini.set('settings','cleanupchunksize',self.chunksize)
+        cleanup._setcleanupprogress(self.progress)
+        botslib.changeq(u'''DROP TABLE ''' + TABLE)
+
+    def countdeletes(self,querystring,*args):
+        if querystring.startswith('DELETE'):
+            self.deletes.append(args[0]['upperidta'])
+        return self.changeq(querystring,*args)
+
+    def fill(self,idtas):
+        for idta in idtas:
+            self.changeq(u'''INSERT INTO ''' + TABLE + ''' (idta) VALUES (%(idta)s)''',{'idta':idta})
+
+    def remaining(self):
+        return [row['idta'] for row in botslib.query(u'''SELECT idta FROM ''' + TABLE + ''' ORDER BY idta''')]
+
+    def testchunks(self):
+        botsglobal.ini.set('settings','cleanupchunksize','10')
+        botslib.changeq = self.countdeletes
+        for number,maxidta,deletes in [(25,1000,[111,121,1000]),      #2 full chunks and rest
+                                       (20,1000,[111,1000]),          #number is multiple of chunksize: last chunk is empty
+                                       (10,1000,[1000]),              #1 chunk
+                                       (0,1000,[1000]),               #nothing to delete
+                                       (25,115,[111,115]),            #maxidta within the rows; rows from maxidta are kept
+                                       (25,111,[111]),
+                                      ]:
+            self.changeq(u'''DELETE FROM ''' + TABLE)
+            self.fill(range(101,101+number))
+            self.deletes = []
+            self.assertTrue(cleanup._deletechunks(TABLE,maxidta,None))
+            self.assertEqual(self.deletes,deletes,(number,maxidta))
+            self.assertEqual(self.remaining(),range(max(maxidta,101),101+number),(number,maxidta))
+
+    def testdeadline(self):
+        botsglobal.ini.set('settings','cleanupchunksize','10')
+        self.fill(range(101,126))
+        self.assertFalse(cleanup._deletechunks(TABLE,1000,time.time()-1),'deadline passed: stop after one chunk')
+        self.assertEqual(self.remaining(),range(111,126))
+        self.assertTrue(cleanup._deletechunks(TABLE,1000,None))
+        self.assertEqual(self.remaining(),[])
+
+    def testresume(self):
+        calls = []
+        timeup = ['filereport']     #first time: time is up in filereport
+        def deletechunks(table,maxidta,deadline):
+            calls.append((table,maxidta))
+            if table in timeup:
+                timeup.remove(table)
+                return False
+            return True
+        cleanup._deletechunks = deletechunks
+        cleanup._setcleanupprogress(1000)
+        self.assertFalse(cleanup._cleantransactions(time.time(),resume=True))
+        self.assertEqual(calls,[('report',1000),('filereport',1000)])
+        self.assertEqual(cleanup._getcleanupprogress(),1000,'progress is kept for next run')
+        del calls[:]
+        self.assertTrue(cleanup._cleantransactions(None,resume=True))
+        self.assertEqual(calls,[('report',1000),('filereport',1000),('ta',1000)],'next run continues with same maxidta')
+        self.assertEqual(cleanup._getcleanupprogress(),0,'cleanup finished')
+        #unfinished cleanup with higher maxidta is included in new cleanup
+        del calls[:]
+        cleanup._setcleanupprogress(2**30)
+        self.assertTrue(cleanup._cleantransactions(None))
+        self.assertEqual(calls[0],('report',2**30))
+
+    def testvacuum(self):
+        if botsglobal.settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            return
+        if botsglobal.db.execute('''PRAGMA auto_vacuum''').fetchone()[0] != 0:
+            return      #database already uses auto_vacuum
+        cleanup._vacuum(time.time()+60)
+        self.assertEqual(botsglobal.db.execute('''PRAGMA auto_vacuum''').fetchone()[0],0,'with deadline: database is not switched to incremental vacuum')
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    botsinit.connect()
+    unittest.main()
+    botsglobal.db.close()
@@ -0,0 +1,156 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import random
+import StringIO
+import email.Message
+import email.Generator
+import email.encoders
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.communication as communication
+from bots.botsconfig import *
+
+''' communication:
+    - sending of files in outcommunicate (sendfiles), with one session and with several sessions at the same time (sessionsperchannel).
+      the sending itself is replaced (only the files are recorded), no connection is made.
+    - payload of email (file2mime) written in chunks: same result as the python encoders (as file2mime did before).
+    uses the database of bots (adds transactions and deletes them afterwards).
+    no plugin needed; not an acceptance test.
+'''
+IDCHANNEL = 'unitcommunication'
+
+class Userscript(object):
+    def __init__(self,sessionsperchannel):
+        self.sessionsperchannel = sessionsperchannel
+
+class FakeSession(communication._comsession):
+    ''' session that does not send, but records what is sent: (session,tofilename,fromfilename).'''
+    def connect(self):
+        self.sent.append(('connect',))
+        self.session = len([sent for sent in self.sent if sent[0] == 'connect'])
+
+    def disconnect(self):
+        pass
+
+    def remotefilename(self,tofilename):
+        return 'fake:/' + tofilename
+
+    def sendfile(self,fromfilename,tofilename,mode):
+        time.sleep(random.random() / 100)
+        if fromfilename.startswith('error'):
+            raise botslib.CommunicationOutError(u'Error sending file.')
+        self.sent.append((self.session,tofilename,fromfilename))
+        return tofilename
+
+class TestSendfiles(unittest.TestCase):
+    def setUp(self):
+        self.rootidta = botslib.NewTransaction(status=PROCESS,filename='unitcommunication').idta
+        self.files = []
+        for count in range(12):
+            filename = 'error%s'%count if count == 7 else 'file%s'%count
+            botslib.NewTransaction(status=FILEOUT,statust=OK,tochannel=IDCHANNEL,topartner='partner%s'%(count%3),filename=filename,idroute='unitcommunication')
+            self.files.append(filename)
+
+    def tearDown(self):
+        botslib.changeq(u'''DELETE FROM ta WHERE idta>=%(idta)s''',{'idta':self.rootidta})
+        botslib.changeq(u'''DELETE FROM uniek WHERE domein=%(domein)s''',{'domein':IDCHANNEL})     #unique counter of filename_formatter
+
+    def send(self,sessionsperchannel):
+        session = FakeSession({'idchannel':IDCHANNEL},'unitcommunication',Userscript(sessionsperchannel),'unitcommunication','new',self.rootidta)
+        session.sent = []
+        session.session = 0
+        session.sendfiles('{topartner}.edi','a')
+        return session.sent
+
+    def results(self):
+        return [(row['statust'],row['filename']) for row in botslib.query(u'''SELECT statust,filename FROM ta WHERE idta>%(idta)s AND status=%(status)s ORDER BY idta''',
+                                                                           {'idta':self.rootidta,'status':EXTERNOUT})]
+
+    def testonesession(self):
+        sent = self.send(1)
+        self.assertEqual(sent,[(0,'partner%s.edi'%(count%3),filename) for count,filename in enumerate(self.files) if filename != 'error7'])
+        results = self.results()
+        self.assertEqual(len(results),12)
+        self.assertEqual(results[7],(ERROR,'fake:/partner1.edi'))
+        self.assertEqual([result for result in results if result[0] == DONE],[(DONE,'fake:/partner%s.edi'%(count%3)) for count in range(12) if count != 7])
+
+    def testsessions(self):
+        sent = self.send(5)
+        connects = [entry for entry in sent if entry[0] == 'connect']
+        self.assertEqual(len(connects),4,'4 extra sessions')
+        sent = [entry for entry in sent if entry[0] != 'connect']
+        self.assertEqual(sorted(entry[2] for entry in sent),sorted(filename for filename in self.files if filename != 'error7'))
+        self.assertEqual(len(set(entry[0] for entry in sent)),3,'3 remote files are sent by 3 sessions')
+        for partner in range(3):
+            tofilename = 'partner%s.edi'%partner
+            entries = [entry for entry in sent if entry[1] == tofilename]
+            self.assertEqual(len(set(entry[0] for entry in entries)),1,'same remote file is sent by one session')
+            self.assertEqual([entry[2] for entry in entries],[filename for count,filename in enumerate(self.files) if count%3 == partner and filename != 'error7'],'in order')
+        results = self.results()
+        self.assertEqual(len(results),12)
+        self.assertEqual(len([result for result in results if result[0] == DONE]),11)
+        self.assertEqual([result for result in results if result[0] == ERROR],[(ERROR,'fake:/partner1.edi')])
+
+class TestPayload(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def message(self):
+        message = email.Message.Message()
+        message.add_header('Subject','test')
+        message.add_header('Content-Type','application/edifact',charset='us-ascii')
+        return message
+
+    def oldmime(self,content,encoding):
+        ''' payload as in file2mime before: content in memory, python encoders.'''
+        message = self.message()
+        message.set_payload(content)
+        if encoding == 'never':
+            email.encoders.encode_7or8bit(message)
+        elif encoding == 'base64':
+            email.encoders.encode_base64(message)
+        outfile = StringIO.StringIO()
+        email.Generator.Generator(outfile, mangle_from_=False, maxheaderlen=78).flatten(message,unixfrom=False)
+        return outfile.getvalue()
+
+    def newmime(self,filename,encoding):
+        ''' payload as in file2mime: headers, then payload in chunks.'''
+        message = self.message()
+        if encoding == 'never':
+            message.add_header('Content-Transfer-Encoding','7bit' if communication._comsession.isascii(filename) else '8bit')
+        elif encoding == 'base64':
+            message.add_header('Content-Transfer-Encoding','base64')
+        message.set_payload('')
+        outfile = StringIO.StringIO()
+        email.Generator.Generator(outfile, mangle_from_=False, maxheaderlen=78).flatten(message,unixfrom=False)
+        communication._comsession.writepayload(filename,outfile,encoding == 'base64')
+        return outfile.getvalue()
+
+    def testpayload(self):
+        rnd = random.Random(1234)
+        chunksize = botslib.TRANSFERCHUNKSIZE
+        contents = ['','a','a\n',"UNB+UNOA:1+sender+receiver'\n"*100,'\xe9\x00\xff'*50,
+                    'x'*(57*(chunksize//57)),'x'*(57*(chunksize//57)-1)+'\n','y'*(57*(chunksize//57)+1),     #around the size of the chunks
+                    ''.join(chr(rnd.randint(0,255)) for count in range(2*chunksize+100))]
+        for count,content in enumerate(contents):
+            filename = os.path.join(self.directory,'file%s'%count)
+            datafile = botslib.opendata(filename,'wb')
+            datafile.write(content)
+            datafile.close()
+            for encoding in ['never','ascii','base64']:
+                self.assertEqual(self.newmime(filename,encoding),self.oldmime(content,encoding),(count,encoding))
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    botsinit.connect()
+    unittest.main()
+    botsglobal.db.close()
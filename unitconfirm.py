@@ -220,6 +220,46 @@ class TestMain(unittest.TestCase):
         self.failUnless(True==botslib.checkconfirmrules('send-email-MDN',idroute='otherx1',idchannel='mdn2_i',topartner='partnerunittes',frompartner='partnerunittes',editype='x12',messagetype='messagetype'))
 
 
+class TestConfirmrules(unittest.TestCase):
+    ''' checkconfirmrules with index of confirmrules as made by prepare_confirmrules; no database needed.'''
+    def setUp(self):
+        self.confirmrules = botsglobal.confirmrules
+        botsglobal.confirmrules = {
+            #send for all, except for a partner and a route
+            u'send-x12-997':(set([('all',None)]),set([('frompartner',u'partnerexcluded'),('route',u'routeexcluded')])),
+            #ask only for a messagetype and a channel
+            u'ask-edifact-CONTRL':(set([('messagetype',u'ORDERSD96AUNEAN008'),('channel',u'channelincluded')]),set()),
+            #only negative rules: never confirm
+            u'send-email-MDN':(set(),set([('topartner',u'partnerexcluded')])),
+            }
+
+    def tearDown(self):
+        botsglobal.confirmrules = self.confirmrules
+
+    def testallwithnegativerule(self):
+        self.assertTrue(botslib.checkconfirmrules(u'send-x12-997',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'850004010'))
+        self.assertTrue(botslib.checkconfirmrules(u'send-x12-997'),'all: also without arguments')
+        self.assertFalse(botslib.checkconfirmrules(u'send-x12-997',idroute=u'route',idchannel=u'channel',frompartner=u'partnerexcluded',topartner=u'partner',messagetype=u'850004010'))
+        self.assertFalse(botslib.checkconfirmrules(u'send-x12-997',idroute=u'routeexcluded',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'850004010'))
+        self.assertTrue(botslib.checkconfirmrules(u'send-x12-997',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partnerexcluded',messagetype=u'850004010'),
+                        'negative rule is for frompartner, not topartner')
+
+    def testpositiveruleonly(self):
+        self.assertTrue(botslib.checkconfirmrules(u'ask-edifact-CONTRL',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'ORDERSD96AUNEAN008'))
+        self.assertTrue(botslib.checkconfirmrules(u'ask-edifact-CONTRL',idroute=u'route',idchannel=u'channelincluded',frompartner=u'partner',topartner=u'partner',messagetype=u'INVOICD96AUNEAN008'))
+        self.assertFalse(botslib.checkconfirmrules(u'ask-edifact-CONTRL',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'INVOICD96AUNEAN008'))
+        self.assertFalse(botslib.checkconfirmrules(u'ask-edifact-CONTRL',idroute=u'ORDERSD96AUNEAN008',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'INVOICD96AUNEAN008'),
+                         'value matches only for the field of the rule')
+
+    def testnegativeruleonly(self):
+        self.assertFalse(botslib.checkconfirmrules(u'send-email-MDN',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'850004010'))
+        self.assertFalse(botslib.checkconfirmrules(u'send-email-MDN',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partnerexcluded',messagetype=u'850004010'))
+
+    def testnorules(self):
+        self.assertFalse(botslib.globalcheckconfirmrules(u'ask-x12-997'))
+        self.assertFalse(botslib.checkconfirmrules(u'ask-x12-997',idroute=u'route',idchannel=u'channel',frompartner=u'partner',topartner=u'partner',messagetype=u'850004010'))
+        self.assertTrue(botslib.globalcheckconfirmrules(u'send-x12-997'))
+
 
 if __name__ == '__main__':
     pythoninterpreter = 'python'
@@ -1,10 +1,16 @@
 import unittest
+import time
+try:
+    import cdecimal as decimal
+except ImportError:
+    import decimal
 import bots.node as node
 import bots.botslib as botslib
 import bots.botsinit as botsinit
 import bots.inmessage as inmessage
 import bots.outmessage as outmessage 
 import bots.botsglobal as botsglobal 
+import bots.fieldformat as fieldformat
 from bots.botsconfig import *
 import utilsunit
 
@@ -1007,6 +1013,89 @@ class TestFormatFieldInmessage(unittest.TestCase):
         self.assertRaises(botslib.MessageError,self.edi._formatfield,'',tfield1,testdummy,nodedummy) 
 
 
+class TestFieldformat(unittest.TestCase):
+    ''' fieldformat should give same results as time.strptime and decimal.Decimal.quantize.'''
+    def _strptime(self,value,format):
+        try:
+            time.strptime(value,format)
+        except ValueError:
+            return False
+        return True
+
+    def testcheckdate(self):
+        for value,result in ((u'20120229',True),        #leap day
+                             (u'20130229',False),
+                             (u'20000229',True),        #leap day: divisible by 400
+                             (u'19000229',False),       #no leap day: divisible by 100
+                             (u'20141231',True),
+                             (u'20141301',False),
+                             (u'20140132',False),
+                             (u'120229',True),          #2-digit year: 2012
+                             (u'130229',False),
+                             (u'000229',True),          #2-digit year: 2000
+                             (u'680101',True),          #2-digit year: 2068
+                             (u'690101',True),          #2-digit year: 1969
+                             (u'991231',True),
+                             (u'2014011',False),        #wrong length
+                             (u'201401010',False),
+                             (u'2014ab01',False),
+                             (u'',False),
+                             ):
+            self.assertEqual(fieldformat.checkdate(value),result,value)
+            if len(value) == 8:
+                self.assertEqual(fieldformat.checkdate(value),self._strptime(value,'%Y%m%d'),value)
+            elif len(value) == 6:
+                self.assertEqual(fieldformat.checkdate(value),self._strptime(value,'%y%m%d'),value)
+
+    def testchecktime(self):
+        for value,result,resultnodecimals in ((u'1200',True,True),
+                                              (u'2359',True,True),
+                                              (u'2400',False,False),
+                                              (u'1260',False,False),
+                                              (u'120059',True,True),
+                                              (u'120061',True,True),        #leap second, as strptime
+                                              (u'1200591',True,False),      #decimal seconds
+                                              (u'12005912',True,False),
+                                              (u'120059a',False,False),
+                                              (u'12ab',False,False),
+                                              (u'',False,False),
+                                              ):
+            self.assertEqual(fieldformat.checktime(value),result,value)
+            self.assertEqual(fieldformat.checktime(value,decimalseconds=False),resultnodecimals,value)
+            if len(value) == 4:
+                self.assertEqual(fieldformat.checktime(value),self._strptime(value,'%H%M'),value)
+            elif len(value) == 6:
+                self.assertEqual(fieldformat.checktime(value),self._strptime(value,'%H%M%S'),value)
+
+    def testquantize(self):
+        for value,nrdecimals,result,implicit in ((u'12',2,u'12.00',u'1200'),
+                                                 (u'-12.50',2,u'-12.50',u'-1250'),
+                                                 (u'007.25',2,u'7.25',u'725'),          #leading zeros
+                                                 (u'1.255',2,u'1.26',u'126'),           #rounding: half even
+                                                 (u'1.245',2,u'1.24',u'124'),
+                                                 (u'-1.255',2,u'-1.26',u'-126'),
+                                                 (u'2.5',0,u'2',u'2'),
+                                                 (u'1.5',0,u'2',u'2'),
+                                                 (u'12.3',0,u'12',u'12'),
+                                                 (u'0.5',2,u'0.50',u'50'),
+                                                 (u'-0',2,u'-0.00',u'-0'),
+                                                 (u'.5',2,u'0.50',u'50'),
+                                                 (u'1E3',2,u'1000.00',u'100000'),
+                                                 (u'1' * 27,1,u'1' * 27 + u'.0',u'1' * 27 + u'0'),          #28 digits
+                                                 (u'1' * 27 + u'.5',0,u'1' * 26 + u'2',u'1' * 26 + u'2'),
+                                                 ):
+            self.assertEqual(fieldformat.quantize(value,nrdecimals),result,value)
+            self.assertEqual(fieldformat.quantize(value,nrdecimals),unicode(decimal.Decimal(value).quantize(decimal.Decimal(10) ** -nrdecimals)),value)
+            self.assertEqual(fieldformat.implicitdecimals(value,nrdecimals),implicit,value)
+            self.assertEqual(fieldformat.implicitdecimals(value,nrdecimals),unicode((decimal.Decimal(value) * 10**nrdecimals).quantize(decimal.Decimal(1))),value)
+        #more than 28 digits: too many digits for decimal, as before
+        self.assertRaises(decimal.InvalidOperation,fieldformat.quantize,u'1' * 29,0)
+        self.assertRaises(decimal.InvalidOperation,fieldformat.quantize,u'1' * 27,2)
+        self.assertRaises(decimal.InvalidOperation,fieldformat.implicitdecimals,u'1' * 27,2)
+        self.assertRaises(decimal.InvalidOperation,fieldformat.quantize,u'1.2.3',2)
+        self.assertRaises(decimal.InvalidOperation,fieldformat.implicitdecimals,u'abc',2)
+
+
 if __name__ == '__main__':
     botsinit.generalinit('config')
     botsglobal.logger = botsinit.initenginelogging('engine')
@@ -2,6 +2,7 @@ import os
 import unittest
 import shutil
 import filecmp 
+import StringIO
 try:
     import json as simplejson
 except ImportError:
@@ -22,6 +23,7 @@ import bots.botsinit as botsinit
 import bots.botsglobal as botsglobal
 import bots.inmessage as inmessage
 import bots.outmessage as outmessage
+import bots.node as node
 
 ''' 
 pluging unitinisout.zip
@@ -499,6 +501,28 @@ class InmessageJson(unittest.TestCase):
 
 
 
+class OutmessageJson(unittest.TestCase):
+    ''' json is written while walking the node tree; output should be the same as simplejson.dump of the python object.'''
+    def _compare(self,root,indented):
+        out = outmessage.outmessage_init(editype='jsonnocheck',messagetype='jsonnocheck',filename='dummy',indented=indented)
+        out._outstream = StringIO.StringIO()
+        out.nrmessagewritten = 0
+        out._write(root)
+        expect = StringIO.StringIO()
+        simplejson.dump({root.record['BOTSID']:out._node2json(root)}, expect, skipkeys=False, ensure_ascii=False, check_circular=False, indent=2 if indented else None)
+        self.assertEqual(out._outstream.getvalue(),expect.getvalue())
+
+    def testlistvalues(self):
+        root = node.Node(record={'BOTSID':'root','field':'1','rep':['a','b',''],'comp':[{'c1':'x','c2':'y'},{'c1':'z'}]})
+        for nr in range(2):
+            line = node.Node(record={'BOTSID':'line','nr':unicode(nr),'rep':['c','d'],'empty':[]})
+            line.append(node.Node(record={'BOTSID':'sub','rep':[['e','f'],[]],'comp':{'c1':'x','c2':['y','z']}}))
+            root.append(line)
+        root.append(node.Node(record={'BOTSID':'tail'}))
+        for indented in (True,False):
+            self._compare(root,indented)
+
+
 class TestInmessage(unittest.TestCase):
     def testEdifact0401(self):
         ''' 0401	Errors in records'''
@@ -0,0 +1,118 @@
+import unittest
+import logging
+import random
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.jobqueueserver as jobqueueserver
+
+''' jobqueue of the jobqueue server (heap with dict of tasks):
+    adding jobs, duplicates, change of priority, order of getting jobs (compared with the jobqueue as it was, see OldJobqueue),
+    conflicts of jobs (conflictkey) with more workers, getstatus.
+    no jobqueue server is started; not an acceptance test.
+'''
+PRIORITY = jobqueueserver.PRIORITY
+TASK = jobqueueserver.TASK
+
+class OldJobqueue(object):
+    ''' jobqueue as it was: sorted list.'''
+    def __init__(self):
+        self.jobqueue = []
+        self.jobcounter = 0
+
+    def addjob(self,task,priority):
+        for job in self.jobqueue:
+            if job[TASK] == task:
+                if job[PRIORITY] != priority:
+                    job[PRIORITY] = priority
+                    self.jobqueue.sort(reverse=True)
+                    return 0
+                else:
+                    return 4
+        self.jobcounter += 1
+        self.jobqueue.append([priority, self.jobcounter,task])
+        self.jobqueue.sort(reverse=True)
+        return 0
+
+    def getjob(self):
+        if len(self.jobqueue):
+            return self.jobqueue.pop()
+        return 0
+
+class TestJobqueue(unittest.TestCase):
+    def setUp(self):
+        logger = logging.getLogger('unitjobqueue')
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+        self.jobqueue = jobqueueserver.Jobqueue(logger)
+
+    def getall(self,jobqueue):
+        jobs = []
+        while True:
+            job = jobqueue.getjob()
+            if not job:
+                return jobs
+            jobs.append(job)
+
+    def testaddjob(self):
+        task = ['python','bots-engine.py','--new']
+        self.assertEqual(self.jobqueue.addjob(task,5),0)
+        self.assertEqual(self.jobqueue.addjob(list(task),5),4,'duplicate job is not added')
+        self.assertEqual(self.jobqueue.addjob(task,2),0,'duplicate job with other priority: priority is changed')
+        self.assertEqual(len(self.jobqueue.tasks),1,'only one live job after change of priority')
+        self.assertEqual(self.jobqueue.getstatus()['queued'],1)
+        self.assertEqual(self.getall(self.jobqueue),[[2,1,task]],'job is got once, with new priority')
+        self.assertEqual(self.jobqueue.getjob(),0)
+        self.assertEqual(self.jobqueue.addjob(task,2),0,'job is not in queue anymore: added again')
+        self.assertEqual(self.jobqueue.clearjobq(),0)
+        self.assertEqual(self.jobqueue.getjob(),0)
+
+    def testorder(self):
+        ''' same order of jobs as the jobqueue as it was.'''
+        rnd = random.Random(1234)
+        oldjobqueue = OldJobqueue()
+        for count in range(20):
+            for count2 in range(rnd.randint(1,30)):
+                task = ['python','script%s.py'%rnd.randint(1,15)]
+                priority = rnd.randint(1,5)
+                self.assertEqual(self.jobqueue.addjob(task,priority),oldjobqueue.addjob(list(task),priority))
+            for count2 in range(rnd.randint(0,10)):
+                self.assertEqual(self.jobqueue.getjob(),oldjobqueue.getjob())
+        self.assertEqual(self.getall(self.jobqueue),self.getall(oldjobqueue))
+
+    def testconflictkey(self):
+        self.assertEqual(jobqueueserver.conflictkey(['python','bots-engine.py','--new']),('bots-engine','config'))
+        self.assertEqual(jobqueueserver.conflictkey(['python','bots-engine.py','-cconfig']),('bots-engine','config'))
+        self.assertEqual(jobqueueserver.conflictkey(['python','/usr/bin/bots-engine.py','-cconfig2','route1']),('bots-engine','config2'))
+        self.assertEqual(jobqueueserver.conflictkey(['python','script.py','-cconfig2']),('python','script.py','-cconfig2'))
+
+    def testworkers(self):
+        engine = ['python','bots-engine.py','--new']
+        engine2 = ['python','bots-engine.py','route1']
+        engine3 = ['python','bots-engine.py','-cconfig3']
+        script = ['python','script.py']
+        for priority,task in [(5,engine),(5,engine2),(6,engine3),(7,script)]:
+            self.jobqueue.addjob(task,priority)
+        job1 = self.jobqueue._nextjob(maxworkers=3)
+        self.assertEqual(job1[TASK],engine)
+        job2 = self.jobqueue._nextjob(maxworkers=3)
+        self.assertEqual(job2[TASK],engine3,'engine2 conflicts with running engine (same config)')
+        job3 = self.jobqueue._nextjob(maxworkers=3)
+        self.assertEqual(job3[TASK],script)
+        self.assertEqual(self.jobqueue._nextjob(maxworkers=4),None,'engine2 still conflicts')
+        status = self.jobqueue.getstatus()
+        self.assertEqual((status['queued'],status['running'],status['finished']),(1,3,0))
+        self.jobqueue._jobfinished(job3,2.0)
+        self.assertEqual(self.jobqueue._nextjob(maxworkers=4),None)
+        self.jobqueue._jobfinished(job1,4.0)
+        self.assertEqual(self.jobqueue._nextjob(maxworkers=1),None,'maxworkers reached')
+        job4 = self.jobqueue._nextjob(maxworkers=2)
+        self.assertEqual(job4[TASK],engine2)
+        status = self.jobqueue.getstatus()
+        self.assertEqual((status['queued'],status['running'],status['finished']),(0,2,2))
+        self.assertEqual((status['averageruntime'],status['maxruntime']),(3.0,4.0))
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.inmessage as inmessage
+
+''' the fast lexer for records of variable length (_lexfast) should give the same lex_records (incl line and position)
+    as the lexer that does char-by-char (_lexcharbychar).
+    no plugin needed; not an acceptance test.
+'''
+
+EDIFACT = {'record_sep':u"'",'field_sep':u'+','record_tag_sep':u'','sfield_sep':u':','reserve':u'*','escape':u'?','skip_char':u'\r\n','quote_char':u''}
+X12 = {'record_sep':u'~','field_sep':u'*','record_tag_sep':u'','sfield_sep':u'>','reserve':u'^','escape':u'','skip_char':u'\r\n','quote_char':u''}
+CSV = {'record_sep':u'\r\n','field_sep':u',','record_tag_sep':u'','sfield_sep':u'','reserve':u'','escape':u'','skip_char':u'','quote_char':u'"'}
+TAB = {'record_sep':u'\r\n','field_sep':u'\t','record_tag_sep':u'','sfield_sep':u'','reserve':u'','escape':u'','skip_char':u'','quote_char':u''}
+
+class TestLexer(unittest.TestCase):
+    def _lex(self,editype,separators,rawinput,lexer,**ta_info):
+        ''' lex rawinput with lexer (name of method); returns the lex_records.
+            _lex builds self.lex_records; _lexfast and _lexcharbychar are generators.
+        '''
+        ta_info.update(separators)
+        edi = getattr(inmessage,editype)(ta_info)
+        edi.rawinput = rawinput
+        if lexer == '_lex':
+            edi._lex()
+            return edi.lex_records
+        return list(getattr(edi,lexer)())
+
+    def _compare(self,editype,separators,rawinput,**ta_info):
+        ''' both lexers give the same lex_records; returns the lex_records.'''
+        lex_records = self._lex(editype,separators,rawinput,'_lexcharbychar',**ta_info)
+        self.assertEqual(self._lex(editype,separators,rawinput,'_lexfast',**ta_info),lex_records,repr(rawinput))
+        return lex_records
+
+    def testedifact(self):
+        lex_records = self._compare('edifact',EDIFACT,u"UNB+UNOA:2+sender+receiver'\r\nUNH+1+ORDERS:D:96A:UN'\r\n  BGM+220+12345'\r\n")
+        self.assertEqual(len(lex_records),3)
+        self.assertEqual([field[inmessage.VALUE] for field in lex_records[2]],[u'BGM',u'220',u'12345'])
+        self.assertEqual((lex_records[2][1][inmessage.LIN],lex_records[2][1][inmessage.POS]),(3,7),'line and position of token')
+        self._compare('edifact',EDIFACT,u"UNH+1+ORDERS:D:96A:UN'BGM+220'")                           #no new-lines
+        self._compare('edifact',EDIFACT,u"UNH+1+ORDERS:D:96A:UN'\nBGM+2\n20+123\n45'\n")            #wrapped lines: new-line is skip_char
+        self._compare('edifact',EDIFACT,u"LIN+1++1234:EN*5678:EN'QTY+21:12'")                       #repeat separator
+
+    def testrelease(self):
+        lex_records = self._compare('edifact',EDIFACT,u"FTX+AAI+++text?+with?:release?'s and ??'")
+        self.assertEqual(lex_records[0][-1][inmessage.VALUE],u"text+with:release's and ?")
+        self._compare('edifact',EDIFACT,u"FTX+AAI+++?+'FTX+AAI+++a??'")                             #escape as first char of token, escaped escape at end
+        self._compare('edifact',EDIFACT,u"FTX+AAI+++a?\r\nb'")                                       #escape before skip_char
+        self._compare('edifact',EDIFACT,u"FTX+AAI+++?a?b?c'")                                        #escape before normal chars
+
+    def testx12(self):
+        self._compare('x12',X12,u'ISA*00*          *00*          *01*sender         *01*receiver       *140101*1200*^*00403*000000001*1*P*>~\r\nGS*PO*sender*receiver*20140101*1200*1*X*004010~\r\nREF*ZZ*a^b^c*x>y~')
+
+    def testquotecharfallback(self):
+        rawinput = u'1,"quoted, with separator",3\r\n4,"with ""quote""",6\r\n'
+        lex_records = self._lex('csv',CSV,rawinput,'_lex',skip_firstline=False,noBOTSID=False)
+        self.assertEqual(lex_records,self._lex('csv',CSV,rawinput,'_lexcharbychar'),'quote_char in file: char-by-char lexer is used')
+        self.assertEqual(lex_records[0][1][inmessage.VALUE],u'quoted, with separator')
+        self._compare('csv',CSV,u'1,2,3\r\n4,5,6\r\n')                                                #quote_char not in file: same results
+        self._compare('csv',TAB,u'\t2\t3\r\n\t5\t6\r\n')                                              #tab-delimited, first field empty
+
+    def testtrailingterminator(self):
+        self._compare('edifact',EDIFACT,u"UNH+1'BGM+220'\r\n\x1a")                                  #end-of-file char after last record
+        lex_records = self._compare('edifact',EDIFACT,u"UNH+1'BGM+220",allow_lastrecordnotclosedproperly=True)
+        self.assertEqual(len(lex_records),2,'last record is not closed properly, but is used')
+        for lexer in ('_lexcharbychar','_lexfast'):
+            self.assertRaises(botslib.InMessageError,self._lex,'edifact',EDIFACT,u"UNH+1'BGM+220",lexer)
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    unittest.main()
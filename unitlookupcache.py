@@ -0,0 +1,113 @@
+import unittest
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.transform as transform
+
+''' cache for lookups in ccode/partner (botslib.lookupcache): LRU size limit, newrun (scope 'run' and 'process'), preload_ccode.
+    uses the database of bots (adds code table 'unitlookupcache' and deletes it afterwards).
+    no plugin needed; not an acceptance test.
+'''
+CCODEID = 'unitlookupcache'
+
+def setcode(leftcode,rightcode):
+    botslib.changeq(u'''DELETE FROM ccode WHERE ccodeid_id=%(ccodeid)s AND leftcode=%(leftcode)s''',{'ccodeid':CCODEID,'leftcode':leftcode})
+    botslib.changeq(u'''INSERT INTO ccode (ccodeid_id,leftcode,rightcode,attr1,attr2,attr3,attr4,attr5,attr6,attr7,attr8)
+                        VALUES (%(ccodeid)s,%(leftcode)s,%(rightcode)s,'','','','','','','','')''',
+                        {'ccodeid':CCODEID,'leftcode':leftcode,'rightcode':rightcode})
+
+class TestLookupCache(unittest.TestCase):
+    def setUp(self):
+        self.settings = dict((option,botsglobal.ini.get('settings',option,None)) for option in ('lookupcachesize','lookupcachescope'))
+        self.changecounter = botslib.lookupcache.getchangecounter()
+        botslib.changeq(u'''INSERT INTO ccodetrigger (ccodeid,ccodeid_desc) VALUES (%(ccodeid)s,'')''',{'ccodeid':CCODEID})
+        for leftcode,rightcode in [('A','1'),('B','2'),('C','3'),('D','4')]:
+            setcode(leftcode,rightcode)
+        self.cache = botslib.lookupcache
+
+    def tearDown(self):
+        for option,value in self.settings.iteritems():
+            if value is None:
+                botsglobal.ini.remove_option('settings',option)
+            else:
+                botsglobal.ini.set('settings',option,value)
+        if self.changecounter:
+            botslib.changeq(u'''UPDATE uniek SET nummer=%(nummer)s WHERE domein='bots_lookupchanges' ''',{'nummer':self.changecounter})
+        else:
+            botslib.changeq(u'''DELETE FROM uniek WHERE domein='bots_lookupchanges' ''')
+        botslib.changeq(u'''DELETE FROM ccode WHERE ccodeid_id=%(ccodeid)s''',{'ccodeid':CCODEID})
+        botslib.changeq(u'''DELETE FROM ccodetrigger WHERE ccodeid=%(ccodeid)s''',{'ccodeid':CCODEID})
+        self.cache.newrun()
+
+    def newrun(self,size,scope='run'):
+        botsglobal.ini.set('settings','lookupcachesize',str(size))
+        botsglobal.ini.set('settings','lookupcachescope',scope)
+        self.cache.newrun()
+
+    def testsizelimit(self):
+        self.newrun(2)
+        self.assertEqual((self.cache.hits,self.cache.misses),(0,0))
+        for leftcode,rightcode,hits,misses in [('A','1',0,1),
+                                               ('B','2',0,2),
+                                               ('A','1',1,2),
+                                               ('C','3',1,3),      #B is least recently used: dropped
+                                               ('A','1',2,3),
+                                               ('B','2',2,4),      #C dropped
+                                               ('C','3',2,5),
+                                              ]:
+            self.assertEqual(transform.ccode(CCODEID,leftcode),rightcode)
+            self.assertEqual((self.cache.hits,self.cache.misses),(hits,misses),leftcode)
+            self.assertTrue(len(self.cache.entries) <= 2)
+        #code not in table: also cached
+        self.newrun(2)
+        self.assertEqual(transform.ccode(CCODEID,'X',safe=True),'X')
+        self.assertRaises(botslib.CodeConversionError,transform.ccode,CCODEID,'X')
+        self.assertEqual((self.cache.hits,self.cache.misses),(1,1))
+        #size 0: no cache
+        self.newrun(0)
+        for leftcode in ['A','A','B']:
+            transform.ccode(CCODEID,leftcode)
+        self.assertEqual((len(self.cache.entries),self.cache.hits,self.cache.misses),(0,0,0))
+
+    def testnewrun(self):
+        self.newrun(10)
+        self.assertEqual(transform.ccode(CCODEID,'A'),'1')
+        setcode('A','11')
+        self.assertEqual(transform.ccode(CCODEID,'A'),'1','cached in run')
+        self.newrun(10)
+        self.assertEqual((len(self.cache.entries),self.cache.hits,self.cache.misses),(0,0,0))
+        self.assertEqual(transform.ccode(CCODEID,'A'),'11','scope run: cache emptied in new run')
+        #scope process
+        self.newrun(10,'process')
+        self.assertEqual(transform.ccode(CCODEID,'A'),'11')
+        setcode('A','12')
+        self.newrun(10,'process')
+        self.assertEqual((self.cache.hits,self.cache.misses),(0,0),'counters are per run')
+        self.assertEqual(transform.ccode(CCODEID,'A'),'11','scope process: cache kept in new run')
+        #change via django is counted in uniek (models.py)
+        if not botslib.changeq(u'''UPDATE uniek SET nummer=nummer+1 WHERE domein='bots_lookupchanges' '''):
+            botslib.changeq(u'''INSERT INTO uniek (domein,nummer) VALUES ('bots_lookupchanges',1)''')
+        self.newrun(10,'process')
+        self.assertEqual(transform.ccode(CCODEID,'A'),'12','scope process: cache emptied after change via django')
+
+    def testpreload(self):
+        self.newrun(10)
+        transform.preload_ccode(CCODEID)
+        setcode('A','11')
+        self.assertEqual(transform.ccode(CCODEID,'A'),'1','preloaded')
+        self.assertEqual(transform.reverse_ccode(CCODEID,'2'),'B')
+        self.assertEqual(transform.getcodeset(CCODEID,'C'),['3'])
+        self.assertEqual(transform.ccode(CCODEID,'D',field='attr1'),'')
+        self.assertEqual(transform.ccode(CCODEID,'X',safe=True),'X')
+        self.assertRaises(botslib.CodeConversionError,transform.reverse_ccode,CCODEID,'X')
+        self.assertEqual(self.cache.misses,0,'no lookups in database')
+        self.newrun(10)
+        self.assertEqual(transform.ccode(CCODEID,'A'),'11','preloaded codes are emptied in new run')
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    botsinit.connect()
+    unittest.main()
+    botsglobal.db.close()
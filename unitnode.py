@@ -154,6 +154,30 @@ class Testnode(unittest.TestCase):
         self.assertEqual(comparequeries,collectqueries)
         #~ inn.root.displayqueries()
 
+    def testindexchildren(self):
+        #searching via index of children should give same results as searching all children
+        def buildandsearch(indexthreshold):
+            node.Node.indexthreshold = indexthreshold
+            root = node.Node({'BOTSID':'UNH'})
+            for i in range(20):
+                root.putloop({'BOTSID':'UNH'},{'BOTSID':'LIN'}).put({'BOTSID':'LIN','1082':str(i)},{'BOTSID':'QTY','6063':'21','6060':str(i)})
+                root.put({'BOTSID':'UNH'},{'BOTSID':'DTM','BOTSIDnr':str(i%2+1),'2005':str(i)})
+            root.put({'BOTSID':'UNH'},{'BOTSID':'BGM','1004':'ORDERNR'})
+            root.delete({'BOTSID':'UNH'},{'BOTSID':'LIN','1082':'3'})
+            root.change(where=({'BOTSID':'UNH'},{'BOTSID':'LIN','1082':'4'}),change={'1082':'44'})
+            root.children.remove(root.children[0])     #change children outside node.py
+            root.putloop({'BOTSID':'UNH'},{'BOTSID':'LIN','1082':'99'})
+            return (root.get({'BOTSID':'UNH'},{'BOTSID':'BGM','1004':None}),
+                    root.get({'BOTSID':'UNH'},{'BOTSID':'LIN','1082':'5'},{'BOTSID':'QTY','6060':None}),
+                    [lin.get({'BOTSID':'LIN','1082':None}) for lin in root.getloop({'BOTSID':'UNH'},{'BOTSID':'LIN'})],
+                    [dtm.get({'BOTSID':'DTM','2005':None}) for dtm in root.getloop({'BOTSID':'UNH'},{'BOTSID':'DTM','BOTSIDnr':'2'})],
+                    root.getcount())
+        remember = node.Node.indexthreshold
+        try:
+            self.assertEqual(buildandsearch(1000),buildandsearch(1))
+        finally:
+            node.Node.indexthreshold = remember
+
 
 if __name__ == '__main__':
     import datetime
@@ -0,0 +1,153 @@
+import unittest
+import copy
+import random
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.outmessage as outmessage
+from bots.botsconfig import *
+
+''' writing of lex_records (outmessage.record2string) uses escape/quote translation tables;
+    results should be the same as writing char by char (as record2string did before, see oldrecord2string).
+    no plugin needed; not an acceptance test.
+'''
+
+EDIFACT = {'record_sep':u"'",'field_sep':u'+','record_tag_sep':u'','sfield_sep':u':','reserve':u'*','escape':u'?','quote_char':u'','version':'3'}
+TRADACOMS = {'record_sep':u"'",'field_sep':u'+','record_tag_sep':u'=','sfield_sep':u':','reserve':u'','escape':u'?','quote_char':u'','version':''}
+X12 = {'record_sep':u'~','field_sep':u'*','record_tag_sep':u'','sfield_sep':u'>','reserve':u'^','escape':u'','quote_char':u'','version':'00403'}
+CSV = {'record_sep':u'\r\n','field_sep':u',','record_tag_sep':u'','sfield_sep':u'','reserve':u'','escape':u'','quote_char':u'"','version':''}
+
+def oldrecord2string(self,lex_records):
+    ''' record2string as it was: char by char. '''
+    sfield_sep = self.ta_info['sfield_sep']
+    if self.ta_info['record_tag_sep']:
+        record_tag_sep = self.ta_info['record_tag_sep']
+    else:
+        record_tag_sep = self.ta_info['field_sep']
+    field_sep = self.ta_info['field_sep']
+    quote_char = self.ta_info['quote_char']
+    escape = self.ta_info['escape']
+    record_sep = self.ta_info['record_sep'] + self.ta_info['add_crlfafterrecord_sep']
+    forcequote = self.ta_info['forcequote']
+    escapechars = self._getescapechars()
+    noBOTSID = self.ta_info.get('noBOTSID',False)
+    rep_sep     = self.ta_info['reserve']
+
+    lijst = []
+    for lex_record in lex_records:
+        if noBOTSID:  #for csv/fixed: do not write BOTSID so remove it
+            del lex_record[0]
+        fieldcount = 0
+        mode_quote = False
+        value = u''     #to collect the formatted record-string.
+        for field in lex_record:        #loop all fields in lex_record
+            if not field[SFIELD]:   #is a field:
+                if fieldcount == 0:  #do nothing because first field in lex_record is not preceded by a separator
+                    fieldcount = 1
+                elif fieldcount == 1:
+                    value += record_tag_sep
+                    fieldcount = 2
+                else:
+                    value += field_sep
+            elif field[SFIELD] == 1:   #is a subfield:
+                value += sfield_sep
+            else:                   #repeat
+                value += rep_sep
+            if quote_char:      #quote char only used for csv
+                start_to__quote = False
+                if forcequote == 2:
+                    if field[FORMATFROMGRAMMAR] in ['AN','A','AR']:
+                        start_to__quote = True
+                elif forcequote:    #always quote; this catches values 1, '1', '0'
+                    start_to__quote = True
+                else:
+                    if field_sep in field[VALUE] or quote_char in field[VALUE] or record_sep in field[VALUE]:
+                        start_to__quote = True
+                if start_to__quote:
+                    value += quote_char
+                    mode_quote = True
+            for char in field[VALUE]:   #use escape (edifact, tradacom). For x12 is warned if content contains separator
+                if char in escapechars:
+                    if isinstance(self,outmessage.x12):
+                        if self.ta_info['replacechar']:
+                            char = self.ta_info['replacechar']
+                        else:
+                            raise botslib.OutMessageError(u'[F51]: Character "%(char)s" is used as separator in this x12 file, so it can not be used in content. Field: "%(content)s".',
+                                                            {'char':char,'content':field[VALUE]})
+                    else:
+                        value +=escape
+                elif mode_quote and char == quote_char:
+                    value += quote_char
+                value += char
+            if mode_quote:
+                value += quote_char
+                mode_quote = False
+        value += record_sep
+        lijst.append(value)
+    return ''.join(lijst)
+
+def field(value,sfield=0,format='AN'):
+    return {VALUE:value,SFIELD:sfield,FORMATFROMGRAMMAR:format}
+
+class TestRecord2string(unittest.TestCase):
+    def _write(self,editype,separators,lex_records,**ta_info):
+        ''' write lex_records with record2string and with oldrecord2string; both should give the same result (or both an error).'''
+        info = {'add_crlfafterrecord_sep':u'','forcequote':0,'replacechar':u'','noBOTSID':False}
+        info.update(separators)
+        info.update(ta_info)
+        out = getattr(outmessage,editype)(info)
+        try:
+            expect = oldrecord2string(out,copy.deepcopy(lex_records))
+        except botslib.OutMessageError:
+            self.assertRaises(botslib.OutMessageError,out.record2string,copy.deepcopy(lex_records))
+            return None
+        result = out.record2string(copy.deepcopy(lex_records))
+        self.assertEqual(result,expect,repr(lex_records))
+        return result
+
+    def testedifact(self):
+        lex_records = [[field(u'FTX'),field(u'AAI'),field(u''),field(u"a+b:c'd?e*f"),field(u'x?',1),field(u'rep*',2)]]
+        self.assertEqual(self._write('edifact',EDIFACT,lex_records),u"FTX+AAI++a?+b?:c?'d??e*f:x??*rep*'")
+        self.assertEqual(self._write('edifact',EDIFACT,lex_records,version='4'),u"FTX+AAI++a?+b?:c?'d??e?*f:x??*rep?*'")
+        self._write('edifact',EDIFACT,lex_records,add_crlfafterrecord_sep=u'\r\n')
+        self._write('tradacoms',TRADACOMS,[[field(u'MHD'),field(u'1'),field(u'ORDHDR=a'),field(u"b'c?",1)]])
+
+    def testx12(self):
+        lex_records = [[field(u'REF'),field(u'ZZ'),field(u'a~b*c>d^e'),field(u'x',1),field(u'y',2)]]
+        self.assertEqual(self._write('x12',X12,lex_records,replacechar=u'-'),u'REF*ZZ*a-b-c-d-e>x^y~')
+        self.assertEqual(self._write('x12',X12,lex_records,replacechar=u'-',version='00401'),u'REF*ZZ*a-b-c-d^e>x^y~')
+        self.assertEqual(self._write('x12',X12,lex_records),None,'separator in content: error')
+        self.assertEqual(self._write('x12',X12,[[field(u'REF'),field(u'ZZ'),field(u'a^b')]],version='00401'),u'REF*ZZ*a^b~')
+
+    def testcsv(self):
+        lex_records = [[field(u'BOTSID'),field(u'1',format='N'),field(u'a,b'),field(u'say "hi"'),field(u'x\r\ny'),field(u'plain')]]
+        for forcequote in (0,1,2):
+            self._write('csv',CSV,lex_records,forcequote=forcequote)
+            self._write('csv',CSV,lex_records,forcequote=forcequote,noBOTSID=True)
+        self.assertEqual(self._write('csv',CSV,lex_records,noBOTSID=True),u'1,"a,b","say ""hi""","x\r\ny",plain\r\n')
+        self._write('csv',dict(CSV,escape=u'\\'),[[field(u'a\\b'),field(u'"c\\"')]])   #escape and quote
+
+    def testrandom(self):
+        ''' random content with separators, escape and quote chars.'''
+        rnd = random.Random(1234)
+        chars = u"ab1 +:'?*~>^,\"\r\n\\="
+        for editype,separators,ta_infos in [('edifact',EDIFACT,[{},{'version':'4'}]),
+                                            ('tradacoms',TRADACOMS,[{}]),
+                                            ('x12',X12,[{},{'replacechar':u'_'},{'replacechar':u'_','version':'00401'}]),
+                                            ('csv',CSV,[{'forcequote':0},{'forcequote':1},{'forcequote':2},{'escape':u'\\'}]),
+                                           ]:
+            for ta_info in ta_infos:
+                for count in range(200):
+                    lex_records = []
+                    for record in range(rnd.randint(1,3)):
+                        lex_record = [field(u'REC')]
+                        for count in range(rnd.randint(0,6)):
+                            lex_record.append(field(u''.join(rnd.choice(chars) for i in range(rnd.randint(0,6))),rnd.choice([0,0,1,2]),rnd.choice(['AN','N','R'])))
+                        lex_records.append(lex_record)
+                    self._write(editype,separators,lex_records,**ta_info)
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import multiprocessing
+import itertools
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.router as router
+
+''' independent groups of routes run in worker processes (bots.ini: routeworkers):
+    - grouping of routes (union-find) on channel, directory/host of channel, translation and routescript.
+    - lookup counters of workers are added.
+    routes and channels are not read from the database (query is replaced); the pool is replaced by a pool that runs in this process.
+    no plugin needed; not an acceptance test.
+'''
+CHANNELS = [{'idchannel':'in1','type':'file','host':'','path':'botssys/infile/a'},
+            {'idchannel':'out1','type':'file','host':'','path':'botssys/outfile/a/'},
+            {'idchannel':'in2','type':'file','host':'','path':'botssys/outfile/a'},       #same directory as out1
+            {'idchannel':'ftpout','type':'ftp','host':'FTP.example.com','path':'/out'},
+            {'idchannel':'sftpin','type':'sftp','host':'ftp.example.com','path':'/out/'},   #same host/path as ftpout
+            {'idchannel':'ftpother','type':'ftp','host':'ftp.example.com','path':'/other'},
+            {'idchannel':'trash','type':'trash','host':'','path':''},
+            {'idchannel':'trash2','type':'trash','host':'','path':''},
+            ]
+
+def route(idroute,fromchannel,tochannel,fromeditype='edifact',frommessagetype='edifact',translateind=1):
+    return {'idroute':idroute,'fromchannel':fromchannel,'tochannel':tochannel,'fromeditype':fromeditype,'frommessagetype':frommessagetype,'translateind':translateind}
+
+class InProcessPool(object):
+    ''' as multiprocessing.Pool, but tasks are done in this process.'''
+    def __init__(self,*args,**kwargs):
+        pass
+    def imap(self,func,tasks):
+        return itertools.imap(func,tasks)
+    def close(self):
+        pass
+    def join(self):
+        pass
+
+class TestRouteGroups(unittest.TestCase):
+    def setUp(self):
+        self.query = botslib.query
+        self.botsimport = botslib.botsimport
+        self.runroutegroup = router._runroutegroup
+        self.pool = multiprocessing.Pool
+        self.translateworkers = botsglobal.ini.get('settings','translateworkers',None)
+        self.currentrun = botsglobal.currentrun
+        self.routes = []
+        self.routescripts = {}
+        botslib.query = self.fakequery
+        botslib.botsimport = self.fakebotsimport
+
+    def tearDown(self):
+        botslib.query = self.query
+        botslib.botsimport = self.botsimport
+        router._runroutegroup = self.runroutegroup
+        multiprocessing.Pool = self.pool
+        if self.translateworkers is None:
+            botsglobal.ini.remove_option('settings','translateworkers')
+        else:
+            botsglobal.ini.set('settings','translateworkers',self.translateworkers)
+        botsglobal.currentrun = self.currentrun
+
+    def fakequery(self,querystring,*args):
+        if 'FROM channel' in querystring:
+            return iter(CHANNELS)
+        return iter(self.routes)
+
+    def fakebotsimport(self,*args):
+        if args[1] in self.routescripts:
+            return self.routescripts[args[1]],args[1]
+        raise botslib.BotsImportError(u'No import of module "%(module)s".',{'module':args[1]})
+
+    def getroutegroups(self,routestorun):
+        run = router.new.__new__(router.new)
+        run.command = 'new'
+        run.routestorun = routestorun
+        return run.get_routegroups()
+
+    def testgroupsofroutes(self):
+        self.assertEqual(router._groupsofroutes(['a','b','c'],[]),[['a'],['b'],['c']])
+        self.assertEqual(router._groupsofroutes(['a','b','c','d'],[('c','x'),('a','y'),('d','x')]),[['a'],['b'],['c','d']])
+        self.assertEqual(router._groupsofroutes(['a','b','c','d'],[('d','x'),('b','y'),('a','x'),('d','y')]),[['a','b','d'],['c']],'transitive')
+        self.assertEqual(router._groupsofroutes(['a','b'],[('a','x'),('other','x'),('other','y'),('b','y')]),[['a','b']],'via route not in run')
+
+    def testchannelendpoint(self):
+        self.assertEqual(router._channelendpoint('file','','botssys/outfile/a/'),router._channelendpoint('mimefile','','botssys/outfile/a'))
+        self.assertEqual(router._channelendpoint('ftp','FTP.example.com','/out'),router._channelendpoint('sftp','ftp.example.com','/out/'))
+        self.assertNotEqual(router._channelendpoint('ftp','ftp.example.com','/out'),router._channelendpoint('ftp','ftp.example.com','/other'))
+        self.assertEqual(router._channelendpoint('trash','',''),None)
+        self.assertEqual(router._channelendpoint('file','',''),None)
+        self.assertEqual(router._channelendpoint('smtp','',''),None)
+
+    def testgetroutegroups(self):
+        self.routes = [route('r1','in1','out1',frommessagetype='ORDERS'),
+                       route('r2','in2','trash',frommessagetype='INVOIC'),          #reads directory out1 writes to
+                       route('r3','trash2','ftpout',frommessagetype='DESADV'),
+                       route('r4','sftpin','trash2',frommessagetype='APERAK'),      #same channel trash2 as r3
+                       route('r5',None,'ftpother',frommessagetype='CONTRL'),
+                       route('r6',None,None,frommessagetype='ORDERS'),               #same translation as r1
+                       route('r7',None,None,frommessagetype='ORDERS',translateind=0),
+                       route('r8',None,None,frommessagetype='IFTMIN'),
+                       route('r9',None,None,frommessagetype='REMADV'),
+                       ]
+        routestorun = ['r%s'%count for count in range(1,10)]
+        self.assertEqual(self.getroutegroups(routestorun),[['r1','r2','r6'],['r3','r4'],['r5'],['r7'],['r8'],['r9']])
+        self.routescripts = {'r8':object(),'r9':object()}
+        self.assertEqual(self.getroutegroups(routestorun)[-1],['r8','r9'],'routes with routescript are dependent')
+        independent = type('routescript',(object,),{'routeindependent':True})
+        self.routescripts = {'r8':object(),'r9':independent}
+        self.assertEqual(self.getroutegroups(routestorun)[-2:],[['r8'],['r9']],'routescript with routeindependent')
+        self.assertEqual(self.getroutegroups(['r4','r3']),[['r4','r3']],'in order of routestorun')
+
+    def testworkercounters(self):
+        def runroutegroup(routes):
+            if 'error' in routes:
+                raise Exception('error in route')
+            botslib.lookupcache.hits += 2 * len(routes)
+            botslib.lookupcache.misses += len(routes)
+        router._runroutegroup = runroutegroup
+        multiprocessing.Pool = InProcessPool
+        processlist = botslib._Transaction.processlist[:]
+        botslib.lookupcache.newrun()
+        router._runroutegroups_in_pool('new',[['r1'],['r2','r3']])
+        self.assertEqual((botslib.lookupcache.hits,botslib.lookupcache.misses),(6,3),'lookups of workers are counted')
+        self.assertEqual(botslib._Transaction.processlist,processlist)
+        self.assertRaises(botslib.BotsError,router._runroutegroups_in_pool,'new',[['r1'],['error']])
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    unittest.main()
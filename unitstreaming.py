@@ -0,0 +1,92 @@
+import os
+import unittest
+import tempfile
+import bots.inmessage as inmessage
+import bots.benchmark.corpus as corpus
+import bots.benchmark.runner as runner
+
+''' streaming parse (bots.ini: streamingfilesizeincoming) should give same messages and ta_info as parse of whole edi file.
+    uses the grammars and generated edi files of the benchmark (bots/benchmark/usersys); no plugin needed.
+    not an acceptance test.
+'''
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.filenames = []
+
+    def tearDown(self):
+        for filename in self.filenames:
+            os.remove(filename)
+
+    def _parse(self,editype,charset,messages,lines):
+        ''' parse generated edi file as whole file and streaming; return both results as
+            list of (ta_info, content) for each message; last item is ta_info of the edi file.
+        '''
+        filehandle,filename = tempfile.mkstemp(suffix='.' + editype)
+        os.close(filehandle)
+        self.filenames.append(filename)
+        corpus.generate(editype,filename,messages=messages,lines=lines)
+        results = []
+        for streaming in (False,True):
+            edifile = inmessage.parse_edi_file(streaming=streaming,editype=editype,messagetype=corpus.MESSAGETYPES[editype],filename=filename,charset=charset)
+            result = []
+            for message in edifile.nextmessage():
+                ta_info = message.ta_info.copy()
+                del ta_info['bots_accessenvelope']
+                if editype == 'x12':
+                    content = [line.record for line in message.getloop({'BOTSID':message.root.record['BOTSID']},{'BOTSID':'PO1'})]
+                elif editype == 'xml':
+                    content = [message.root.record] + [line.record for line in message.getloop({'BOTSID':'order'},{'BOTSID':'line'})]
+                else:
+                    content = None
+                result.append((ta_info,content))
+            result.append(edifile.ta_info.copy())
+            results.append(result)
+        return results
+
+    def testx12(self):
+        whole,streamed = self._parse('x12','us-ascii',messages=5,lines=3)
+        self.assertEqual(len(streamed),6,'5 messages + edi file')
+        self.assertEqual(whole,streamed,'same result as parse of whole file')
+        ta_info = streamed[0][0]
+        self.assertEqual(ta_info['frompartner'],corpus.SENDER,'envelope queries (ISA) are passed via GS to each message')
+        self.assertEqual(ta_info['topartner'],corpus.RECEIVER)
+        self.assertEqual(ta_info['testindicator'],'P')
+        self.assertEqual(ta_info['reference'],'0001','reference of message (ST02)')
+        self.assertEqual(streamed[-1]['reference'],'0','reference of edi file (ISA13) is formatted')
+
+    def testedifact(self):
+        whole,streamed = self._parse('edifact','UNOA',messages=5,lines=3)
+        self.assertEqual(len(streamed),6,'5 messages + edi file')
+        self.assertEqual(whole,streamed,'same result as parse of whole file')
+        self.assertEqual(streamed[0][0]['frompartner'],corpus.SENDER)
+
+    def testxml(self):
+        whole,streamed = self._parse('xml','utf-8',messages=5,lines=3)
+        self.assertEqual(len(streamed),6,'5 messages + edi file')
+        self.assertEqual(whole,streamed,'same result as parse of whole file')
+        self.assertEqual(len(streamed[0][1]),4,'order + 3 lines')
+        self.assertEqual(streamed[0][0]['frompartner'],corpus.SENDER)
+        self.assertNotEqual(streamed[0][0]['reference'],streamed[1][0]['reference'],'queries per message')
+
+    def testxmldeep(self):
+        ''' conversion of xml to nodes is not recursive: deep xml is OK.'''
+        depth = 5000
+        xmlroot = xmlnode = inmessage.ET.Element('level')
+        for count in xrange(depth):
+            xmlnode = inmessage.ET.SubElement(xmlnode,'level')
+            inmessage.ET.SubElement(xmlnode,'field').text = str(count)
+        edi = inmessage.xmlnocheck({'attributemarker':'__','checkunknownentities':True})
+        edi.stack = [0]
+        node = edi._etree2botstree(xmlroot)
+        for count in xrange(depth):
+            self.assertEqual(len(node.children),1)
+            node = node.children[0]
+            self.assertEqual(node.record,{'BOTSID':'level','BOTSIDnr':u'1','field':str(count)})
+        self.assertEqual(node.children,[])
+        self.assertEqual(edi.stack,[0])
+
+
+if __name__ == '__main__':
+    runner._initbenchmark('config')
+    unittest.main()
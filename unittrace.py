@@ -0,0 +1,104 @@
+import unittest
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.automaticmaintenance as automaticmaintenance
+from bots.botsconfig import *
+
+''' traces/filereports of automatic maintenance are build from the ta's of the run read in one query (TransactionsOfRun).
+    filereports should be the same as when the tree of ta's is build with a query per ta (as before, see OldTrace).
+    uses the database of bots (adds transactions and filereports and deletes them afterwards).
+    no plugin needed; not an acceptance test.
+'''
+
+class OldTrace(automaticmaintenance.Trace):
+    ''' Trace as it was: query for the children of each ta.'''
+    def _buildtreeoftransactions(self,tacurrent):
+        if tacurrent['child']:     #find successor by using child relation ship (when merging)
+            for row in botslib.query('''SELECT ''' + automaticmaintenance.TAVARS + '''
+                                         FROM ta
+                                         WHERE idta=%(child)s
+                                         ORDER BY idta ''',
+                                        {'child':tacurrent['child']}):
+                tacurrent['talijst'] = [dict(row)]    #add next one (a child has only one parent)
+        else:   #find successor by using parent-relationship; for one-one-one relation an splitting
+            talijst = []
+            for row in botslib.query('''SELECT ''' + automaticmaintenance.TAVARS + '''
+                                        FROM ta
+                                        WHERE idta > %(currentidta)s
+                                        AND parent=%(currentidta)s
+                                        ORDER BY idta ''',
+                                        {'currentidta':tacurrent['idta']}):
+                talijst.append(dict(row))
+            tacurrent['talijst'] = talijst
+        for child in tacurrent['talijst']:
+            self._buildtreeoftransactions(child)
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.rootidtaofrun = botslib.NewTransaction(status=PROCESS,filename='unittrace').idta
+        self.query = botslib.query
+        self.queries = 0
+        ta_merged = {}
+        def newta(parent,status,statust=DONE,**ta_info):
+            return botslib.NewTransaction(parent=parent,status=status,statust=statust,idroute='unittrace',**ta_info).idta
+        for count,kind in enumerate(['merge','merge','merge','error','stuck','split']):
+            idta = newta(0,EXTERNIN,filename='infile%s'%count,fromchannel='inchannel',frompartner='sender%s'%(count%2))
+            idta = newta(idta,FILEIN,statust=OK if kind == 'stuck' else DONE,filesize=100+count,contenttype='application/edifact')
+            if kind == 'stuck':
+                continue
+            idta = newta(idta,PARSED,statust=ERROR if kind == 'error' else DONE,editype='edifact',filesize=90+count,errortext='parse error' if kind == 'error' else '')
+            if kind == 'error':
+                continue
+            for message in range(3):     #splitting
+                idta_splitup = newta(idta,SPLITUP,editype='edifact',messagetype='ORDERS%s'%message)
+                idta_translated = newta(idta_splitup,TRANSLATED,divtext='mapping%s'%message,editype='xml',messagetype='orders',topartner='receiver')
+                if kind == 'merge':     #messages of several files are merged to one out-file per message type
+                    if message not in ta_merged:
+                        ta_merged[message] = newta(0,MERGED,editype='xml',messagetype='orders',filename='merged%s'%message)
+                        idta_out = newta(ta_merged[message],FILEOUT,editype='xml',messagetype='orders',filename='merged%s'%message)
+                        newta(idta_out,EXTERNOUT,editype='xml',messagetype='orders',filename='outfile_merged%s'%message,tochannel='outchannel',nrmessages=3)
+                    botslib.changeq(u'''UPDATE ta SET child=%(child)s WHERE idta=%(idta)s''',{'child':ta_merged[message],'idta':idta_translated})
+                else:
+                    idta_out = newta(idta_translated,FILEOUT,editype='xml',messagetype='orders')
+                    newta(idta_out,EXTERNOUT,editype='xml',messagetype='orders',filename='outfile_split%s'%message,tochannel='outchannel')
+
+    def tearDown(self):
+        botslib.query = self.query
+        botslib.changeq(u'''DELETE FROM filereport WHERE reportidta=%(idta)s''',{'idta':self.rootidtaofrun})
+        botslib.changeq(u'''DELETE FROM ta WHERE idta>=%(idta)s''',{'idta':self.rootidtaofrun})
+
+    def countquery(self,*args):
+        self.queries += 1
+        return self.query(*args)
+
+    def testfilereports(self):
+        botslib.query = self.countquery
+        tasofrun = automaticmaintenance.TransactionsOfRun(self.rootidtaofrun)
+        filereports = [automaticmaintenance.Trace(row,self.rootidtaofrun,tasofrun).make_file_report() for row in tasofrun.incomingfiles()]
+        self.assertEqual(self.queries,1,'one query for all ta\'s of the run')
+        self.queries = 0
+        oldfilereports = [OldTrace(row,self.rootidtaofrun,None).make_file_report()
+                            for row in self.query('''SELECT ''' + automaticmaintenance.TAVARS + '''
+                                                    FROM ta
+                                                    WHERE idta > %(rootidtaofrun)s
+                                                    AND status=%(status)s ''',
+                                                    {'status':EXTERNIN,'rootidtaofrun':self.rootidtaofrun})]
+        self.assertTrue(self.queries > 50)
+        self.assertEqual(len(filereports),6)
+        self.assertEqual(filereports,oldfilereports)
+        self.assertEqual([filereport['statust'] for filereport in filereports],[DONE,DONE,DONE,ERROR,OK,DONE])
+        self.assertEqual(filereports[0]['outfilename'],'(several values)','merged in 3 out-files')
+        self.assertEqual(filereports[5]['nrmessages'],3,'split up in 3 messages')
+        #filereports are written in one batch
+        automaticmaintenance.insert_file_reports(filereports)
+        for row in self.query(u'''SELECT COUNT(*) as count FROM filereport WHERE reportidta=%(idta)s''',{'idta':self.rootidtaofrun}):
+            self.assertEqual(row['count'],6)
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    botsinit.connect()
+    unittest.main()
+    botsglobal.db.close()
@@ -0,0 +1,97 @@
+import unittest
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+from bots.botsconfig import *
+
+''' batching of ta-changes (botslib.batch_transactions): number of commits and copyta (one INSERT ... SELECT).
+    uses the database of bots (adds transactions and deletes them afterwards).
+    no plugin needed; not an acceptance test.
+'''
+
+class CountCommits(object):
+    ''' wraps db-connection; counts the commits.'''
+    def __init__(self,db):
+        self.db = db
+        self.commits = 0
+    def commit(self):
+        self.commits += 1
+        return self.db.commit()
+    def __getattr__(self,name):
+        return getattr(self.db,name)
+
+def old_copyta(ta,status,**ta_info):
+    ''' copyta as it was: insert with fixed fields, than update with ta_info.'''
+    newidta = botslib.insertta(u'''INSERT INTO ta (script,  status,     parent,frompartner,topartner,fromchannel,tochannel,editype,messagetype,alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,nrmessages,botskey,envelope,rsrv3)
+                            SELECT %(script)s,%(newstatus)s,idta,frompartner,topartner,fromchannel,tochannel,editype,messagetype,alt,merge,testindicator,reference,frommail,tomail,charset,contenttype,filename,idroute,nrmessages,botskey,envelope,rsrv3
+                            FROM ta
+                            WHERE idta=%(idta)s''',
+                            {'idta':ta.idta,'script':botslib._Transaction.processlist[-1],'newstatus':status})
+    newta = botslib.OldTransaction(newidta)
+    newta.update(**ta_info)
+    return newta
+
+def getrow(idta):
+    for row in botslib.query(u'''SELECT * FROM ta WHERE idta=%(idta)s''',{'idta':idta}):
+        row = dict(row)
+        del row['idta']
+        del row['ts']
+        return row
+
+class TestTransactions(unittest.TestCase):
+    def setUp(self):
+        self.ta_root = botslib.NewTransaction(status=FILEIN,statust=DONE,filename='unittransactions',frompartner='sender',topartner='receiver',
+                                                editype='edifact',messagetype='ORDERSD96AUNEAN008',fromchannel='inchannel',idroute='unittransactions',
+                                                reference='ref1',botskey='key1',nrmessages=3,charset='UNOA',alt='alt1',rsrv3=1)
+        self.db = botsglobal.db
+        botsglobal.db = self.counter = CountCommits(self.db)
+
+    def tearDown(self):
+        botsglobal.db = self.db
+        botslib.changeq(u'''DELETE FROM ta WHERE idta>=%(idta)s''',{'idta':self.ta_root.idta})
+
+    def testcommits(self):
+        batchsize = botsglobal.ini.getint('settings','transactionbatchsize',100)
+        number = 2 * batchsize + 10
+        @botslib.batch_transactions
+        def batched():
+            for count in xrange(number):
+                ta_new = self.ta_root.copyta(status=PARSED)
+                ta_new.update(statust=DONE,reference=str(count))
+                ta_new.syn('reference')      #query sees the pending update
+                self.assertEqual(ta_new.reference,str(count))
+            return ta_new
+        ta_last = batched()
+        #2 changes per loop (insert and update); commit per batchsize changes, last commit at end of batch
+        self.assertEqual(self.counter.commits,(2 * number + batchsize - 1) // batchsize)
+        self.assertEqual(botslib._Transaction.pendingupdates,{})
+        self.assertEqual(botslib._Transaction.uncommitted,0)
+        self.assertEqual(getrow(ta_last.idta)['statust'],DONE)
+        #not batched: commit after each change
+        self.counter.commits = 0
+        ta_new = self.ta_root.copyta(status=PARSED)
+        ta_new.update(statust=DONE)
+        self.assertEqual(self.counter.commits,2)
+
+    def testcopyta(self):
+        for ta_info in [{},
+                        {'reference':'ref2','statust':OK,'editype':'x12','divtext':'text','filename':'unittransactions2','parent':self.ta_root.idta},
+                        {'unknownfield':'not in filterlist','nrmessages':1,'topartner':'receiver2'},
+                       ]:
+            self.assertEqual(getrow(self.ta_root.copyta(PARSED,**ta_info).idta),getrow(old_copyta(self.ta_root,PARSED,**ta_info).idta),ta_info)
+            #copy of transaction with pending updates
+            @botslib.batch_transactions
+            def batched():
+                self.ta_root.update(botskey='key2')
+                return self.ta_root.copyta(PARSED,**ta_info),old_copyta(self.ta_root,PARSED,**ta_info)
+            ta_new,ta_old = batched()
+            self.assertEqual(getrow(ta_new.idta),getrow(ta_old.idta),ta_info)
+            self.assertEqual(getrow(ta_new.idta)['botskey'],'key2')
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    botsinit.connect()
+    unittest.main()
+    botsglobal.db.close()
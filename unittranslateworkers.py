@@ -0,0 +1,108 @@
+import unittest
+import itertools
+import bots.botslib as botslib
+import bots.botsinit as botsinit
+import bots.botsglobal as botsglobal
+import bots.transform as transform
+from bots.botsconfig import *
+
+''' translation in worker processes (bots.ini: translateworkers):
+    - no workers for SQLite and in acceptance tests: translation in bots-engine itself.
+    - results of the pool are handled in order of the edi files; lookup counters of workers are added.
+    the pool is replaced by a pool that runs in this process; the translation itself is replaced (only the edi files are recorded).
+    uses the database of bots (adds transactions and deletes them afterwards).
+    no plugin needed; not an acceptance test.
+'''
+IDROUTE = 'unittranslateworkers'
+
+class InProcessPool(object):
+    ''' as multiprocessing.Pool, but tasks are done in this process.'''
+    def imap(self,func,tasks):
+        return itertools.imap(func,tasks)
+
+class TestTranslateWorkers(unittest.TestCase):
+    def setUp(self):
+        self.translateworkers = botsglobal.ini.get('settings','translateworkers',None)
+        self.engine = botsglobal.settings.DATABASES['default']['ENGINE']
+        self.acceptance = botsglobal.ini.get('acceptance','runacceptancetest',None) if botsglobal.ini.has_section('acceptance') else None
+        self.translate_one_file = transform._translate_one_file
+        self.translate_in_pool = transform._translate_in_pool
+        self.currentrun = botsglobal.currentrun
+        self.rootidta = botslib.NewTransaction(status=PROCESS,filename='unittranslateworkers').idta
+        self.rows = [{'idta':botslib.NewTransaction(status=FILEIN,statust=OK,idroute=IDROUTE,filename='file%s'%count).idta,'filename':'file%s'%count}
+                     for count in range(3)]
+        self.translated = []
+        transform._translate_one_file = self.record
+        botsglobal.ini.set('settings','translateworkers','4')
+
+    def tearDown(self):
+        transform._translate_one_file = self.translate_one_file
+        transform._translate_in_pool = self.translate_in_pool
+        transform._translatepool = None
+        botsglobal.currentrun = self.currentrun
+        botsglobal.settings.DATABASES['default']['ENGINE'] = self.engine
+        if self.translateworkers is None:
+            botsglobal.ini.remove_option('settings','translateworkers')
+        else:
+            botsglobal.ini.set('settings','translateworkers',self.translateworkers)
+        if self.acceptance is None:
+            if botsglobal.ini.has_section('acceptance'):
+                botsglobal.ini.remove_option('acceptance','runacceptancetest')
+        else:
+            botsglobal.ini.set('acceptance','runacceptancetest',self.acceptance)
+        botslib.changeq(u'''DELETE FROM ta WHERE idta>=%(idta)s''',{'idta':self.rootidta})
+
+    def record(self,row,routedict,endstatus,userscript,scriptname):
+        ''' replaces the translation of an edi file.'''
+        if row['filename'] == 'error':
+            raise Exception('error in translation')
+        self.translated.append(row['idta'])
+        botslib.lookupcache.hits += 2
+        botslib.lookupcache.misses += 1
+
+    def settings(self,engine,acceptance=False):
+        botsglobal.settings.DATABASES['default']['ENGINE'] = engine
+        if not botsglobal.ini.has_section('acceptance'):
+            botsglobal.ini.add_section('acceptance')
+        botsglobal.ini.set('acceptance','runacceptancetest',str(acceptance))
+
+    def testtranslateworkers(self):
+        self.settings('django.db.backends.postgresql_psycopg2')
+        self.assertEqual(botslib.translateworkers(),4)
+        self.settings('django.db.backends.mysql')
+        self.assertEqual(botslib.translateworkers(),4)
+        self.settings('django.db.backends.sqlite3')
+        self.assertEqual(botslib.translateworkers(),1,'no workers for SQLite')
+        self.settings('django.db.backends.postgresql_psycopg2',acceptance=True)
+        self.assertEqual(botslib.translateworkers(),1,'no workers in acceptance test')
+
+    def testfallback(self):
+        def nopool(*args):
+            raise Exception('pool is used')
+        transform._translate_in_pool = nopool
+        for engine,acceptance in [('django.db.backends.sqlite3',False),('django.db.backends.postgresql_psycopg2',True)]:
+            self.settings(engine,acceptance)
+            self.translated = []
+            transform.translate(FILEIN,TRANSLATED,{'idroute':IDROUTE},self.rootidta)
+            self.assertEqual(self.translated,[row['idta'] for row in self.rows],'translated in bots-engine, in order of idta')
+
+    def testpool(self):
+        self.settings('django.db.backends.postgresql_psycopg2')
+        transform._translatepool = InProcessPool()
+        state = {'minta4query':self.rootidta,'minta4query_route':self.rootidta,'minta4query_routepart':self.rootidta}
+        botsglobal.currentrun = transform._RunInWorker(state)
+        botslib.lookupcache.newrun()
+        transform._translate_in_pool(self.rows[::-1],{'idroute':IDROUTE},TRANSLATED)
+        self.assertEqual(self.translated,[row['idta'] for row in self.rows[::-1]],'results in order of the rows')
+        self.assertEqual((botslib.lookupcache.hits,botslib.lookupcache.misses),(6,3),'lookups of workers are counted')
+        #error in worker (not handled in translation) is raised in bots-engine
+        rows = [dict(self.rows[0]),dict(self.rows[1],filename='error'),dict(self.rows[2])]
+        self.assertRaises(botslib.BotsError,transform._translate_in_pool,rows,{'idroute':IDROUTE},TRANSLATED)
+
+
+if __name__ == '__main__':
+    botsinit.generalinit('config')
+    botsglobal.logger = botsinit.initenginelogging('engine')
+    botsinit.connect()
+    unittest.main()
+    botsglobal.db.close()